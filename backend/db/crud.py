@@ -1,6 +1,8 @@
-from db.models import Internship, ResumeSummary, User, Company
+from db.models import Internship, ResumeSummary, User, Company, summary_source_hash
 from db.database import SessionLocal
+from db.resume_index import resume_index
 from datetime import datetime
+import pickle
 from utils.auth import get_password_hash, verify_password
 
 def add_internship(title, description, skills, location, stipend, duration):
@@ -25,6 +27,32 @@ def get_all_internships():
     db.close()
     return internships
 
+def get_internship(job_id):
+    db = SessionLocal()
+    internship = db.query(Internship).filter(Internship.job_id == job_id).first()
+    db.close()
+    return internship
+
+def update_internship(job_id, **fields):
+    db = SessionLocal()
+    internship = db.query(Internship).filter(Internship.job_id == job_id).first()
+    if internship:
+        for key, value in fields.items():
+            setattr(internship, key, value)
+        db.commit()
+        db.refresh(internship)
+    db.close()
+    return internship
+
+def delete_internship(job_id):
+    db = SessionLocal()
+    internship = db.query(Internship).filter(Internship.job_id == job_id).first()
+    if internship:
+        db.delete(internship)
+        db.commit()
+    db.close()
+    return internship is not None
+
 
 from sqlalchemy.orm import Session
 from . import models
@@ -93,9 +121,12 @@ def authenticate_company(db: Session, company_id: str, password: str):
         return False
     return company
 
-def save_resume_summary_with_embedding(db: Session, student_id: str, summary_text: str, embedding_vector: list):
+def save_resume_summary_with_embedding(db: Session, student_id: str, summary_text: str, embedding_vector: list,
+                                      concise_summary: str = None, concise_max_chars: int = 800):
     """
     Save or update a student's resume summary with embedding vector.
+    Pass concise_summary when it is already known (e.g. summary_text is itself the concise form)
+    so session hydration can reuse it.
     """
     summary = db.query(ResumeSummary).filter(ResumeSummary.student_id == student_id).first()
     if summary:
@@ -110,8 +141,12 @@ def save_resume_summary_with_embedding(db: Session, student_id: str, summary_tex
         )
         summary.set_embedding(embedding_vector)
         db.add(summary)
+    if concise_summary is not None:
+        summary.concise_summary = concise_summary
+        summary.concise_source_hash = summary_source_hash(summary_text, concise_max_chars)
     db.commit()
     db.refresh(summary)
+    resume_index.upsert(summary.id, student_id, embedding_vector)  # keep company-side matching in sync
     return summary
 
 
@@ -122,6 +157,34 @@ def get_resume_summary_with_embedding(db: Session, student_id: str):
     return db.query(ResumeSummary).filter(ResumeSummary.student_id == student_id).first()
 
 
+def save_concise_summary(db: Session, summary: ResumeSummary, concise_summary: str, max_chars: int = 800):
+    """
+    Store the concise form of summary.summary_text, tagged with the hash of the text it came from.
+    """
+    summary.concise_summary = concise_summary
+    summary.concise_source_hash = summary_source_hash(summary.summary_text, max_chars)
+    db.commit()
+    return summary
+
+
+def iter_resume_embeddings(student_ids=None, batch_size: int = 1000):
+    """
+    Stream (student_id, embedding) for stored resume summaries, optionally limited to student_ids.
+    Rows are fetched batch_size at a time so all students never sit in memory at once.
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(ResumeSummary.student_id, ResumeSummary.embedding_vector).filter(
+            ResumeSummary.embedding_vector.isnot(None)
+        )
+        if student_ids:
+            query = query.filter(ResumeSummary.student_id.in_(list(student_ids)))
+        for student_id, blob in query.order_by(ResumeSummary.id).yield_per(batch_size):
+            yield student_id, pickle.loads(blob)
+    finally:
+        db.close()
+
+
 def save_resume_summary(db: Session, student_id: str, summary_text: str):
     """
     Save or update a student's resume summary (legacy function).
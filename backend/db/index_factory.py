@@ -0,0 +1,213 @@
+"""FAISS index factory for the internship catalog.
+
+Small catalogs use an exact flat index. Larger ones switch to approximate
+search: IVF (k-means centroids, nprobe lists probed per query) and, for very
+large catalogs, HNSW (graph search tuned with efSearch). All types use L2
+distance so scores stay comparable with the original LangChain flat index.
+
+Any type can store compressed codes instead of float32 vectors: "sq8" (8-bit
+scalar quantization, 4x smaller) or "pq" (product quantization, ~16x smaller
+with the default sub-quantizer count).
+
+This module only depends on faiss/numpy so benchmarks can import it without
+loading the app configuration.
+"""
+import math
+import numpy as np
+import faiss
+
+INDEX_TYPES = ("flat", "ivf", "hnsw")
+QUANTIZATIONS = ("none", "sq8", "pq")
+
+# Each 8-bit PQ sub-quantizer has 256 centroids; FAISS wants ~39 training points per centroid
+PQ_MIN_TRAINING_POINTS = 39 * 256
+
+
+def choose_index_type(n_vectors: int, ivf_threshold: int, hnsw_threshold: int) -> str:
+    """Pick an index type by catalog size."""
+    if n_vectors >= hnsw_threshold:
+        return "hnsw"
+    if n_vectors >= ivf_threshold:
+        return "ivf"
+    return "flat"
+
+
+def default_nlist(n_vectors: int) -> int:
+    """Rule of thumb: ~4*sqrt(n) lists, with at least 39 training points per centroid."""
+    return max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39))
+
+
+def default_pq_m(dim: int) -> int:
+    """Largest sub-quantizer count <= dim/4 that divides dim (~16x compression at 8 bits per code)."""
+    for m in range(max(1, dim // 4), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def _training_sample(vectors: np.ndarray, size: int) -> np.ndarray:
+    """Training on a sample keeps k-means cheap on very large catalogs."""
+    n = len(vectors)
+    if size >= n:
+        return vectors
+    return vectors[np.random.default_rng(0).choice(n, size, replace=False)]
+
+
+def build_faiss_index(vectors: np.ndarray, index_type: str = "flat", nlist: int = 0, nprobe: int = 16,
+                      hnsw_m: int = 32, ef_construction: int = 80, ef_search: int = 64,
+                      quantization: str = "none", pq_m: int = 0):
+    """Create, train (if needed) and fill an index. Returns (index, params recorded in metadata)."""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {INDEX_TYPES}")
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization {quantization!r}; expected one of {QUANTIZATIONS}")
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    if quantization == "pq" and n < PQ_MIN_TRAINING_POINTS:
+        # Too few vectors to train PQ codebooks; 8-bit scalar quantization still compresses 4x
+        quantization = "sq8"
+    if n == 0:
+        quantization = "none"
+    pq_m = pq_m or default_pq_m(dim)
+    params = {"index_type": index_type, "dim": int(dim), "quantization": quantization}
+    if quantization == "pq":
+        params["pq_m"] = int(pq_m)
+
+    if index_type == "ivf" and n > 0:
+        nlist = nlist or default_nlist(n)
+        quantizer = faiss.IndexFlatL2(dim)
+        if quantization == "sq8":
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+        elif quantization == "pq":
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, 8)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_L2)
+        index.train(_training_sample(vectors, nlist * 256))
+        index.nprobe = min(nprobe, nlist)
+        params.update(nlist=int(nlist), nprobe=int(index.nprobe))
+    elif index_type == "hnsw" and n > 0:
+        if quantization == "sq8":
+            index = faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_8bit, hnsw_m)
+        elif quantization == "pq":
+            index = faiss.IndexHNSWPQ(dim, pq_m, hnsw_m)
+        else:
+            index = faiss.IndexHNSWFlat(dim, hnsw_m, faiss.METRIC_L2)
+        index.hnsw.efConstruction = ef_construction
+        index.hnsw.efSearch = ef_search
+        if not index.is_trained:
+            index.train(_training_sample(vectors, 65536))
+        params.update(hnsw_m=int(hnsw_m), ef_search=int(ef_search))
+    else:
+        if quantization == "sq8":
+            index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+        elif quantization == "pq":
+            index = faiss.IndexPQ(dim, pq_m, 8, faiss.METRIC_L2)
+        else:
+            index = faiss.IndexFlatL2(dim)
+        if not index.is_trained:
+            index.train(_training_sample(vectors, 65536))
+        params["index_type"] = "flat"
+
+    if n:
+        index.add(vectors)
+    return index, params
+
+
+def set_search_params(index, nprobe: int = None, ef_search: int = None):
+    """Apply query-time knobs (nprobe for IVF, efSearch for HNSW) to a loaded index."""
+    if nprobe:
+        try:
+            ivf = faiss.extract_index_ivf(index)
+            ivf.nprobe = min(nprobe, ivf.nlist)
+        except RuntimeError:
+            pass
+    if ef_search:
+        downcast = faiss.downcast_index(index)
+        if hasattr(downcast, "hnsw"):
+            downcast.hnsw.efSearch = ef_search
+
+
+def index_type_of(index) -> str:
+    downcast = faiss.downcast_index(index)
+    if hasattr(downcast, "hnsw"):
+        return "hnsw"
+    if hasattr(downcast, "nprobe"):
+        return "ivf"
+    return "flat"
+
+
+def quantization_of(index) -> str:
+    """How vectors are stored: "none" (float32), "sq8" or "pq"."""
+    downcast = faiss.downcast_index(index)
+    if hasattr(downcast, "storage"):  # HNSW keeps codes in a separate storage index
+        downcast = faiss.downcast_index(downcast.storage)
+    if hasattr(downcast, "sq"):
+        return "sq8"
+    if hasattr(downcast, "pq"):
+        return "pq"
+    return "none"
+
+
+def index_size_bytes(index) -> int:
+    """Serialized size of an index, a close proxy for its resident memory."""
+    return int(faiss.serialize_index(index).size)
+
+
+def describe_index(index) -> dict:
+    """Index type and search parameters, as recorded in a version's meta.json."""
+    info = {"index_type": index_type_of(index), "dim": int(index.d), "ntotal": int(index.ntotal),
+            "quantization": quantization_of(index)}
+    if info["index_type"] == "ivf":
+        ivf = faiss.extract_index_ivf(index)
+        info.update(nlist=int(ivf.nlist), nprobe=int(ivf.nprobe))
+    elif info["index_type"] == "hnsw":
+        info["ef_search"] = int(faiss.downcast_index(index).hnsw.efSearch)
+    return info
+
+
+def supports_removal(index) -> bool:
+    """Whether labels can be removed in place; HNSW graphs cannot drop nodes."""
+    return index_type_of(index) != "hnsw"
+
+
+def remove_labels(index, labels):
+    """Remove labels from a flat or IVF index in place, renumbering the rest densely.
+
+    Flat indexes shift later labels down themselves; IVF keeps the stored ids,
+    so they are rewritten in each inverted list to match.
+    """
+    labels = np.asarray(labels, dtype=np.int64)
+    if not len(labels):
+        return
+    ntotal = index.ntotal
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        ivf = None
+    if ivf is not None:
+        # remove_ids does not support the array direct map reconstruct_all builds
+        ivf.make_direct_map(False)
+    index.remove_ids(faiss.IDSelectorBatch(len(labels), faiss.swig_ptr(labels)))
+    if ivf is not None:
+        keep = np.ones(ntotal, dtype=bool)
+        keep[labels] = False
+        new_labels = np.cumsum(keep) - 1
+        invlists = ivf.invlists
+        for list_no in range(invlists.nlist):
+            size = invlists.list_size(list_no)
+            if size:
+                ids = faiss.rev_swig_ptr(invlists.get_ids(list_no), size)
+                ids[:] = new_labels[ids]
+
+
+def reconstruct_all(index) -> np.ndarray:
+    """All stored vectors in label order (decoded approximations for quantized indexes)."""
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype=np.float32)
+    try:
+        return index.reconstruct_n(0, index.ntotal)
+    except RuntimeError:
+        # IVF needs a direct map before vectors can be reconstructed by label
+        ivf = faiss.extract_index_ivf(index)
+        ivf.make_direct_map()
+        return index.reconstruct_n(0, index.ntotal)
@@ -0,0 +1,292 @@
+"""Process-wide resident internship index.
+
+The FAISS store is loaded once per process and every search is served from
+memory. When the CURRENT pointer on disk moves (another worker or the rebuild
+worker published a new version) that version is loaded in a background thread
+and swapped in; searches that already hold the previous generation finish
+against it.
+
+When the embeddings fallback reroutes to another provider, that provider's
+index is loaded if it exists. If it does not, it is never built on the request
+path: a build is queued through the rebuild handler (the background rebuild
+worker) and the current generation keeps serving, with queries embedded
+by the generation's own provider, until the new index is published.
+
+Single-internship changes are applied incrementally: an in-memory copy of the
+live index drops that job's vectors and appends its freshly embedded chunks,
+and the copy is saved and published as the next generation. Change listeners
+(e.g. the recommendation cache) are told which jobs changed. A change that
+touches no indexed job and drops nothing publishes nothing. HNSW graphs cannot
+drop nodes, so replacing or removing an indexed job's vectors there is queued
+as a full rebuild on the rebuild handler instead of rebuilding inside the request.
+
+Only the changed jobs are embedded, but every publish still copies, rewrites and
+fsyncs the whole index, i.e. O(catalog) I/O per call. Bulk edits should go
+through upsert_internships() so they cost one publish instead of one per job.
+Publishes hold the cross-process index write lock (db.vectorstore.index_write_lock)
+and re-read CURRENT once it is acquired, so concurrent workers never derive
+versions from the same parent.
+"""
+import os
+import threading
+import logging
+import numpy as np
+from db.crud import get_all_internships
+from db.index_factory import supports_removal
+from db.job_filters import JobAttributeIndex
+from utils.metrics import metrics
+from utils.config import get_embedding_type
+from db.vectorstore import (
+    current_index_version,
+    get_index_embeddings,
+    has_index,
+    index_write_lock,
+    load_vectorstore,
+    vectorstore_path,
+    versions_dir,
+    save_index_version,
+    split_internship_documents,
+)
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILES = ("index.faiss", "index.pkl")
+
+
+def search_chunks(vectorstore, vector, k: int, params=None) -> list:
+    """Label search: [(job_id, l2_distance, chunk_text or None)], nearest first."""
+    distances, labels = vectorstore.search_labels(vector, k, params)
+    return [
+        (int(vectorstore.job_ids[label]), float(distance), vectorstore.text(int(label)))
+        for distance, label in zip(distances, labels)
+    ]
+
+
+class IndexGeneration:
+    """An immutable snapshot of the loaded index."""
+
+    def __init__(self, vectorstore, signature, number: int):
+        self.vectorstore = vectorstore
+        self.signature = signature
+        self.number = number
+        # Embeddings provider whose vector space the index is in; queries must be embedded by it
+        self.provider = getattr(vectorstore, "provider", None) or get_embedding_type()
+        self._job_attributes = None
+        self._attributes_lock = threading.Lock()
+
+    def job_attributes(self) -> JobAttributeIndex:
+        """Per-job filter attributes for this generation, read from the Internship table on first use."""
+        if self._job_attributes is None:
+            with self._attributes_lock:
+                if self._job_attributes is None:
+                    self._job_attributes = JobAttributeIndex(self.vectorstore.job_ids, get_all_internships())
+        return self._job_attributes
+
+
+class ResidentIndexManager:
+    """Keeps the internship vectorstore resident and hot-swaps new generations."""
+
+    def __init__(self, path: str = None, loader=load_vectorstore):
+        self._path = path
+        self.loader = loader
+        self._current = None
+        self._load_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._reloading = False
+        self._change_listeners = []
+        self._rebuild_handler = None
+        self._pending_builds = {}  # provider -> handle returned by the missing-index handler
+
+    @property
+    def path(self) -> str:
+        # Resolved lazily: the default location depends on the embeddings provider
+        generation = self._current
+        return self._path or vectorstore_path(generation.provider if generation else None)
+
+    def _disk_signature(self, provider: str = None):
+        """Live version name; for a legacy unversioned index the (mtime_ns, size) of each file."""
+        version = current_index_version(provider)
+        if version:
+            return version
+        signature = []
+        for name in INDEX_FILES:
+            try:
+                st = os.stat(os.path.join(self._path or vectorstore_path(provider), name))
+            except OSError:
+                return None
+            signature.append((st.st_mtime_ns, st.st_size))
+        return tuple(signature)
+
+    def _load_generation(self, provider: str = None):
+        provider = provider or get_embedding_type()
+        signature = self._disk_signature(provider)
+        if isinstance(signature, str):
+            vectorstore = self.loader(os.path.join(versions_dir(provider), signature), provider)
+        else:
+            vectorstore = self.loader(None, provider)
+        # The loader may have built a missing index, so read the signature again
+        if signature is None:
+            signature = self._disk_signature(provider)
+        number = self._current.number + 1 if self._current else 1
+        generation = IndexGeneration(vectorstore, signature, number)
+        self._current = generation
+        logger.info(f"✅ Loaded internship index generation {number}")
+        return generation
+
+    def _reload_in_background(self):
+        try:
+            with self._load_lock:
+                provider = self._current.provider if self._current else None
+                if self._current is None or self._current.signature != self._disk_signature(provider):
+                    self._load_generation(provider)
+        except Exception as e:
+            # Keep serving the old generation; the next search retries
+            logger.warning(f"⚠️ Failed to reload internship index, keeping previous generation: {e}")
+        finally:
+            self._reloading = False
+
+    def set_rebuild_handler(self, handler):
+        """handler(provider) queues a full build of provider's index and returns an object with a .status."""
+        self._rebuild_handler = handler
+
+    def _request_build(self, provider: str):
+        pending = self._pending_builds.get(provider)
+        if pending is not None and getattr(pending, "status", None) in ("queued", "running"):
+            return
+        if self._rebuild_handler is None:
+            logger.warning(f"⚠️ No {provider} internship index and no build handler; keeping the current index")
+            return
+        logger.warning(f"⚠️ No {provider} internship index yet; queued a background build, serving the current index")
+        self._pending_builds[provider] = self._rebuild_handler(provider)
+
+    def current(self) -> IndexGeneration:
+        """Return the live generation, loading it on first use."""
+        generation = self._current
+        provider = get_embedding_type()
+        if generation is None:
+            with self._load_lock:
+                if self._current is None:
+                    # First use (warm-up): a missing index is built here, as before any search
+                    return self._load_generation(provider)
+                generation = self._current
+
+        if generation.provider != provider:
+            # The embeddings fallback rerouted to another provider: switch to its index when
+            # one exists (a disk read), otherwise queue its build and keep serving this one
+            if has_index(provider):
+                with self._load_lock:
+                    if self._current.provider != provider:
+                        self._load_generation(provider)
+                    return self._current
+            self._request_build(provider)
+            return generation
+
+        if not self._reloading and generation.signature != self._disk_signature(generation.provider):
+            self._reloading = True
+            threading.Thread(target=self._reload_in_background, daemon=True).start()
+        return generation
+
+    def get_vectorstore(self):
+        return self.current().vectorstore
+
+    def publish(self, vectorstore):
+        """Swap in a vectorstore that was just built and saved by this process."""
+        with self._load_lock:
+            number = self._current.number + 1 if self._current else 1
+            self._current = IndexGeneration(vectorstore, self._disk_signature(vectorstore.provider), number)
+        return self._current
+
+    def _fresh_generation(self) -> IndexGeneration:
+        """Current generation, reloaded synchronously if another process changed the disk copy."""
+        with self._load_lock:
+            provider = self._current.provider if self._current else None
+            if self._current is None or self._current.signature != self._disk_signature(provider):
+                return self._load_generation(provider)
+            return self._current
+
+    def add_change_listener(self, listener):
+        """Register listener(previous_generation, generation, job_ids), called after each incremental change."""
+        self._change_listeners.append(listener)
+
+    def _needs_rebuild(self, vectorstore, job_ids) -> bool:
+        """Whether dropping job_ids' vectors would rebuild an HNSW graph (done by the rebuild handler if set)."""
+        if self._rebuild_handler is None or supports_removal(vectorstore.index):
+            return False
+        return bool(np.isin(vectorstore.job_ids, np.asarray(list(job_ids), dtype=np.int64)).any())
+
+    def _apply(self, mutate, job_ids=()):
+        """Derive a modified in-memory copy of the live index, persist it and publish it."""
+        with self._write_lock, index_write_lock():
+            # Another process may have published while we waited for the lock
+            previous = self._fresh_generation()
+            if self._needs_rebuild(previous.vectorstore, job_ids):
+                # Queued even while a rebuild runs: that one may have read the catalog before this change
+                logger.info(f"HNSW index cannot drop vectors of jobs {list(job_ids)}; queued a full rebuild")
+                self._pending_builds[previous.provider] = self._rebuild_handler(previous.provider)
+                return previous
+            vectorstore = mutate(previous.vectorstore)
+            if vectorstore is previous.vectorstore:
+                return previous
+            vectorstore.provider = previous.provider
+            save_index_version(vectorstore, previous.provider)
+            generation = self.publish(vectorstore)
+            for listener in self._change_listeners:
+                try:
+                    listener(previous, generation, list(job_ids))
+                except Exception as e:
+                    logger.warning(f"⚠️ Index change listener failed: {e}")
+            return generation
+
+    def rebuild(self, build):
+        """Run a full build and publish it; incremental writes wait so none are lost."""
+        with self._write_lock:
+            return self.publish(build())
+
+    def upsert_internship(self, internship):
+        """Embed only this internship's chunks, replacing any vectors it already had."""
+        return self.upsert_internships([internship])
+
+    def upsert_internships(self, internships):
+        """upsert_internship for many jobs in a single publish."""
+        internships = list(internships)
+        job_ids = [internship.job_id for internship in internships]
+
+        def mutate(vectorstore):
+            docs = split_internship_documents(internships)
+            texts = [d.page_content for d in docs]
+            # Embedded by the index's own provider, whatever the fallback currently routes to
+            embedder = get_index_embeddings(vectorstore.provider)
+            vectors = np.asarray(embedder.embed_documents(texts), dtype=np.float32) if texts else None
+            return vectorstore.without_jobs(job_ids).with_chunks(
+                vectors, [d.metadata["job_id"] for d in docs], texts if vectorstore.has_texts else None
+            )
+        return self._apply(mutate, job_ids)
+
+    def remove_internship(self, job_id):
+        """Drop every vector that belongs to job_id."""
+        return self._apply(lambda vectorstore: vectorstore.without_jobs([job_id]), [job_id])
+
+    def stats(self) -> dict:
+        generation = self._current
+        return {
+            "loaded": generation is not None,
+            "generation": generation.number if generation else 0,
+            "reloading": self._reloading,
+            "version": generation.signature if generation and isinstance(generation.signature, str) else None,
+            "provider": generation.provider if generation else None,
+            "pending_builds": sorted(
+                provider for provider, job in self._pending_builds.items()
+                if getattr(job, "status", None) in ("queued", "running")
+            ),
+            # Resolving the path before warm-up would resolve the embeddings provider on the scrape
+            "path": self.path if generation is not None else None,
+        }
+
+
+resident_index = ResidentIndexManager()
+metrics.register("internship_index", resident_index.stats)
+
+
+def get_resident_vectorstore():
+    """Return the process-wide resident internship vectorstore."""
+    return resident_index.get_vectorstore()
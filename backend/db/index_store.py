@@ -0,0 +1,318 @@
+"""Compact internship index: a FAISS index plus columnar sidecar files.
+
+Every version directory holds:
+
+- index.faiss       the FAISS index (flat / IVF / HNSW, see db/index_factory.py)
+- job_ids.npy       int64 job_id per vector (row i = FAISS label i)
+- text_offsets.npy  optional int64 offsets into texts.bin, length n + 1
+- texts.bin         optional UTF-8 chunk texts packed back to back
+- vectors.npy       optional float32 vectors for exact re-ranking of a quantized index
+- meta.json         index type, search parameters, provider and model
+
+There is no pickled docstore: loading is a FAISS read plus a couple of NumPy
+arrays, and internship details are hydrated from the Internship table. In mmap
+mode the FAISS file is opened with IO_FLAG_MMAP and the sidecar with NumPy
+memmaps, so workers share page-cache pages for whatever FAISS actually maps.
+On the pinned faiss-cpu 1.7.4 that is only the inverted lists of IVF indexes:
+the flag is ignored for flat (and HNSW) indexes, so with the default "auto"
+index type below VECTORSTORE_IVF_THRESHOLD chunks every worker still reads its
+own copy of the vectors and only the sidecar arrays are shared.
+
+When the FAISS index stores quantized codes, the full-precision vectors are
+always memory-mapped: only the rows of re-ranked candidates are ever paged in,
+so the resident footprint is the compressed index.
+"""
+import os
+import json
+import logging
+from typing import List, Optional, Tuple
+import numpy as np
+import faiss
+from langchain.schema import Document
+from db.index_factory import reconstruct_all, remove_labels, supports_removal
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.faiss"
+JOB_IDS_FILE = "job_ids.npy"
+TEXT_OFFSETS_FILE = "text_offsets.npy"
+TEXTS_FILE = "texts.bin"
+VECTORS_FILE = "vectors.npy"
+META_FILE = "meta.json"
+
+
+def write_index_meta(index_dir: str, meta: dict):
+    with open(os.path.join(index_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+
+def read_index_meta(index_dir: str) -> dict:
+    """meta.json of an index version ({} for versions built before it existed)."""
+    try:
+        with open(os.path.join(index_dir, META_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def has_sidecar(index_dir: str) -> bool:
+    return os.path.exists(os.path.join(index_dir, JOB_IDS_FILE))
+
+
+def _pack_texts(texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [t.encode("utf-8") for t in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def read_faiss_index(path: str, mmap: bool):
+    """Read a FAISS index, memory-mapped when requested and supported by the index type.
+
+    faiss-cpu 1.7.4 only maps IVF inverted lists; for IndexFlat / HNSW the flag
+    is silently ignored and the vectors are read into this process's memory.
+    """
+    if mmap:
+        try:
+            return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError as e:
+            logger.warning(f"⚠️ FAISS cannot mmap this index type, reading it into memory: {e}")
+    return faiss.read_index(path)
+
+
+class InternshipIndex:
+    """FAISS index plus columnar job metadata; duck-types the search API of LangChain's FAISS.
+
+    Instances are treated as immutable once published: without_jobs() and
+    with_chunks() return modified in-memory copies for the incremental path.
+    """
+
+    def __init__(self, index, job_ids: np.ndarray, text_offsets: Optional[np.ndarray] = None,
+                 texts: Optional[np.ndarray] = None, embedding_function=None,
+                 full_vectors: Optional[np.ndarray] = None):
+        self.index = index
+        self.job_ids = job_ids
+        self.text_offsets = text_offsets
+        self.texts = texts
+        self.embedding_function = embedding_function
+        self.full_vectors = full_vectors
+        # Candidates fetched per result before exact re-ranking (needs full_vectors; <= 1 disables)
+        self.rerank_factor = 0
+        self.index_dir = None
+        # Embeddings provider whose vector space the index is in (set by db.vectorstore)
+        self.provider = None
+
+    @classmethod
+    def from_vectors(cls, index, job_ids: List[int], texts: Optional[List[str]] = None, embedding_function=None,
+                     full_vectors: Optional[np.ndarray] = None):
+        """Wrap an already-filled FAISS index; texts and full-precision vectors are only kept when given."""
+        offsets, blob = _pack_texts(texts) if texts is not None else (None, None)
+        if full_vectors is not None:
+            full_vectors = np.asarray(full_vectors, dtype=np.float32)
+        return cls(index, np.asarray(job_ids, dtype=np.int64), offsets, blob, embedding_function, full_vectors)
+
+    @classmethod
+    def load(cls, index_dir: str, embedding_function=None, mmap: bool = False) -> "InternshipIndex":
+        mmap_mode = "r" if mmap else None
+        index = read_faiss_index(os.path.join(index_dir, INDEX_FILE), mmap)
+        job_ids = np.load(os.path.join(index_dir, JOB_IDS_FILE), mmap_mode=mmap_mode)
+        text_offsets, texts = None, None
+        texts_path = os.path.join(index_dir, TEXTS_FILE)
+        if os.path.exists(texts_path):
+            text_offsets = np.load(os.path.join(index_dir, TEXT_OFFSETS_FILE), mmap_mode=mmap_mode)
+            if os.path.getsize(texts_path) == 0:
+                texts = np.zeros(0, dtype=np.uint8)
+            elif mmap:
+                texts = np.memmap(texts_path, dtype=np.uint8, mode="r")
+            else:
+                texts = np.fromfile(texts_path, dtype=np.uint8)
+        full_vectors = None
+        vectors_path = os.path.join(index_dir, VECTORS_FILE)
+        if os.path.exists(vectors_path):
+            full_vectors = np.load(vectors_path, mmap_mode="r")
+        loaded = cls(index, job_ids, text_offsets, texts, embedding_function, full_vectors)
+        loaded.index_dir = index_dir
+        return loaded
+
+    def save(self, index_dir: str):
+        os.makedirs(index_dir, exist_ok=True)
+        faiss.write_index(self.index, os.path.join(index_dir, INDEX_FILE))
+        np.save(os.path.join(index_dir, JOB_IDS_FILE), np.asarray(self.job_ids, dtype=np.int64))
+        if self.has_texts:
+            np.save(os.path.join(index_dir, TEXT_OFFSETS_FILE), np.asarray(self.text_offsets, dtype=np.int64))
+            with open(os.path.join(index_dir, TEXTS_FILE), "wb") as f:
+                f.write(np.asarray(self.texts, dtype=np.uint8).tobytes())
+        if self.full_vectors is not None:
+            np.save(os.path.join(index_dir, VECTORS_FILE), np.asarray(self.full_vectors, dtype=np.float32))
+
+    @property
+    def ntotal(self) -> int:
+        return int(self.index.ntotal)
+
+    @property
+    def has_texts(self) -> bool:
+        return self.text_offsets is not None
+
+    def text(self, label: int) -> Optional[str]:
+        if not self.has_texts:
+            return None
+        start, end = int(self.text_offsets[label]), int(self.text_offsets[label + 1])
+        return bytes(self.texts[start:end]).decode("utf-8")
+
+    def job_vectors(self, job_id: int) -> np.ndarray:
+        """Full-precision (or decoded) vectors of one job's chunks."""
+        labels = np.flatnonzero(np.asarray(self.job_ids) == job_id)
+        if self.full_vectors is not None:
+            return np.asarray(self.full_vectors[labels], dtype=np.float32)
+        if not len(labels):
+            return np.zeros((0, self.index.d), dtype=np.float32)
+        try:
+            return np.vstack([self.index.reconstruct(int(label)) for label in labels])
+        except RuntimeError:
+            # IVF needs a direct map before vectors can be reconstructed by label
+            return reconstruct_all(self.index)[labels]
+
+    def _writable_index(self):
+        """Private in-memory copy of the FAISS index."""
+        try:
+            return faiss.clone_index(self.index)
+        except RuntimeError:
+            # mmap-backed inverted lists cannot be cloned; read a private copy from disk
+            path = os.path.join(self.index_dir or "", INDEX_FILE)
+            if not os.path.exists(path):
+                # Pruned version: callers derive from the generation CURRENT points at
+                # (ResidentIndexManager._apply reloads it under the write lock)
+                raise FileNotFoundError(f"Index version {self.index_dir} no longer exists on disk; reload the current version")
+            return faiss.read_index(path)
+
+    def _all_texts(self) -> Optional[List[str]]:
+        return [self.text(i) for i in range(self.ntotal)] if self.has_texts else None
+
+    def without_jobs(self, job_ids) -> "InternshipIndex":
+        """In-memory copy with every vector of the given jobs removed (self when they have none).
+
+        Flat and IVF indexes drop the labels in place (IVF keeps its trained
+        centroids). HNSW graphs cannot drop nodes, so the kept vectors are
+        re-added to an emptied graph, which costs a full build; the resident
+        index manager sends those changes to the rebuild worker instead.
+        Nothing is re-embedded.
+        """
+        drop = np.isin(self.job_ids, np.asarray(list(job_ids), dtype=np.int64))
+        if not drop.any():
+            return self
+        keep = ~drop
+        index = self._writable_index()
+        if supports_removal(index):
+            remove_labels(index, np.flatnonzero(drop))
+            vectors = np.asarray(self.full_vectors) if self.full_vectors is not None else None
+        else:
+            # Re-encode from full precision when available rather than from decoded codes
+            vectors = np.asarray(self.full_vectors) if self.full_vectors is not None else reconstruct_all(index)
+            index.reset()
+            if keep.any():
+                index.add(np.ascontiguousarray(vectors[keep]))
+        texts = self._all_texts()
+        kept_texts = [t for t, k in zip(texts, keep) if k] if texts is not None else None
+        kept_full = vectors[keep] if self.full_vectors is not None else None
+        return self._derived(InternshipIndex.from_vectors(
+            index, np.asarray(self.job_ids)[keep], kept_texts, self.embedding_function, kept_full))
+
+    def as_query_matrix(self, vectors) -> np.ndarray:
+        """vectors as a contiguous (n, d) float32 matrix.
+
+        Raises ValueError when they are not d-dimensional: reshaping would
+        silently turn e.g. one 768-dim vector into two 384-dim queries.
+        """
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.size == 0:
+            return np.zeros((0, self.index.d), dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[1] != self.index.d:
+            raise ValueError(f"vectors of shape {matrix.shape} do not match index dimension {self.index.d}")
+        return np.ascontiguousarray(matrix)
+
+    def with_chunks(self, vectors: np.ndarray, job_ids: List[int], texts: Optional[List[str]] = None) -> "InternshipIndex":
+        """In-memory copy with new chunk vectors appended."""
+        vectors = self.as_query_matrix(vectors if len(job_ids) else [])
+        if len(vectors) != len(job_ids):
+            raise ValueError(f"{len(vectors)} vectors for {len(job_ids)} chunks")
+        index = self._writable_index()
+        if len(job_ids):
+            index.add(vectors)
+        all_texts = None
+        if self.has_texts:
+            all_texts = self._all_texts() + list(texts or [""] * len(job_ids))
+        all_job_ids = np.concatenate([np.asarray(self.job_ids, dtype=np.int64), np.asarray(job_ids, dtype=np.int64)])
+        all_full = None
+        if self.full_vectors is not None:
+            all_full = np.concatenate([np.asarray(self.full_vectors), vectors])
+        return self._derived(InternshipIndex.from_vectors(index, all_job_ids, all_texts, self.embedding_function, all_full))
+
+    def _derived(self, other: "InternshipIndex") -> "InternshipIndex":
+        other.rerank_factor = self.rerank_factor
+        other.provider = self.provider
+        return other
+
+    @property
+    def reranks(self) -> bool:
+        return self.full_vectors is not None and self.rerank_factor > 1
+
+    def search_labels(self, vector, k: int, params=None) -> Tuple[np.ndarray, np.ndarray]:
+        """Raw FAISS search for one vector: (distances, labels), -1 labels removed.
+
+        With re-ranking enabled, rerank_factor * k candidates are fetched from the
+        quantized index and re-scored with exact L2 against the full-precision vectors.
+        """
+        distances, labels = self.search_labels_batch([vector], k, params)
+        keep = labels[0] >= 0
+        return distances[0][keep], labels[0][keep]
+
+    def search_labels_batch(self, vectors, k: int, params=None) -> Tuple[np.ndarray, np.ndarray]:
+        """One FAISS call for many query vectors: (distances, labels) of shape (n, k), -1 padded."""
+        queries = self.as_query_matrix(vectors)
+        fetch_k = k * self.rerank_factor if self.reranks else k
+        if params is not None:
+            distances, labels = self.index.search(queries, fetch_k, params=params)
+        else:
+            distances, labels = self.index.search(queries, fetch_k)
+        if self.reranks:
+            distances, labels = self._rerank(queries, labels, k)
+        return distances, labels
+
+    def _rerank(self, queries: np.ndarray, candidates: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact L2 re-scoring of quantized candidates against the full-precision sidecar."""
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        labels = np.full((len(queries), k), -1, dtype=np.int64)
+        for row, (query, row_labels) in enumerate(zip(queries, candidates)):
+            # Sorted label order keeps memmap reads sequential
+            row_labels = np.sort(row_labels[row_labels >= 0])
+            if not len(row_labels):
+                continue
+            exact = ((np.asarray(self.full_vectors[row_labels]) - query) ** 2).sum(axis=1)
+            best = np.argsort(exact)[:k]
+            distances[row, :len(best)] = exact[best]
+            labels[row, :len(best)] = row_labels[best]
+        return distances, labels
+
+    def similarity_search_with_score_by_vector(self, embedding, k: int = 4) -> List[Tuple[Document, float]]:
+        distances, labels = self.search_labels(embedding, k)
+        return [
+            (Document(page_content=self.text(int(label)) or "", metadata={"job_id": int(self.job_ids[label])}), float(dist))
+            for dist, label in zip(distances, labels)
+        ]
+
+    def similarity_search_by_vector(self, embedding, k: int = 4) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k)
+
+
+def from_langchain_vectorstore(vectorstore, embedding_function=None) -> InternshipIndex:
+    """Convert a legacy pickled LangChain FAISS store (in label order)."""
+    job_ids, texts = [], []
+    for i in range(vectorstore.index.ntotal):
+        doc = vectorstore.docstore._dict[vectorstore.index_to_docstore_id[i]]
+        job_ids.append(int(doc.metadata.get("job_id", -1)))
+        texts.append(doc.page_content)
+    return InternshipIndex.from_vectors(vectorstore.index, job_ids, texts, embedding_function)
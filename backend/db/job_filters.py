@@ -0,0 +1,120 @@
+"""Structured filters executed inside the FAISS search.
+
+Per-job attribute arrays (stipend, duration, location, remote) are built from
+the Internship columns. A filter is turned into a bitmap over vector labels and
+passed to FAISS as an IDSelector, so the k nearest neighbours returned already
+satisfy the filter instead of being post-filtered down to nothing.
+"""
+import re
+from typing import List, Optional
+import numpy as np
+import faiss
+from db.index_factory import index_type_of
+
+
+def parse_stipend(text) -> int:
+    """Monthly stipend as an integer amount; 0 for unpaid, -1 when unknown."""
+    if not text:
+        return -1
+    lowered = str(text).lower()
+    if "unpaid" in lowered:
+        return 0
+    m = re.search(r"(\d[\d,]*(?:\.\d+)?)\s*(k)?", lowered)
+    if not m:
+        return -1
+    amount = float(m.group(1).replace(",", ""))
+    if m.group(2):
+        amount *= 1000
+    if "year" in lowered or "annum" in lowered or "/yr" in lowered:
+        amount /= 12
+    elif "week" in lowered:
+        amount *= 4.345
+    return int(round(amount))
+
+
+def parse_duration_months(text) -> int:
+    """Duration in whole months (weeks rounded up); -1 when unknown."""
+    if not text:
+        return -1
+    lowered = str(text).lower()
+    m = re.search(r"(\d+(?:\.\d+)?)", lowered)
+    if not m:
+        return -1
+    value = float(m.group(1))
+    if "week" in lowered:
+        return int(np.ceil(value / 4.345))
+    if "year" in lowered:
+        return int(round(value * 12))
+    return int(round(value))
+
+
+class SearchFilters:
+    """Structured constraints on recommended internships (all optional)."""
+
+    def __init__(self, remote_only: bool = False, locations: Optional[List[str]] = None,
+                 min_stipend: Optional[int] = None, max_stipend: Optional[int] = None,
+                 min_duration_months: Optional[int] = None, max_duration_months: Optional[int] = None):
+        self.remote_only = remote_only
+        self.locations = [l.strip().lower() for l in (locations or []) if l and l.strip()]
+        self.min_stipend = min_stipend
+        self.max_stipend = max_stipend
+        self.min_duration_months = min_duration_months
+        self.max_duration_months = max_duration_months
+
+    def is_empty(self) -> bool:
+        return not (self.remote_only or self.locations or self.min_stipend is not None
+                    or self.max_stipend is not None or self.min_duration_months is not None
+                    or self.max_duration_months is not None)
+
+    def key(self) -> tuple:
+        return (self.remote_only, tuple(sorted(self.locations)), self.min_stipend, self.max_stipend,
+                self.min_duration_months, self.max_duration_months)
+
+
+class JobAttributeIndex:
+    """Columnar per-job attributes plus the label -> job_id mapping of one index generation."""
+
+    def __init__(self, vector_job_ids, internships):
+        self.vector_job_ids = np.asarray(vector_job_ids, dtype=np.int64)
+        self.job_ids = np.asarray([i.job_id for i in internships], dtype=np.int64)
+        self.stipend = np.asarray([parse_stipend(i.stipend) for i in internships], dtype=np.int64)
+        self.duration = np.asarray([parse_duration_months(i.duration) for i in internships], dtype=np.int32)
+        self.location = np.asarray([(i.location or "").lower() for i in internships], dtype=object)
+        self.remote = np.asarray(["remote" in loc or "work from home" in loc for loc in self.location], dtype=bool)
+
+    def allowed_jobs(self, filters: SearchFilters) -> np.ndarray:
+        mask = np.ones(len(self.job_ids), dtype=bool)
+        if filters.remote_only:
+            mask &= self.remote
+        if filters.locations:
+            mask &= np.asarray([any(l in loc for l in filters.locations) for loc in self.location], dtype=bool)
+        # Unknown values (-1) never satisfy a numeric bound
+        if filters.min_stipend is not None:
+            mask &= self.stipend >= filters.min_stipend
+        if filters.max_stipend is not None:
+            mask &= (self.stipend >= 0) & (self.stipend <= filters.max_stipend)
+        if filters.min_duration_months is not None:
+            mask &= self.duration >= filters.min_duration_months
+        if filters.max_duration_months is not None:
+            mask &= (self.duration >= 0) & (self.duration <= filters.max_duration_months)
+        return self.job_ids[mask]
+
+    def label_mask(self, filters: SearchFilters) -> np.ndarray:
+        """Boolean mask over vector labels whose job passes the filter."""
+        return np.isin(self.vector_job_ids, self.allowed_jobs(filters))
+
+
+def search_parameters(index, label_mask: np.ndarray):
+    """FAISS SearchParameters restricting a search to the labels set in label_mask."""
+    bitmap = np.packbits(label_mask, bitorder="little")
+    selector = faiss.IDSelectorBitmap(len(label_mask), faiss.swig_ptr(bitmap))
+    selector.bitmap_ref = bitmap  # the selector only holds a raw pointer
+    index_type = index_type_of(index)
+    if index_type == "ivf":
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=faiss.extract_index_ivf(index).nprobe)
+    elif index_type == "hnsw":
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=faiss.downcast_index(index).hnsw.efSearch)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    params.selector_ref = selector
+    return params
@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, String, Text, LargeBinary, DateTime
+from sqlalchemy import Column, Integer, String, Text, LargeBinary, DateTime, Float
 from db.database import Base
 from sqlalchemy.orm import relationship
 from sqlalchemy import ForeignKey
 import pickle
+import hashlib
 from datetime import datetime
 
+
+def summary_source_hash(summary_text: str, max_chars: int) -> str:
+    """Identifies the (summary, length) a concise summary was derived from."""
+    return hashlib.sha256(f"{max_chars}\0{summary_text}".encode("utf-8")).hexdigest()
+
 class Internship(Base):
     __tablename__ = "internships"
 
@@ -39,6 +45,14 @@ class Company(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class ServerSession(Base):
+    __tablename__ = "server_sessions"
+
+    id = Column(String(64), primary_key=True)  # Opaque id from the session cookie
+    data = Column(Text, nullable=False)  # JSON session dict
+    expires_at = Column(Float, index=True, nullable=False)  # Unix time
+
+
 class ResumeSummary(Base):
     __tablename__ = "resume_summaries"
 
@@ -47,6 +61,8 @@ class ResumeSummary(Base):
     summary_text = Column(Text, nullable=False)
     embedding_vector = Column(LargeBinary)  # Store the embedding as binary data
     created_at = Column(String)  # Simple timestamp
+    concise_summary = Column(Text)  # make_concise_summary(summary_text), so hydration needs no LLM call
+    concise_source_hash = Column(String(64))  # summary_source_hash of the text concise_summary came from
 
     def set_embedding(self, embedding_list):
         """Store embedding vector as pickle binary data."""
@@ -56,4 +72,10 @@ class ResumeSummary(Base):
         """Retrieve embedding vector from pickle binary data."""
         if self.embedding_vector:
             return pickle.loads(self.embedding_vector)
+        return None
+
+    def get_concise_summary(self, max_chars: int = 800):
+        """Stored concise summary, or None if it is missing or was made from a different summary."""
+        if self.concise_summary and self.concise_source_hash == summary_source_hash(self.summary_text, max_chars):
+            return self.concise_summary
         return None
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""In-memory FAISS index over stored resume embeddings, for company-side matching.
+
+Built once per process from the resume_summaries table, then kept in sync
+incrementally: crud.save_resume_summary_with_embedding upserts the saved row
+directly, and before each search rows written by other workers since the last
+sync are folded in. FAISS ids are ResumeSummary.id, so an updated resume
+replaces its previous vector in place.
+
+New rows are found by id (id > highest id seen), which does not depend on any
+host's clock. Re-uploads update their row in place and keep its id, so rows
+whose created_at falls within UPDATE_OVERLAP_SECONDS of the newest timestamp
+seen are re-read as well; re-folding a row is idempotent.
+"""
+import pickle
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import List, Tuple
+import numpy as np
+import faiss
+from sqlalchemy import or_
+from db.database import SessionLocal
+from db.models import ResumeSummary
+
+logger = logging.getLogger(__name__)
+
+# Tolerated clock skew / same-second writes when catching up with in-place updates
+UPDATE_OVERLAP_SECONDS = 300
+
+
+def _overlap_start(watermark: str) -> str:
+    try:
+        return (datetime.fromisoformat(watermark) - timedelta(seconds=UPDATE_OVERLAP_SECONDS)).isoformat()
+    except ValueError:
+        return ""
+
+
+class ResumeIndex:
+    """Resume embeddings of one dimension in a FAISS IndexIDMap2 keyed by ResumeSummary.id."""
+
+    def __init__(self):
+        self.index = None
+        self.student_ids = {}
+        self.last_id = 0
+        self.watermark = ""
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return int(self.index.ntotal) if self.index is not None else 0
+
+    def _add(self, rows: List[Tuple[int, str, list]]):
+        """Insert or replace (row_id, student_id, embedding) rows.
+
+        Rows of another dimension are not indexed, but the vector their id had
+        is removed, so a resume re-embedded by another provider stops matching
+        with its old embedding.
+        """
+        latest = {int(r[0]): r for r in rows}
+        stale = [row_id for row_id in latest if row_id in self.student_ids]
+        if stale:
+            self.index.remove_ids(np.asarray(stale, dtype=np.int64))
+            for row_id in stale:
+                del self.student_ids[row_id]
+        rows = [r for r in latest.values() if r[2] is not None and len(r[2]) == self.index.d]
+        if not rows:
+            return
+        ids = np.asarray([row_id for row_id, _, _ in rows], dtype=np.int64)
+        self.index.add_with_ids(np.asarray([vector for _, _, vector in rows], dtype=np.float32), ids)
+        self.student_ids.update({int(row_id): student_id for row_id, student_id, _ in rows})
+
+    def _sync_from_db(self, batch_size: int = 1000):
+        """Fold in rows added or updated since the last sync (every row on the first call)."""
+        db = SessionLocal()
+        try:
+            query = db.query(ResumeSummary.id, ResumeSummary.student_id, ResumeSummary.embedding_vector,
+                             ResumeSummary.created_at).filter(ResumeSummary.embedding_vector.isnot(None))
+            if self.last_id:
+                updated_since = _overlap_start(self.watermark)
+                if updated_since:
+                    query = query.filter(or_(ResumeSummary.id > self.last_id, ResumeSummary.created_at >= updated_since))
+                else:
+                    query = query.filter(ResumeSummary.id > self.last_id)
+            batch = []
+            for row_id, student_id, blob, created_at in query.yield_per(batch_size):
+                batch.append((row_id, student_id, pickle.loads(blob)))
+                self.last_id = max(self.last_id, row_id)
+                if created_at and created_at > self.watermark:
+                    self.watermark = created_at
+                if len(batch) >= batch_size:
+                    self._add(batch)
+                    batch = []
+            self._add(batch)
+        finally:
+            db.close()
+
+    def ensure(self, dim: int):
+        """Build (or rebuild for a new embedding dimension) and catch up with the table."""
+        with self._lock:
+            if self.index is None or self.index.d != dim:
+                self.index = faiss.IndexIDMap2(faiss.IndexFlatL2(dim))
+                self.student_ids = {}
+                self.last_id = 0
+                self.watermark = ""
+                self._sync_from_db()
+                logger.info(f"✅ Resume index built with {self.size} resumes (dim={dim})")
+            else:
+                self._sync_from_db()
+
+    def upsert(self, row_id: int, student_id: str, embedding: list):
+        """Apply one saved ResumeSummary; a no-op until the index is first built."""
+        with self._lock:
+            if self.index is not None:
+                self._add([(row_id, student_id, embedding)])
+
+    def search(self, query_vectors, top_n: int = 10) -> List[Tuple[str, float]]:
+        """Top students for one or more query vectors as (student_id, similarity), best first.
+
+        With several query vectors (e.g. an internship's chunks) a student's
+        score is their best similarity 1/(1+L2) over the queries.
+        """
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        if queries.size == 0:
+            return []
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        if queries.shape[1] != self.index.d:
+            raise ValueError(f"query vectors of shape {queries.shape} do not match resume index dimension {self.index.d}")
+        queries = np.ascontiguousarray(queries)
+        with self._lock:
+            if self.size == 0 or not len(queries):
+                return []
+            distances, labels = self.index.search(queries, min(top_n, self.size))
+        best = {}
+        for row_distances, row_labels in zip(distances, labels):
+            for distance, label in zip(row_distances, row_labels):
+                if label < 0:
+                    continue
+                similarity = 1.0 / (1.0 + float(distance))
+                if similarity > best.get(label, 0.0):
+                    best[label] = similarity
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)[:top_n]
+        return [(self.student_ids[label], similarity) for label, similarity in ranked]
+
+
+resume_index = ResumeIndex()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import Optional, List
 
 class InternshipCreate(BaseModel):
     title: str
@@ -9,6 +9,15 @@ class InternshipCreate(BaseModel):
     stipend: str
     duration: str
 
+class BatchRecommendationRequest(BaseModel):
+    student_ids: List[str]  # at most BATCH_RECOMMENDATIONS_MAX_STUDENTS
+    top_k: int = 5
+    remote_only: bool = False
+    locations: Optional[List[str]] = None
+    min_stipend: Optional[int] = None
+    min_duration_months: Optional[int] = None
+    max_duration_months: Optional[int] = None
+
 # User authentication schemas
 class UserSignup(BaseModel):
     student_id: str
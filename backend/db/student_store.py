@@ -0,0 +1,139 @@
+"""Consolidated, sharded store for student resume chunks.
+
+Instead of one FAISS directory per student, resume chunks live in a fixed
+number of SQLite shard files (student_id -> shard by CRC32). Rows are keyed by
+(student_id, content_hash), so a student's chunks are deduplicated, a
+re-upload replaces their rows in one transaction, and loading or searching one
+student reads only their rows through the student_id index.
+"""
+import os
+import zlib
+import sqlite3
+import threading
+import logging
+from typing import List, Optional, Tuple
+import numpy as np
+from langchain.schema import Document
+from utils.embedding_cache import text_hash
+
+logger = logging.getLogger(__name__)
+
+
+class StudentResumeVectors:
+    """One student's resume chunks, searchable by brute force (they are only a handful)."""
+
+    def __init__(self, student_id: str, texts: List[str], vectors: np.ndarray, embedding_function=None):
+        self.student_id = student_id
+        self.texts = texts
+        self.vectors = vectors
+        self.embedding_function = embedding_function
+
+    def similarity_search_with_score_by_vector(self, embedding, k: int = 4) -> List[Tuple[Document, float]]:
+        if not self.texts:
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+        distances = ((self.vectors - query) ** 2).sum(axis=1)
+        order = np.argsort(distances)[:k]
+        return [
+            (Document(page_content=self.texts[i], metadata={"student_id": self.student_id}), float(distances[i]))
+            for i in order
+        ]
+
+    def similarity_search_by_vector(self, embedding, k: int = 4) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k)
+
+
+class StudentChunkStore:
+    """SQLite-sharded resume chunk vectors keyed by student_id."""
+
+    def __init__(self, base_dir: str, shards: int):
+        self.base_dir = base_dir
+        self.shards = shards
+        self._conns = {}
+        self._lock = threading.Lock()
+
+    def shard_of(self, student_id: str) -> int:
+        return zlib.crc32(str(student_id).encode("utf-8")) % self.shards
+
+    def _connection(self, shard: int) -> sqlite3.Connection:
+        conn = self._conns.get(shard)
+        if conn is None:
+            os.makedirs(self.base_dir, exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.base_dir, f"shard_{shard:03d}.sqlite3"), check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS resume_chunks ("
+                " student_id TEXT NOT NULL,"
+                " content_hash TEXT NOT NULL,"
+                " position INTEGER NOT NULL,"
+                " text TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " PRIMARY KEY (student_id, content_hash))"
+            )
+            self._conns[shard] = conn
+        return conn
+
+    def replace(self, student_id: str, chunks: List[Tuple[str, str, List[float]]]):
+        """Atomically replace a student's chunks with [(content_hash, text, vector)]."""
+        rows = [
+            (str(student_id), h, position, text, np.asarray(vector, dtype=np.float32).tobytes())
+            for position, (h, text, vector) in enumerate(chunks)
+        ]
+        with self._lock:
+            conn = self._connection(self.shard_of(student_id))
+            with conn:
+                conn.execute("DELETE FROM resume_chunks WHERE student_id = ?", (str(student_id),))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO resume_chunks (student_id, content_hash, position, text, vector) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+
+    def load(self, student_id: str) -> Tuple[List[str], List[str], np.ndarray]:
+        """(content_hashes, texts, vectors) of one student, in resume order."""
+        with self._lock:
+            conn = self._connection(self.shard_of(student_id))
+            rows = conn.execute(
+                "SELECT content_hash, text, vector FROM resume_chunks WHERE student_id = ? ORDER BY position",
+                (str(student_id),),
+            ).fetchall()
+        if not rows:
+            return [], [], np.zeros((0, 0), dtype=np.float32)
+        vectors = np.vstack([np.frombuffer(blob, dtype=np.float32) for _, _, blob in rows])
+        return [h for h, _, _ in rows], [t for _, t, _ in rows], vectors
+
+    def delete(self, student_id: str):
+        with self._lock:
+            conn = self._connection(self.shard_of(student_id))
+            with conn:
+                conn.execute("DELETE FROM resume_chunks WHERE student_id = ?", (str(student_id),))
+
+
+def replace_student_resume(store: StudentChunkStore, embeddings, student_id: str, chunk_texts: List[str]) -> int:
+    """Store a student's resume chunks, deduplicated by content hash; returns how many were embedded.
+
+    Chunks the student already has keep their stored vectors; only new text is
+    sent to the embeddings model.
+    """
+    unique = {}
+    for text in chunk_texts:
+        unique.setdefault(text_hash(text), text)
+
+    existing_hashes, _, existing_vectors = store.load(student_id)
+    known = {h: existing_vectors[i] for i, h in enumerate(existing_hashes)}
+    missing = [(h, t) for h, t in unique.items() if h not in known]
+    if missing:
+        fresh = embeddings.embed_documents([t for _, t in missing])
+        known.update({h: v for (h, _), v in zip(missing, fresh)})
+
+    store.replace(student_id, [(h, t, known[h]) for h, t in unique.items()])
+    return len(missing)
+
+
+def load_student_resume(store: StudentChunkStore, student_id: str, embedding_function=None) -> Optional[StudentResumeVectors]:
+    _, texts, vectors = store.load(student_id)
+    if not texts:
+        return None
+    return StudentResumeVectors(str(student_id), texts, vectors, embedding_function)
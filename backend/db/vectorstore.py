@@ -1,87 +1,371 @@
 import os
+import time
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 from langchain_community.vectorstores import FAISS
 from db.crud import get_all_internships
 from utils.config import (
     embeddings,
-    embedding_type,
+    get_embedding_type,
+    get_embeddings_with_fallback,
+    get_provider_embeddings,
     VECTORSTORE_BASE_DIR,
     STUDENT_VECTORSTORE_BASE_DIR,
+    VECTORSTORE_KEEP_VERSIONS,
+    VECTORSTORE_PRUNE_GRACE_SECONDS,
+    VECTORSTORE_LOAD_MODE,
+    VECTORSTORE_INDEX_TYPE,
+    VECTORSTORE_IVF_THRESHOLD,
+    VECTORSTORE_HNSW_THRESHOLD,
+    VECTORSTORE_IVF_NLIST,
+    VECTORSTORE_NPROBE,
+    VECTORSTORE_HNSW_M,
+    VECTORSTORE_EF_SEARCH,
+    VECTORSTORE_QUANTIZATION,
+    VECTORSTORE_PQ_M,
+    VECTORSTORE_RERANK_FACTOR,
+    VECTORSTORE_STORE_TEXTS,
+    EMBEDDING_MODELS,
+    STUDENT_STORE_SHARDS,
 )
+from utils.embedding_cache import CachedEmbeddings, text_hash
+from utils.embedding_pipeline import embed_chunks
+from db.index_store import InternshipIndex, from_langchain_vectorstore, has_sidecar, write_index_meta
+from db.index_factory import build_faiss_index, choose_index_type, describe_index, set_search_params
+from db.student_store import StudentChunkStore, load_student_resume, replace_student_resume
 
-# Keep separate FAISS stores per embedding type to avoid dimension mismatch
-VECTORSTORE_PATH = os.path.join(VECTORSTORE_BASE_DIR, f"faiss_index_{embedding_type}")  # Folder, not .pkl
-STUDENT_VECTORSTORE_DIR = os.path.join(STUDENT_VECTORSTORE_BASE_DIR, f"student_faiss_{embedding_type}")  # Base folder for per-student FAISS indexes
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: only threads of this process are serialized
+    fcntl = None
 
-def build_vectorstore():
-    internships = get_all_internships()
-    docs = []
+# Keep separate FAISS stores per embedding type to avoid dimension mismatch. Paths depend on
+# the resolved provider, so they are computed on first use rather than at import. Functions
+# take an explicit provider so a job that resolved it once keeps using the same store even
+# if the embeddings fallback reroutes meanwhile.
+def vectorstore_path(provider: str = None) -> str:
+    return os.path.join(VECTORSTORE_BASE_DIR, f"faiss_index_{provider or get_embedding_type()}")  # Folder, not .pkl
+
+
+def student_vectorstore_dir(provider: str = None) -> str:
+    """Legacy per-student FAISS indexes (migrated on load)."""
+    return os.path.join(STUDENT_VECTORSTORE_BASE_DIR, f"student_faiss_{provider or get_embedding_type()}")
+
+
+# One per provider: the embeddings fallback can reroute between providers at runtime
+_index_embeddings = {}
+_student_stores = {}
+
+
+def get_index_embeddings(provider: str = None) -> CachedEmbeddings:
+    """Internship chunks are embedded through the content-hash cache so rebuilds only pay for new/changed text.
 
-    for i in internships:
-        text = f"JobID: {i.job_id}\nTitle: {i.title}\nDescription: {i.description}\nSkills: {i.skills_required}\nLocation: {i.location}"
-        docs.append(Document(page_content=text, metadata={"job_id": i.job_id}))
+    Bound to the provider's concrete model, never to the rerouting proxy, so every
+    vector it returns or caches is in that provider's space.
+    """
+    provider = provider or get_embedding_type()
+    if provider not in _index_embeddings:
+        _index_embeddings[provider] = CachedEmbeddings(get_provider_embeddings(provider), provider)
+    return _index_embeddings[provider]
 
+
+def get_student_store(provider: str = None) -> StudentChunkStore:
+    """All students' resume chunks, sharded by student_id (see db/student_store.py)."""
+    provider = provider or get_embedding_type()
+    if provider not in _student_stores:
+        store_dir = os.path.join(STUDENT_VECTORSTORE_BASE_DIR, f"student_store_{provider}")
+        _student_stores[provider] = StudentChunkStore(store_dir, STUDENT_STORE_SHARDS)
+    return _student_stores[provider]
+
+# Throughput stats of the most recent full build (see utils/embedding_pipeline.py)
+last_build_stats = {}
+
+def internship_text(i) -> str:
+    """The text an internship is embedded (and skill-scored) from."""
+    return f"JobID: {i.job_id}\nTitle: {i.title}\nDescription: {i.description}\nSkills: {i.skills_required}\nLocation: {i.location}"
+
+
+def split_internship_documents(internships):
+    """Split internships into chunk documents carrying their job_id."""
     splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    split_docs = splitter.split_documents(docs)
+    return splitter.split_documents([
+        Document(page_content=internship_text(i), metadata={"job_id": i.job_id}) for i in internships
+    ])
+
+
+# Versioned layout: <vectorstore_path>/versions/<version>/ holds a complete index and
+# <vectorstore_path>/CURRENT names the live version. Builds go to a staging directory
+# and the pointer is flipped atomically, so readers never see a half-written index.
+def versions_dir(provider: str = None) -> str:
+    return os.path.join(vectorstore_path(provider), "versions")
+
+
+def current_pointer(provider: str = None) -> str:
+    return os.path.join(vectorstore_path(provider), "CURRENT")
+
+
+# Publishes (read CURRENT -> derive/build -> save_index_version) are serialized across
+# processes with an flock on <VECTORSTORE_DIR>/.faiss_index.write.lock (one lock for every
+# provider's index, so nested publishes never wait on each other), so two workers (or a worker
+# and add_new_internships.py) never derive versions from the same CURRENT and drop each
+# other's changes. Reentrant within a thread: a locked publish may build a missing index.
+_write_lock = threading.RLock()
+_write_lock_file = None
+_write_lock_depth = 0
+
+
+@contextmanager
+def index_write_lock():
+    global _write_lock_file, _write_lock_depth
+    with _write_lock:
+        if _write_lock_depth == 0:
+            os.makedirs(VECTORSTORE_BASE_DIR, exist_ok=True)
+            _write_lock_file = open(os.path.join(VECTORSTORE_BASE_DIR, ".faiss_index.write.lock"), "a+")
+            if fcntl is not None:
+                fcntl.flock(_write_lock_file.fileno(), fcntl.LOCK_EX)
+        _write_lock_depth += 1
+        try:
+            yield
+        finally:
+            _write_lock_depth -= 1
+            if _write_lock_depth == 0:
+                if fcntl is not None:
+                    fcntl.flock(_write_lock_file.fileno(), fcntl.LOCK_UN)
+                _write_lock_file.close()
+                _write_lock_file = None
+
+
+def _fsync_path(path: str):
+    """fsync a file or directory (directories are skipped where the OS doesn't allow it)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def current_index_version(provider: str = None):
+    """Name of the live index version, or None for a legacy/unbuilt index."""
+    try:
+        with open(current_pointer(provider), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def current_index_dir(provider: str = None) -> str:
+    """Directory that holds the live index files."""
+    version = current_index_version(provider)
+    if version:
+        return os.path.join(versions_dir(provider), version)
+    # Legacy layout: index files directly inside the vectorstore folder
+    return vectorstore_path(provider)
+
 
-    # Ensure directory exists
-    os.makedirs(VECTORSTORE_PATH, exist_ok=True)
-    vectorstore = FAISS.from_documents(split_docs, embeddings)
-    vectorstore.save_local(VECTORSTORE_PATH)  # ✅ Save using FAISS
-    print("✅ Vector store built/updated")
+def has_index(provider: str = None) -> bool:
+    """Whether an internship index has been built for provider."""
+    return os.path.exists(os.path.join(current_index_dir(provider), "index.faiss"))
 
-def load_vectorstore():
+
+def save_index_version(vectorstore: InternshipIndex, provider: str = None) -> str:
+    """Write the index to a fresh version directory of provider's store and atomically make it live."""
+    provider = provider or vectorstore.provider or get_embedding_type()
+    with index_write_lock():
+        return _save_index_version(vectorstore, provider)
+
+
+def _save_index_version(vectorstore: InternshipIndex, provider: str) -> str:
+    root = versions_dir(provider)
+    os.makedirs(root, exist_ok=True)
+    version = f"v{time.time_ns()}"
+    staging = os.path.join(root, f".staging-{version}")
+    vectorstore.save(staging)
+    write_index_meta(staging, {
+        **describe_index(vectorstore.index),
+        "format": "columnar",
+        "has_texts": vectorstore.has_texts,
+        "provider": provider,
+        "model": EMBEDDING_MODELS.get(provider),
+        "created_at": datetime.utcnow().isoformat(),
+    })
+    for name in os.listdir(staging):
+        _fsync_path(os.path.join(staging, name))
+    _fsync_path(staging)
+
+    final_dir = os.path.join(root, version)
+    os.rename(staging, final_dir)
+    _fsync_path(root)
+
+    pointer = current_pointer(provider)
+    tmp_pointer = f"{pointer}.tmp-{os.getpid()}"
+    with open(tmp_pointer, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_pointer, pointer)
+    _fsync_path(vectorstore_path(provider))
+
+    _prune_index_versions(keep=version, provider=provider)
+    return version
+
+
+def _version_ns(version: str) -> int:
+    try:
+        return int(version[1:])
+    except ValueError:
+        return 0
+
+
+def _prune_index_versions(keep: str, provider: str = None, grace_seconds: float = VECTORSTORE_PRUNE_GRACE_SECONDS):
+    """Delete old versions beyond VECTORSTORE_KEEP_VERSIONS (never the live one).
+
+    Other workers may still have an older version resident until their next
+    reload, so a version is only removed once the version that replaced it has
+    been live for grace_seconds. Version names are their creation time.
+    """
+    try:
+        versions = sorted((v for v in os.listdir(versions_dir(provider)) if v.startswith("v")), key=_version_ns)
+    except OSError:
+        return
+    cutoff = time.time_ns() - int(grace_seconds * 1e9)
+    for version, successor in zip(versions[:-VECTORSTORE_KEEP_VERSIONS], versions[1:]):
+        if version != keep and _version_ns(successor) <= cutoff:
+            shutil.rmtree(os.path.join(versions_dir(provider), version), ignore_errors=True)
+
+
+def vectorstore_from_vectors(docs, vectors: np.ndarray, index_type: str = None, provider: str = None) -> InternshipIndex:
+    """Build a compact internship index of the configured type from precomputed chunk vectors."""
+    provider = provider or get_embedding_type()
+    if index_type is None:
+        index_type = VECTORSTORE_INDEX_TYPE
+        if index_type == "auto":
+            index_type = choose_index_type(len(docs), VECTORSTORE_IVF_THRESHOLD, VECTORSTORE_HNSW_THRESHOLD)
+    index, params = build_faiss_index(
+        vectors,
+        index_type,
+        nlist=VECTORSTORE_IVF_NLIST,
+        nprobe=VECTORSTORE_NPROBE,
+        hnsw_m=VECTORSTORE_HNSW_M,
+        ef_search=VECTORSTORE_EF_SEARCH,
+        quantization=VECTORSTORE_QUANTIZATION,
+        pq_m=VECTORSTORE_PQ_M,
+    )
+    print(f"Built {params['index_type']} index ({params['quantization']}) over {len(docs)} chunks")
+    texts = [d.page_content for d in docs] if VECTORSTORE_STORE_TEXTS else None
+    # Quantized indexes keep float32 vectors on disk so the top candidates can be re-ranked exactly
+    full_vectors = vectors if params["quantization"] != "none" and VECTORSTORE_RERANK_FACTOR > 1 else None
+    vectorstore = InternshipIndex.from_vectors(index, [d.metadata["job_id"] for d in docs], texts, get_index_embeddings(provider), full_vectors)
+    vectorstore.rerank_factor = VECTORSTORE_RERANK_FACTOR
+    vectorstore.provider = provider
+    return vectorstore
+
+
+def build_vectorstore(provider: str = None):
+    """Full rebuild from the Internship table, published under the index write lock.
+
+    Builds provider's index, or the currently routed provider's when omitted.
+    """
+    with index_write_lock():
+        return _build_vectorstore(provider)
+
+
+def _build_vectorstore(provider: str = None):
+    global last_build_stats
+    # Resolve the model once for the whole build: if the fallback reroutes midway, the
+    # remaining batches fail rather than mixing two providers' vectors in one index
+    if provider is None:
+        model, provider = get_embeddings_with_fallback()
+    else:
+        model = get_provider_embeddings(provider)
+    internships = get_all_internships()
+    split_docs = split_internship_documents(internships)
+
+    texts = [d.page_content for d in split_docs]
+    vectors, last_build_stats = embed_chunks(texts, model, provider)
+    vectorstore = vectorstore_from_vectors(split_docs, np.asarray(vectors, dtype=np.float32), provider=provider)
+    version = save_index_version(vectorstore, provider)  # ✅ Save to a new version and flip CURRENT
+    print(f"✅ Vector store built/updated (version {version}, {last_build_stats['chunks_per_sec']} chunks/sec)")
+    return vectorstore
+
+def load_vectorstore(index_dir: str = None, provider: str = None) -> InternshipIndex:
+    """Load provider's internship index, honouring VECTORSTORE_LOAD_MODE ("memory" or "mmap").
+
+    Versions written before the columnar format (pickled LangChain docstore) are
+    converted once and republished as a new version.
+    """
+    provider = provider or get_embedding_type()
     # Check if the directory exists and contains the required FAISS index files
-    index_file = os.path.join(VECTORSTORE_PATH, "index.faiss")
-    if not os.path.exists(VECTORSTORE_PATH) or not os.path.exists(index_file):
+    index_dir = index_dir or current_index_dir(provider)
+    index_file = os.path.join(index_dir, "index.faiss")
+    if not os.path.exists(index_file):
         print("FAISS index not found, building vectorstore...")
-        build_vectorstore()
-    return FAISS.load_local(VECTORSTORE_PATH, embeddings, allow_dangerous_deserialization=True)  # ✅ Load using FAISS
+        build_vectorstore(provider)
+        index_dir = current_index_dir(provider)
+
+    if not has_sidecar(index_dir):
+        print("Converting legacy pickled index to the columnar format...")
+        legacy = FAISS.load_local(index_dir, get_index_embeddings(provider), allow_dangerous_deserialization=True)
+        save_index_version(from_langchain_vectorstore(legacy, get_index_embeddings(provider)), provider)
+        index_dir = current_index_dir(provider)
+
+    vectorstore = InternshipIndex.load(index_dir, get_index_embeddings(provider), mmap=VECTORSTORE_LOAD_MODE == "mmap")
+    set_search_params(vectorstore.index, VECTORSTORE_NPROBE, VECTORSTORE_EF_SEARCH)
+    vectorstore.rerank_factor = VECTORSTORE_RERANK_FACTOR
+    vectorstore.provider = provider
+    return vectorstore
 
 
 
 
 
 def build_or_update_student_vectorstore(student_id: str, resume_text: str):
-	"""Create or update a FAISS vectorstore for a specific student.
+	"""Store a student's resume chunks in the consolidated student store.
 
 	- Splits the provided resume text into chunks
-	- Embeds and stores them in a per-student FAISS index under STUDENT_VECTORSTORE_DIR/{student_id}
-	- Re-usable later via load_student_vectorstore(student_id)
+	- Replaces the student's previous chunks (a re-upload never duplicates vectors)
+	- Only chunks the student did not already have are embedded
 	"""
-	# Ensure base directory exists
-	os.makedirs(STUDENT_VECTORSTORE_DIR, exist_ok=True)
+	splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+	chunks = splitter.split_text(resume_text or "")
+	provider = get_embedding_type()  # Store and embeddings must belong to the same provider
+	embedded = replace_student_resume(get_student_store(provider), get_index_embeddings(provider), student_id, chunks)
+	print(f"✅ Student vectors stored for student_id={student_id} ({len(chunks)} chunks, {embedded} embedded)")
 
-	student_store_path = os.path.join(STUDENT_VECTORSTORE_DIR, str(student_id))
 
-	# Prepare documents from resume text
-	splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-	chunks = splitter.split_documents([Document(page_content=resume_text, metadata={"student_id": str(student_id)})])
-
-	# If the student's index exists, load and append. Otherwise, create new
-	index_file = os.path.join(student_store_path, "index.faiss")
-	if os.path.exists(student_store_path) and os.path.exists(index_file):
-		try:
-			vectorstore = FAISS.load_local(student_store_path, embeddings, allow_dangerous_deserialization=True)
-			vectorstore.add_documents(chunks)
-		except Exception as e:
-			print(f"⚠️ Error loading existing student vectorstore for {student_id}: {e}")
-			print("Creating new vectorstore...")
-			vectorstore = FAISS.from_documents(chunks, embeddings)
-	else:
-		vectorstore = FAISS.from_documents(chunks, embeddings)
-
-	# Persist to disk
-	vectorstore.save_local(student_store_path)
-	print(f"✅ Student vector store built/updated for student_id={student_id}")
+def _migrate_legacy_student_vectorstore(student_id: str, provider: str):
+	"""Move a student's old per-student FAISS directory into the shared store."""
+	legacy_path = os.path.join(student_vectorstore_dir(provider), str(student_id))
+	if not os.path.exists(os.path.join(legacy_path, "index.faiss")):
+		return
+	try:
+		legacy = FAISS.load_local(legacy_path, embeddings, allow_dangerous_deserialization=True)
+		vectors = legacy.index.reconstruct_n(0, legacy.index.ntotal)
+		unique = {}
+		for i in range(legacy.index.ntotal):
+			text = legacy.docstore._dict[legacy.index_to_docstore_id[i]].page_content
+			unique.setdefault(text_hash(text), (text, vectors[i]))
+		get_student_store(provider).replace(student_id, [(h, t, v) for h, (t, v) in unique.items()])
+		shutil.rmtree(legacy_path, ignore_errors=True)
+		print(f"✅ Migrated legacy student vectorstore for student_id={student_id} ({len(unique)} unique chunks)")
+	except Exception as e:
+		print(f"⚠️ Could not migrate legacy student vectorstore for {student_id}: {e}")
 
 
 def load_student_vectorstore(student_id: str):
-	"""Load the FAISS vectorstore for a specific student. Returns None if not found."""
-	student_store_path = os.path.join(STUDENT_VECTORSTORE_DIR, str(student_id))
-	index_file = os.path.join(student_store_path, "index.faiss")
-	if not os.path.exists(student_store_path) or not os.path.exists(index_file):
-		return None
-	return FAISS.load_local(student_store_path, embeddings, allow_dangerous_deserialization=True)
-
+	"""Load one student's resume vectors (O(their chunks)). Returns None if not found."""
+	provider = get_embedding_type()
+	vectors = load_student_resume(get_student_store(provider), student_id, get_index_embeddings(provider))
+	if vectors is None:
+		_migrate_legacy_student_vectorstore(student_id, provider)
+		vectors = load_student_resume(get_student_store(provider), student_id, get_index_embeddings(provider))
+	return vectors
@@ -9,7 +9,7 @@ import sys
 import logging
 from sqlalchemy import create_engine, text
 from sqlalchemy.exc import OperationalError
-from db.database import Base, engine
+from db.database import Base, engine, add_missing_columns
 from db.models import Internship, User, ResumeSummary
 from utils.config import DATABASE_URL
 
@@ -36,6 +36,7 @@ def create_tables():
     try:
         logger.info("Creating database tables...")
         Base.metadata.create_all(bind=engine)
+        add_missing_columns(ResumeSummary.__table__)
         logger.info("✅ Database tables created successfully")
         return True
     except Exception as e:
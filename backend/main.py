@@ -4,11 +4,23 @@ from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.middleware.gzip import GZipMiddleware
 import os
+import threading
 import logging
-from db.database import Base, engine
-from db.models import Internship
+from fastapi.responses import JSONResponse
+from db.database import Base, engine, add_missing_columns
+from db.models import Internship, ResumeSummary
+from db.index_manager import resident_index
 from routes import internship_routes, student_routes
-from utils.config import CORS_ORIGINS
+from utils.config import (
+    CORS_ORIGINS,
+    EMBEDDINGS_WARMUP,
+    SESSION_BACKEND,
+    SESSION_TTL_SECONDS,
+    embeddings_status,
+    get_embeddings_with_fallback,
+)
+from utils.metrics import metrics
+from utils.session_store import ServerSessionMiddleware, create_session_store
 
 # Configure logging for production
 logging.basicConfig(
@@ -21,6 +33,7 @@ logger = logging.getLogger(__name__)
 if os.getenv("RUN_DB_CREATE_ALL", "true").lower() in {"1", "true", "yes"}:
     try:
         Base.metadata.create_all(bind=engine)
+        add_missing_columns(ResumeSummary.__table__)
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Failed to create database tables: {e}")
@@ -37,12 +50,26 @@ app = FastAPI(
 # Security middleware
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])
 
-# Compression middleware
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+# Compression middleware. Streaming endpoints (paths ending in /stream) are skipped:
+# gzip would buffer their events until enough bytes accumulate.
+class StreamingAwareGZipMiddleware(GZipMiddleware):
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/stream"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+app.add_middleware(StreamingAwareGZipMiddleware, minimum_size=1000)
 
-# Session middleware for storing student_id after login
+# Session middleware for storing student_id after login. Session data stays on the
+# server (utils/session_store.py); the cookie only carries an opaque id.
 SESSION_SECRET = os.environ.get("SESSION_SECRET", "change-this-secret-in-production")
-app.add_middleware(SessionMiddleware, secret_key=SESSION_SECRET)
+if SESSION_BACKEND == "cookie":
+    app.add_middleware(SessionMiddleware, secret_key=SESSION_SECRET)
+else:
+    session_store = create_session_store(SESSION_BACKEND)
+    app.add_middleware(ServerSessionMiddleware, store=session_store, max_age=SESSION_TTL_SECONDS)
+    metrics.register("sessions", session_store.stats)
 
 # CORS middleware with production settings
 app.add_middleware(
@@ -57,6 +84,20 @@ app.add_middleware(
 app.include_router(internship_routes.router, prefix="/company", tags=["Company"])
 app.include_router(student_routes.router, prefix="/student", tags=["Student"])
 
+def _warm_up():
+    """Resolve the embeddings provider and load the internship index off the request path."""
+    try:
+        get_embeddings_with_fallback()
+        resident_index.current()
+        logger.info("✅ Warm-up finished: embeddings and internship index loaded")
+    except Exception as e:
+        logger.warning(f"⚠️ Warm-up failed, models load on first use instead: {e}")
+
+@app.on_event("startup")
+def start_warm_up():
+    if EMBEDDINGS_WARMUP:
+        threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+
 @app.get("/")
 async def root():
     """Root endpoint with basic information"""
@@ -81,6 +122,19 @@ def health():
     """Alternative health check endpoint"""
     return {"status": "healthy"}
 
+@app.get("/ready")
+def ready():
+    """Readiness: 200 once the embeddings provider and internship index are loaded, 503 before"""
+    index_stats = resident_index.stats() if embeddings_status["state"] == "ready" else {"loaded": False}
+    is_ready = embeddings_status["state"] == "ready" and index_stats["loaded"]
+    body = {"ready": is_ready, "embeddings": dict(embeddings_status), "internship_index": index_stats}
+    return JSONResponse(status_code=200 if is_ready else 503, content=body)
+
+@app.get("/metrics")
+def get_metrics():
+    """Process-local counters and cache statistics"""
+    return metrics.snapshot()
+
 # Request logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
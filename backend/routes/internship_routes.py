@@ -1,11 +1,17 @@
+import json
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from db.crud import add_internship
 from db.database import get_db
-from db.vectorstore import build_vectorstore
-from db.schemas import InternshipCreate, CompanySignup, CompanyLogin, CompanyResponse, Token
+from db.index_manager import resident_index
+from services.index_rebuild import rebuild_worker
+from db.job_filters import SearchFilters
+from services.recommendation import iter_batch_recommendations, get_top_candidates_for_internship
+from db.schemas import BatchRecommendationRequest, InternshipCreate, CompanySignup, CompanyLogin, CompanyResponse, Token
 from db import crud
-from utils.auth import create_access_token
+from utils.auth import create_access_token, get_current_company
+from utils.config import BATCH_RECOMMENDATIONS_MAX_STUDENTS, BATCH_RECOMMENDATIONS_MAX_TOP_K
 
 router = APIRouter()
 
@@ -85,5 +91,70 @@ def create_internship(internship: InternshipCreate):
         stipend=internship.stipend,
         duration=internship.duration
     )
-    build_vectorstore()  # update FAISS
-    return {"message": "Internship added", "job_id": new_internship.job_id}
\ No newline at end of file
+    resident_index.upsert_internship(new_internship)  # embed only this posting's chunks
+    return {"message": "Internship added", "job_id": new_internship.job_id}
+
+@router.put("/internships/{job_id}")
+def edit_internship(job_id: int, internship: InternshipCreate):
+    updated = crud.update_internship(job_id, **internship.dict())
+    if not updated:
+        raise HTTPException(status_code=404, detail="Internship not found")
+    resident_index.upsert_internship(updated)  # replace this job's vectors
+    return {"message": "Internship updated", "job_id": updated.job_id}
+
+@router.delete("/internships/{job_id}")
+def remove_internship(job_id: int):
+    if not crud.delete_internship(job_id):
+        raise HTTPException(status_code=404, detail="Internship not found")
+    resident_index.remove_internship(job_id)
+    return {"message": "Internship deleted", "job_id": job_id}
+
+@router.get("/internships/{job_id}/candidates")
+def internship_candidates(job_id: int, top_n: int = 10, current_company: str = Depends(get_current_company)):
+    """Top-N students for an internship, matched against stored resume embeddings."""
+    candidates = get_top_candidates_for_internship(job_id, top_n)
+    if candidates is None:
+        raise HTTPException(status_code=404, detail="Internship not found in the index")
+    return {"job_id": job_id, "candidates": candidates}
+
+@router.post("/reindex", status_code=202)
+def reindex_internships(current_company: str = Depends(get_current_company)):
+    """Queue a full rebuild of the internship index; returns immediately with a job id.
+
+    A request made while a rebuild is still queued joins that job instead of queuing another.
+    """
+    job = rebuild_worker.request_rebuild()
+    return job.to_dict()
+
+@router.get("/reindex/{job_id}")
+def reindex_status(job_id: str, current_company: str = Depends(get_current_company)):
+    """Status of a rebuild job."""
+    job = rebuild_worker.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Rebuild job not found")
+    return job.to_dict()
+
+@router.post("/batch_recommendations")
+def batch_recommendations(request: BatchRecommendationRequest, current_company: str = Depends(get_current_company)):
+    """Recommendations for many students at once, streamed as NDJSON (one student per line).
+
+    Uses the stored resume embeddings; students are scored in batches with one
+    FAISS search and one internship fetch per batch.
+    """
+    if not request.student_ids:
+        raise HTTPException(status_code=400, detail="student_ids must list at least one student")
+    if len(request.student_ids) > BATCH_RECOMMENDATIONS_MAX_STUDENTS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_RECOMMENDATIONS_MAX_STUDENTS} student_ids per request")
+    if not 1 <= request.top_k <= BATCH_RECOMMENDATIONS_MAX_TOP_K:
+        raise HTTPException(status_code=400, detail=f"top_k must be between 1 and {BATCH_RECOMMENDATIONS_MAX_TOP_K}")
+    filters = SearchFilters(
+        remote_only=request.remote_only,
+        locations=request.locations,
+        min_stipend=request.min_stipend,
+        min_duration_months=request.min_duration_months,
+        max_duration_months=request.max_duration_months,
+    )
+    results = iter_batch_recommendations(
+        crud.iter_resume_embeddings(request.student_ids), top_k=request.top_k, filters=filters
+    )
+    return StreamingResponse((json.dumps(r) + "\n" for r in results), media_type="application/x-ndjson")
@@ -1,11 +1,15 @@
+import json
 from fastapi import APIRouter, UploadFile, Request, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from typing import Optional
 from db.database import (get_db, Base, engine)
 from db import crud
 from db.schemas import UserSignup, UserLogin, UserResponse, Token
 from services.resume_parser import extract_text_from_pdf, extract_resume_summary, make_concise_summary
 from db.vectorstore import build_or_update_student_vectorstore
-from utils.config import get_embeddings_with_fallback
+from db.job_filters import SearchFilters
 from utils.auth import create_access_token, verify_token, get_current_user
 from services.recommendation import get_internship_recommendations_by_vector
 from services.recommendation import (
@@ -13,11 +17,15 @@ from services.recommendation import (
     get_internship_recommendations_by_vector,
     answer_with_context,
     detect_intent,
-    embed_text,
-    average_embeddings,
+    embed_for_search,
+    matches_index,
     augment_recommendations_with_scoring,
+    get_scored_recommendations,
     suggest_skills_to_pursue,
+    stream_answer_with_context,
+    stream_skills_to_pursue,
 )
+from services.profile_vector import blend_profile, decode_vector, describe_profile, encode_vector, push_query
 
 # Avoid creating tables during import; this is handled in app startup
 
@@ -69,8 +77,23 @@ async def login(login_data: UserLogin, db: Session = Depends(get_db)):
         user_id=user.student_id
     )
 
+def _concise_summary(db: Session, stored, max_chars: int = 800) -> str:
+    """Concise chat-context summary of a stored resume; the LLM runs once per stored summary."""
+    concise = stored.get_concise_summary(max_chars)
+    if concise is None:
+        concise = make_concise_summary(stored.summary_text, max_chars=max_chars)
+        try:
+            crud.save_concise_summary(db, stored, concise, max_chars)
+        except Exception as e:
+            print(f"⚠️ Could not store concise summary for {stored.student_id}: {e}")
+    return concise
+
+
 def _hydrate_session_from_db_if_missing(request: Request, db: Session, student_id: str):
-    """Populate session with resume summary and embedding from DB if missing."""
+    """Populate session with resume summary and embedding from DB if missing.
+
+    One indexed read; the LLM only runs for rows stored before concise summaries were kept.
+    """
     if not student_id:
         return
     has_summary = bool(request.session.get("resume_summary"))
@@ -79,9 +102,8 @@ def _hydrate_session_from_db_if_missing(request: Request, db: Session, student_i
         return
     stored = crud.get_resume_summary_with_embedding(db, str(student_id))
     if stored and stored.get_embedding():
-        concise = make_concise_summary(stored.summary_text, max_chars=800)
-        request.session["resume_summary"] = concise
-        request.session["resume_embedding"] = [round(float(x), 4) for x in stored.get_embedding()]
+        request.session["resume_summary"] = _concise_summary(db, stored)
+        request.session["resume_embedding"] = encode_vector(stored.get_embedding())
         if "chat_query_embeddings" not in request.session:
             request.session["chat_query_embeddings"] = []
 
@@ -195,10 +217,17 @@ async def analyze_resume(
         if stored_data and stored_data.get_embedding():
             # Use cached data - no API calls needed!
             # Make sure we keep a concise version for chat context
-            concise = make_concise_summary(stored_data.summary_text, max_chars=800)
-            resume_summary = {"summary": concise}
+            resume_summary = {"summary": _concise_summary(db, stored_data)}
             resume_embedding = stored_data.get_embedding()
             print(f"✅ Using cached resume data for student {student_id}")
+            if not await run_in_threadpool(matches_index, resume_embedding):
+                # Stored by another embeddings provider than the live index's: re-embed the summary once
+                try:
+                    resume_embedding, embedding_type = await run_in_threadpool(embed_for_search, resume_summary["summary"])
+                except Exception as e:
+                    raise HTTPException(status_code=500, detail=f"Embedding generation failed: {e}")
+                crud.save_resume_summary_with_embedding(db, student_id, stored_data.summary_text, resume_embedding)
+                print(f"✅ Re-embedded stored resume for student {student_id} using {embedding_type}")
         else:
             # Extract new summary from Gemini (only if not cached)
             resume_summary = extract_resume_summary(cv_text)
@@ -207,15 +236,18 @@ async def analyze_resume(
             
             # Compute embedding (only if not cached) with fallback
             try:
-                embeddings_model, embedding_type = get_embeddings_with_fallback()
-                resume_embedding = embeddings_model.embed_query(resume_summary["summary"])
+                # Off the event loop so concurrent requests can share an embedding batch; embedded
+                # by the live index's provider so the vector can be searched after a reroute
+                resume_embedding, embedding_type = await run_in_threadpool(embed_for_search, resume_summary["summary"])
                 print(f"✅ Generated new embedding for student {student_id} using {embedding_type}")
             except Exception as e:
                 raise HTTPException(status_code=500, detail=f"Embedding generation failed: {e}")
             
             # Save to database for future use
             try:
-                crud.save_resume_summary_with_embedding(db, student_id, resume_summary["summary"], resume_embedding)
+                crud.save_resume_summary_with_embedding(
+                    db, student_id, resume_summary["summary"], resume_embedding, concise_summary=resume_summary["summary"]
+                )
                 print(f"✅ Saved resume data to database for student {student_id}")
             except Exception as e:
                 print(f"Error saving to database: {e}")
@@ -229,8 +261,8 @@ async def analyze_resume(
         # ✅ Store in session for chat use
         request.session["student_id"] = student_id
         request.session["resume_summary"] = resume_summary["summary"]
-        # Store a rounded embedding to keep session small
-        request.session["resume_embedding"] = [round(float(x), 4) for x in resume_embedding]
+        # Store the embedding as base64 float32 to keep the session small
+        request.session["resume_embedding"] = encode_vector(resume_embedding)
         request.session["recommendations"] = recs
         # Initialize chat embeddings list if not present
         if "chat_query_embeddings" not in request.session:
@@ -256,7 +288,15 @@ async def analyze_resume(
 
 
 @router.get("/recommendations_scored")
-async def recommendations_scored(request: Request, current_user: str = Depends(get_current_user)):
+async def recommendations_scored(
+    request: Request,
+    current_user: str = Depends(get_current_user),
+    remote_only: bool = False,
+    location: Optional[str] = None,
+    min_stipend: Optional[int] = None,
+    min_duration_months: Optional[int] = None,
+    max_duration_months: Optional[int] = None,
+):
     student_id = current_user
     if not student_id:
         raise HTTPException(status_code=401, detail="Not logged in")
@@ -271,13 +311,90 @@ async def recommendations_scored(request: Request, current_user: str = Depends(g
     if not resume_summary or not resume_embedding:
         raise HTTPException(status_code=400, detail="No resume processed. Upload via /analyze_resume/ first.")
 
-    # Fresh recommendations by current vector
-    base_recs = get_internship_recommendations_by_vector(resume_embedding)
-    recs = augment_recommendations_with_scoring(resume_summary, base_recs, top_n=3)
+    # Recommendations by current vector; structured filters run inside the index search
+    filters = SearchFilters(
+        remote_only=remote_only,
+        locations=[l for l in (location or "").split(",")],
+        min_stipend=min_stipend,
+        min_duration_months=min_duration_months,
+        max_duration_months=max_duration_months,
+    )
+    # Repeat loads are served from the per-student cache until the resume or relevant internships change
+    recs = get_scored_recommendations(student_id, resume_summary, decode_vector(resume_embedding).tolist(), filters=filters)
     request.session["recommendations"] = recs
     return {"recommendations": recs}
 
 
+@router.get("/profile_vector")
+async def profile_vector(request: Request, current_user: str = Depends(get_current_user), include_vector: bool = False):
+    """The blended resume + chat query vector /chat recommends from, with each component's weight."""
+    student_id = current_user
+    if not student_id:
+        raise HTTPException(status_code=401, detail="Not logged in")
+    try:
+        db: Session = next(get_db())
+        _hydrate_session_from_db_if_missing(request, db, student_id)
+    except Exception:
+        pass
+    return describe_profile(
+        request.session.get("resume_embedding"),
+        request.session.get("chat_query_embeddings", []),
+        include_vector=include_vector,
+    )
+
+
+_NEW_CONVERSATION_CONTEXT = {
+    "last_topic": "",
+    "last_intent": "",
+    "conversation_stage": "initial"  # initial, discussing_internships, discussing_skills, etc.
+}
+
+
+def _update_conversation_context(request: Request, question: str):
+    """Classify the question and record it in the session's conversation context. Returns (intent, context)."""
+    conversation_context = dict(request.session.get("conversation_context", _NEW_CONVERSATION_CONTEXT))
+    intent = detect_intent(question)
+
+    # Update conversation context
+    conversation_context["last_intent"] = intent
+    conversation_context["last_topic"] = question[:100]  # Store first 100 chars
+
+    # Determine conversation stage based on intent and context
+    if intent == "recommend_internships":
+        conversation_context["conversation_stage"] = "discussing_internships"
+    elif intent == "suggest_skills":
+        conversation_context["conversation_stage"] = "discussing_skills"
+    elif any(word in question.lower() for word in ["apply", "application", "resume", "interview"]):
+        conversation_context["conversation_stage"] = "discussing_applications"
+    elif any(word in question.lower() for word in ["career", "path", "future", "goal"]):
+        conversation_context["conversation_stage"] = "discussing_career"
+
+    # Store updated context
+    request.session["conversation_context"] = conversation_context
+    return intent, conversation_context
+
+
+async def _chat_recommendations(request: Request, question: str, resume_summary: str):
+    """Recommendations for a chat query blended with the resume and recent queries. Returns (provider, recs)."""
+    # Embed current query (in the live index's vector space)
+    query_vec, provider = await run_in_threadpool(embed_for_search, question)
+
+    # Append to session history (newest PROFILE_MAX_QUERIES kept, current query last)
+    chat_query_embeddings = push_query(request.session.get("chat_query_embeddings", []), query_vec)
+    request.session["chat_query_embeddings"] = chat_query_embeddings
+
+    # Weighted blend of resume + recent queries (newer queries weigh more)
+    combined_vector = blend_profile(
+        decode_vector(request.session.get("resume_embedding")), [decode_vector(v) for v in chat_query_embeddings]
+    )
+
+    # Retrieve & score
+    recs = get_internship_recommendations_by_vector(combined_vector.tolist())
+    recs = augment_recommendations_with_scoring(resume_summary, recs, top_n=3)
+    request.session["recommendations"] = recs
+    return provider, recs
+
+
 @router.post("/chat")
 async def chat_with_ai(request: Request, question: str, current_user: str = Depends(get_current_user)):
     """Chat with AI using stored resume summary and recommendations."""
@@ -294,15 +411,9 @@ async def chat_with_ai(request: Request, question: str, current_user: str = Depe
     # Get stored data from session
     resume_summary = request.session.get("resume_summary", "")
     recommendations = request.session.get("recommendations", [])
-    resume_embedding = request.session.get("resume_embedding")
-    chat_query_embeddings = request.session.get("chat_query_embeddings", [])
     
     # Get conversation context (last few interactions for context, not full history)
-    conversation_context = request.session.get("conversation_context", {
-        "last_topic": "",
-        "last_intent": "",
-        "conversation_stage": "initial"  # initial, discussing_internships, discussing_skills, etc.
-    })
+    conversation_context = request.session.get("conversation_context", _NEW_CONVERSATION_CONTEXT)
 
     # Debug: log session data
     print(f"Session data for student {student_id}:")
@@ -317,49 +428,11 @@ async def chat_with_ai(request: Request, question: str, current_user: str = Depe
         )
 
     try:
-        # Determine intent
-        intent = detect_intent(question)
-        
-        # Update conversation context
-        conversation_context["last_intent"] = intent
-        conversation_context["last_topic"] = question[:100]  # Store first 100 chars
-        
-        # Determine conversation stage based on intent and context
-        if intent == "recommend_internships":
-            conversation_context["conversation_stage"] = "discussing_internships"
-        elif intent == "suggest_skills":
-            conversation_context["conversation_stage"] = "discussing_skills"
-        elif any(word in question.lower() for word in ["apply", "application", "resume", "interview"]):
-            conversation_context["conversation_stage"] = "discussing_applications"
-        elif any(word in question.lower() for word in ["career", "path", "future", "goal"]):
-            conversation_context["conversation_stage"] = "discussing_career"
-        
-        # Store updated context
-        request.session["conversation_context"] = conversation_context
+        # Determine intent and update the conversation context
+        intent, conversation_context = _update_conversation_context(request, question)
 
         if intent == "recommend_internships":
-            # Embed current query
-            query_vec, provider = embed_text(question)
-            query_vec_rounded = [round(float(x), 4) for x in query_vec]
-
-            # Append to session history (cap to last 3)
-            chat_query_embeddings.append(query_vec_rounded)
-            chat_query_embeddings = chat_query_embeddings[-3:]
-            request.session["chat_query_embeddings"] = chat_query_embeddings
-
-            # Combine resume + past chat + current query
-            vectors_to_average = []
-            if resume_embedding:
-                vectors_to_average.append(resume_embedding)
-            vectors_to_average.extend(chat_query_embeddings)
-            vectors_to_average.append(query_vec_rounded)
-            combined_vector = average_embeddings(vectors_to_average)
-
-            # Retrieve & score
-            recs = get_internship_recommendations_by_vector(combined_vector)
-            recs = augment_recommendations_with_scoring(resume_summary, recs, top_n=3)
-            request.session["recommendations"] = recs
-
+            provider, recs = await _chat_recommendations(request, question, resume_summary)
             return {
                 "intent": intent,
                 "provider": provider,
@@ -383,4 +456,70 @@ async def chat_with_ai(request: Request, question: str, current_user: str = Depe
         }
     except Exception as e:
         print(f"Error in chat: {e}")
-        raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_with_ai_stream(request: Request, question: str, current_user: str = Depends(get_current_user)):
+    """/chat as Server-Sent Events, sending the answer's tokens as they are generated.
+
+    Events: "meta" {intent}, then "token" {model, text} pieces of the answer,
+    "reset" {model} when the tokens so far must be discarded (the answer restarts
+    on the fallback model), "recommendations" {provider, recommendations} for
+    recommendation questions, and a final "done" {model} or "error" {detail}.
+    """
+    student_id = current_user
+    if not student_id:
+        raise HTTPException(status_code=401, detail="Not logged in")
+
+    # Hydrate from DB if needed
+    try:
+        db: Session = next(get_db())
+        _hydrate_session_from_db_if_missing(request, db, student_id)
+    except Exception:
+        pass
+    resume_summary = request.session.get("resume_summary", "")
+    recommendations = request.session.get("recommendations", [])
+    if not resume_summary:
+        raise HTTPException(
+            status_code=400,
+            detail="No resume processed. Please upload resume first via /analyze_resume/"
+        )
+
+    # Session changes must happen before the response starts (the session is saved with the headers)
+    intent, conversation_context = _update_conversation_context(request, question)
+    if intent == "recommend_internships":
+        try:
+            provider, recs = await _chat_recommendations(request, question, resume_summary)
+        except Exception as e:
+            print(f"Error in chat stream: {e}")
+            raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
+        events = iter([("recommendations", provider, recs), ("done", provider, "")])
+    elif intent == "suggest_skills":
+        events = stream_skills_to_pursue(question, resume_summary)
+    else:
+        events = stream_answer_with_context(student_id, question, resume_summary, recommendations, conversation_context)
+
+    def event_stream():
+        yield _sse("meta", {"intent": intent})
+        try:
+            for event, model, payload in events:
+                if event == "token":
+                    yield _sse("token", {"model": model, "text": payload})
+                elif event == "recommendations":
+                    yield _sse("recommendations", {"provider": model, "recommendations": payload})
+                else:
+                    yield _sse(event, {"model": model})
+        except Exception as e:
+            print(f"Error in chat stream: {e}")
+            yield _sse("error", {"detail": f"Chat error: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
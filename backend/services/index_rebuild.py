@@ -0,0 +1,107 @@
+"""Background worker for full internship index rebuilds.
+
+Rebuild requests return immediately with a job id. A single worker thread runs
+the builds; requests that arrive while a build is queued are coalesced into
+that queued job, so a burst of reindex calls costs at most one extra build.
+
+Jobs can target one embeddings provider's index. The resident index manager
+queues one here instead of building on the request path: when the embeddings
+fallback reroutes to a provider whose index has not been built yet, and when an
+HNSW index would have to drop an edited or removed job's vectors.
+"""
+import uuid
+import threading
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from db import vectorstore
+from db.index_manager import resident_index
+
+logger = logging.getLogger(__name__)
+
+MAX_TRACKED_JOBS = 50
+
+
+class RebuildJob:
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"  # queued, running, succeeded, failed
+        self.requested_at = datetime.utcnow().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self.coalesced_requests = 1
+        self.version = None
+        self.stats = None
+        self.error = None
+        self.provider = None  # None = the provider the embeddings fallback routes to
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "requested_at": self.requested_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "coalesced_requests": self.coalesced_requests,
+            "version": self.version,
+            "provider": self.provider,
+            "stats": self.stats,
+            "error": self.error,
+        }
+
+
+class IndexRebuildWorker:
+    """Runs full rebuilds one at a time on a daemon thread."""
+
+    def __init__(self, build=vectorstore.build_vectorstore):
+        self.build = build
+        self._cond = threading.Condition()
+        self._jobs = OrderedDict()
+        self._queued = OrderedDict()  # provider -> job waiting to start
+        self._thread = None
+
+    def request_rebuild(self, provider: str = None) -> RebuildJob:
+        """Queue a rebuild (of provider's index), or join the one that is already waiting to start."""
+        with self._cond:
+            if provider in self._queued:
+                self._queued[provider].coalesced_requests += 1
+                return self._queued[provider]
+            job = RebuildJob()
+            job.provider = provider
+            self._queued[provider] = job
+            self._jobs[job.id] = job
+            while len(self._jobs) > MAX_TRACKED_JOBS:
+                self._jobs.popitem(last=False)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="index-rebuild", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+            return job
+
+    def get_job(self, job_id: str):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queued:
+                    self._cond.wait()
+                _, job = self._queued.popitem(last=False)
+                job.status = "running"
+                job.started_at = datetime.utcnow().isoformat()
+            try:
+                generation = resident_index.rebuild(lambda: self.build(job.provider))
+                job.version = generation.signature if isinstance(generation.signature, str) else None
+                job.stats = dict(vectorstore.last_build_stats)
+                job.status = "succeeded"
+            except Exception as e:
+                logger.error(f"❌ Internship index rebuild {job.id} failed: {e}")
+                job.error = str(e)
+                job.status = "failed"
+            finally:
+                job.finished_at = datetime.utcnow().isoformat()
+
+
+rebuild_worker = IndexRebuildWorker()
+resident_index.set_rebuild_handler(rebuild_worker.request_rebuild)
@@ -0,0 +1,91 @@
+"""Student profile vectors for chat recommendations.
+
+The profile is a weighted blend of the resume embedding and the student's
+recent chat queries: the resume keeps PROFILE_RESUME_WEIGHT of the total and
+the queries share the rest with recency decay (each older query weighs
+PROFILE_QUERY_DECAY times the next newer one). The blend is L2-normalized so
+it stays on the same scale as the unit-length embeddings it is searched
+against. Vectors are kept in the session as base64 float32.
+"""
+import base64
+from typing import List, Optional, Sequence
+import numpy as np
+from utils.config import PROFILE_RESUME_WEIGHT, PROFILE_QUERY_DECAY, PROFILE_MAX_QUERIES
+
+
+def encode_vector(vector) -> str:
+    """Compact session form: base64 of the float32 bytes."""
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def decode_vector(value) -> Optional[np.ndarray]:
+    """Inverse of encode_vector; also accepts the older plain-list session values."""
+    if value is None or len(value) == 0:
+        return None
+    if isinstance(value, str):
+        return np.frombuffer(base64.b64decode(value), dtype=np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+
+def l2_normalize(vector: np.ndarray) -> np.ndarray:
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm > 0 else vector
+
+
+def profile_weights(has_resume: bool, query_count: int, resume_weight: float = PROFILE_RESUME_WEIGHT,
+                    decay: float = PROFILE_QUERY_DECAY) -> np.ndarray:
+    """Blend weights for [resume?, oldest query, ..., newest query], summing to 1."""
+    query_weights = decay ** np.arange(query_count - 1, -1, -1, dtype=np.float64)
+    if query_count:
+        query_weights *= (1.0 - resume_weight if has_resume else 1.0) / query_weights.sum()
+    if has_resume:
+        return np.concatenate([[resume_weight if query_count else 1.0], query_weights])
+    return query_weights
+
+
+def blend_profile(resume_vector=None, query_vectors: Sequence = (), resume_weight: float = PROFILE_RESUME_WEIGHT,
+                  decay: float = PROFILE_QUERY_DECAY) -> Optional[np.ndarray]:
+    """L2-normalized float32 blend of the resume vector and chat queries (oldest first).
+
+    Vectors whose dimension differs from the first one (e.g. from another
+    embedding provider) are ignored. Returns None when there is nothing to blend.
+    """
+    vectors = ([resume_vector] if resume_vector is not None else []) + list(query_vectors)
+    vectors = [np.asarray(v, dtype=np.float32) for v in vectors if v is not None and len(v)]
+    if not vectors:
+        return None
+    dim = vectors[0].shape[0]
+    has_resume = resume_vector is not None and len(resume_vector) == dim
+    queries = [v for v in vectors[1 if has_resume else 0:] if v.shape[0] == dim]
+    stacked = np.vstack(([vectors[0]] if has_resume else []) + queries)
+    weights = profile_weights(has_resume, len(queries), resume_weight, decay).astype(np.float32)
+    return l2_normalize(weights @ stacked).astype(np.float32)
+
+
+def push_query(history: List[str], query_vector, max_queries: int = PROFILE_MAX_QUERIES) -> List[str]:
+    """Append an encoded query vector to the session history, keeping the newest max_queries."""
+    return (list(history) + [encode_vector(query_vector)])[-max_queries:]
+
+
+def describe_profile(resume_vector=None, query_vectors: Sequence = (), include_vector: bool = False) -> dict:
+    """Blend plus its ingredients, for inspecting why recommendations moved."""
+    resume = decode_vector(resume_vector)
+    queries = [q for q in (decode_vector(v) for v in query_vectors) if q is not None]
+    profile = blend_profile(resume, queries)
+    if profile is None:
+        return {"dim": 0, "components": []}
+    dim = profile.shape[0]
+    has_resume = resume is not None and resume.shape[0] == dim
+    queries = [q for q in queries if q.shape[0] == dim]
+    weights = profile_weights(has_resume, len(queries))
+    sources = (["resume"] if has_resume else []) + [f"query[-{len(queries) - i}]" for i in range(len(queries))]
+    vectors = ([resume] if has_resume else []) + queries
+    components = [
+        {"source": source, "weight": round(float(weight), 4),
+         "cosine_to_profile": round(float(l2_normalize(vector) @ profile), 4)}
+        for source, weight, vector in zip(sources, weights, vectors)
+    ]
+    data = {"dim": dim, "resume_weight": PROFILE_RESUME_WEIGHT, "query_decay": PROFILE_QUERY_DECAY, "components": components}
+    if include_vector:
+        data["vector"] = [round(float(x), 6) for x in profile]
+    return data
@@ -1,11 +1,29 @@
-from db.vectorstore import load_vectorstore
+from db.index_manager import resident_index, search_chunks
+from db.resume_index import resume_index
+from services.recommendation_cache import recommendation_cache, recommendation_fingerprint
+from services.response_cache import llm_response_cache
+from utils.query_embedding_cache import query_embedding_cache
+from utils.embedding_dispatcher import dispatch_embed_query
+from db.job_filters import SearchFilters, search_parameters
+from db.vectorstore import internship_text
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_community.chat_message_histories import FileChatMessageHistory
 from langchain.schema import HumanMessage, AIMessage
 from langchain_community.chat_models import ChatOllama  # ✅ fallback LLaMA
 from google.api_core.exceptions import ResourceExhausted
-from utils.config import get_embeddings_with_fallback
+from utils.config import (
+    get_embeddings_with_fallback,
+    get_provider_embeddings,
+    RECOMMENDATION_SCORE_COMBINE,
+    RECOMMENDATION_OVERFETCH,
+    RECOMMENDATION_BATCH_SIZE,
+    CIRCUIT_BREAKER_SETTINGS,
+)
+from utils.circuit_breaker import get_breaker
+from utils.metrics import metrics
 import os
+import json
+import numpy as np
 import logging
 from typing import List, Dict, Tuple
 import re
@@ -20,6 +38,10 @@ llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.3)
 # Fallback model (runs locally via Ollama)
 fallback_llm = ChatOllama(model="llama3")
 
+# Per-model circuit breakers (state and routing counters are exposed on /metrics)
+gemini_llm_breaker = get_breaker("llm.gemini", **CIRCUIT_BREAKER_SETTINGS)
+llama_llm_breaker = get_breaker("llm.llama", **CIRCUIT_BREAKER_SETTINGS)
+
 # Base folder for storing per-student chat histories
 CHAT_HISTORY_DIR = os.path.join("data", "chat_histories")
 os.makedirs(CHAT_HISTORY_DIR, exist_ok=True)
@@ -43,29 +65,136 @@ def save_conversation_context(student_id: str, role: str, content: str):
         raise ValueError("Role must be either 'user' or 'ai'")
 
 
-def _invoke_with_fallback(messages):
-    """Try Gemini first, then fallback to LLaMA if quota exceeded."""
+UNKNOWN_RESPONSES = ["unknown", "i don't know", "i'm not sure"]
+UNAVAILABLE_MESSAGE = "I apologize, but I'm having trouble processing your request right now. Please try again later or rephrase your question."
+
+
+def _call_gemini(messages) -> str:
+    """Gemini's answer, or "" when its breaker is open, it failed, or the answer was empty/unknown."""
+    if not gemini_llm_breaker.allow():
+        metrics.incr("llm_gemini_skipped_open_circuit")
+        return ""
     try:
-        response = llm.invoke(messages)
-        content = response.content.strip()
-        # Check if response is empty or contains "unknown"
-        if not content or content.lower() in ["unknown", "i don't know", "i'm not sure"]:
-            logger.warning("⚠️ Gemini returned empty or unknown response, trying LLaMA")
-            response = fallback_llm.invoke(messages)
-            return {"model": "llama", "content": response.content}
-        return {"model": "gemini", "content": content}
+        content = llm.invoke(messages).content.strip()
     except ResourceExhausted as e:
+        gemini_llm_breaker.record_failure(open_now=True)
         logger.warning(f"⚠️ Gemini quota exceeded, switching to LLaMA: {e}")
-        response = fallback_llm.invoke(messages)
-        return {"model": "llama", "content": response.content}
+        return ""
     except Exception as e:
+        gemini_llm_breaker.record_failure()
         logger.error(f"⚠️ Unexpected error with Gemini, using LLaMA: {e}")
+        return ""
+    gemini_llm_breaker.record_success()
+    # Check if response is empty or contains "unknown"
+    if not content or content.lower() in UNKNOWN_RESPONSES:
+        logger.warning("⚠️ Gemini returned empty or unknown response, trying LLaMA")
+        return ""
+    return content
+
+
+def _invoke_with_fallback(messages):
+    """Try Gemini first, then fallback to LLaMA if quota exceeded.
+
+    Each model sits behind a circuit breaker: while Gemini's is open requests go
+    straight to LLaMA instead of waiting for Gemini to fail again.
+    """
+    content = _call_gemini(messages)
+    if content:
+        metrics.incr("llm_routed_gemini")
+        return {"model": "gemini", "content": content}
+
+    if llama_llm_breaker.allow():
         try:
             response = fallback_llm.invoke(messages)
+            llama_llm_breaker.record_success()
+            metrics.incr("llm_routed_llama")
             return {"model": "llama", "content": response.content}
         except Exception as fallback_error:
+            llama_llm_breaker.record_failure()
             logger.error(f"⚠️ Both models failed: {fallback_error}")
-            return {"model": "fallback", "content": "I apologize, but I'm having trouble processing your request right now. Please try again later or rephrase your question."}
+    else:
+        metrics.incr("llm_llama_skipped_open_circuit")
+    metrics.incr("llm_routed_unavailable")
+    return {"model": "fallback", "content": UNAVAILABLE_MESSAGE}
+
+
+def _stream_with_fallback(messages):
+    """Streaming _invoke_with_fallback: yields (event, model, text) as tokens arrive.
+
+    Events are "token" (a piece of the answer), "reset" (discard the tokens sent
+    so far: Gemini failed or gave an empty/unknown answer mid-stream and LLaMA
+    starts over) and a final "done" carrying the full answer. Uses the same
+    circuit breakers as _invoke_with_fallback.
+    """
+    sent = False
+    parts = []
+    if gemini_llm_breaker.allow():
+        try:
+            for chunk in llm.stream(messages):
+                if chunk.content:
+                    sent = True
+                    parts.append(chunk.content)
+                    yield "token", "gemini", chunk.content
+            gemini_llm_breaker.record_success()
+            content = "".join(parts).strip()
+            if content and content.lower() not in UNKNOWN_RESPONSES:
+                metrics.incr("llm_routed_gemini")
+                yield "done", "gemini", content
+                return
+            logger.warning("⚠️ Gemini returned empty or unknown response, trying LLaMA")
+        except ResourceExhausted as e:
+            gemini_llm_breaker.record_failure(open_now=True)
+            logger.warning(f"⚠️ Gemini quota exceeded, switching to LLaMA: {e}")
+        except Exception as e:
+            gemini_llm_breaker.record_failure()
+            logger.error(f"⚠️ Unexpected error with Gemini, using LLaMA: {e}")
+    else:
+        metrics.incr("llm_gemini_skipped_open_circuit")
+
+    if sent:
+        yield "reset", "llama", ""
+    parts = []
+    if llama_llm_breaker.allow():
+        try:
+            for chunk in fallback_llm.stream(messages):
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield "token", "llama", chunk.content
+            llama_llm_breaker.record_success()
+            metrics.incr("llm_routed_llama")
+            yield "done", "llama", "".join(parts)
+            return
+        except Exception as fallback_error:
+            llama_llm_breaker.record_failure()
+            logger.error(f"⚠️ Both models failed: {fallback_error}")
+    else:
+        metrics.incr("llm_llama_skipped_open_circuit")
+    metrics.incr("llm_routed_unavailable")
+    if parts:
+        yield "reset", "fallback", ""
+    yield "token", "fallback", UNAVAILABLE_MESSAGE
+    yield "done", "fallback", UNAVAILABLE_MESSAGE
+
+
+def _invoke_cached(kind: str, prompt: str, question: str, profile: str):
+    """_invoke_with_fallback for a single-prompt request, through the LLM response cache."""
+    return llm_response_cache.get_or_invoke(
+        kind, prompt, lambda: _invoke_with_fallback([HumanMessage(content=prompt)]),
+        question=question, profile=profile, embed=lambda text: embed_text(text)[0],
+    )
+
+
+def _stream_cached(kind: str, prompt: str, question: str, profile: str):
+    """_stream_with_fallback through the LLM response cache; a hit is sent as a single token."""
+    response, vector = llm_response_cache.lookup(kind, prompt, question, profile, lambda text: embed_text(text)[0])
+    if response is not None:
+        yield "token", response["model"], response["content"]
+        yield "done", response["model"], response["content"]
+        return
+    for event, model, text in _stream_with_fallback([HumanMessage(content=prompt)]):
+        if event == "done":
+            llm_response_cache.store(kind, prompt, {"model": model, "content": text}, profile, vector)
+        yield event, model, text
 
 
 def get_llm_recommendation_reason(student_id: str, recommendations: list) -> str:
@@ -103,123 +232,266 @@ def get_llm_recommendation_reason(student_id: str, recommendations: list) -> str
     return response["content"]
 
 
-def get_internship_recommendations(student_summary: str, top_k: int = 5):
-    """Get internship recommendations without saving to conversation history."""
+def _group_by_job(results, combine: str) -> dict:
+    """{job_id: [combined_similarity, best_similarity, best_chunk_text]} for chunk hits."""
+    jobs = {}
+    for job_id, distance, text in results:
+        if not job_id:
+            continue
+        similarity = 1.0 / (1.0 + distance)
+        if job_id not in jobs:
+            jobs[job_id] = [similarity, similarity, text]
+            continue
+        entry = jobs[job_id]
+        entry[0] = entry[0] + similarity if combine == "sum" else max(entry[0], similarity)
+        if similarity > entry[1]:
+            entry[1], entry[2] = similarity, text
+    return jobs
+
+
+def _top_jobs(jobs: dict, top_k: int):
+    ranked = sorted(jobs.items(), key=lambda item: item[1][0], reverse=True)[:top_k]
+    return [(job_id, score, text) for job_id, (score, _, text) in ranked]
+
+
+def _search_scope(generation, filters: SearchFilters = None):
+    """(FAISS search params or None, number of searchable chunks) for the given filters."""
+    vectorstore = generation.vectorstore
+    if filters is None or filters.is_empty():
+        return None, vectorstore.index.ntotal
+    label_mask = generation.job_attributes().label_mask(filters)
+    total = int(label_mask.sum())
+    if total == 0:
+        return None, 0
+    return search_parameters(vectorstore.index, label_mask), total
+
+
+def search_internship_jobs(generation, query_embedding: list, top_k: int = 5,
+                           combine: str = RECOMMENDATION_SCORE_COMBINE, filters: SearchFilters = None):
+    """Return the top_k distinct internships as (job_id, score, best_chunk_text), best first.
+
+    Internships are split into several chunks, so a plain k-NN over chunks can
+    return the same job more than once. Hits are grouped by job_id (chunk
+    similarity 1/(1+L2) combined by "max" or "sum") and the search over-fetches,
+    doubling k until top_k unique jobs are found or the index is exhausted.
+    Filters run inside FAISS through an ID selector over the allowed labels.
+    """
+    vectorstore = generation.vectorstore
+    params, total = _search_scope(generation, filters)
+    if total == 0:
+        return []
+
+    fetch_k = min(max(top_k * RECOMMENDATION_OVERFETCH, top_k), total)
+    jobs = {}
+    while fetch_k > 0:
+        jobs = _group_by_job(search_chunks(vectorstore, query_embedding, fetch_k, params), combine)
+        if len(jobs) >= top_k or fetch_k >= total:
+            break
+        fetch_k = min(fetch_k * 2, total)
+
+    return _top_jobs(jobs, top_k)
+
+
+def search_internship_jobs_batch(generation, query_embeddings, top_k: int = 5,
+                                 combine: str = RECOMMENDATION_SCORE_COMBINE, filters: SearchFilters = None):
+    """search_internship_jobs for many query vectors with one FAISS call per over-fetch round.
+
+    Only the queries that still have fewer than top_k distinct jobs are searched
+    again with a doubled k.
+    """
+    vectorstore = generation.vectorstore
+    queries = vectorstore.as_query_matrix(query_embeddings)
+    params, total = _search_scope(generation, filters)
+    if total == 0:
+        return [[] for _ in range(len(queries))]
+
+    results = [None] * len(queries)
+    pending = np.arange(len(queries))
+    fetch_k = min(max(top_k * RECOMMENDATION_OVERFETCH, top_k), total)
+    while len(pending) and fetch_k > 0:
+        distances, labels = vectorstore.search_labels_batch(queries[pending], fetch_k, params)
+        short = []
+        for row, query_index in enumerate(pending):
+            hits = [
+                (int(vectorstore.job_ids[label]), float(distance), vectorstore.text(int(label)))
+                for distance, label in zip(distances[row], labels[row]) if label >= 0
+            ]
+            jobs = _group_by_job(hits, combine)
+            results[query_index] = _top_jobs(jobs, top_k)
+            if len(jobs) < top_k:
+                short.append(query_index)
+        if fetch_k >= total:
+            break
+        pending = np.asarray(short, dtype=np.int64)
+        fetch_k = min(fetch_k * 2, total)
+    return results
+
+
+def _fetch_internships(job_ids) -> Dict:
+    """{job_id: Internship} for the given ids in one query."""
     from db.database import SessionLocal
     from db.models import Internship
-    
-    vectorstore = load_vectorstore()
-    results = vectorstore.similarity_search(student_summary, k=top_k)
 
-    # Get job IDs from vectorstore results
-    job_ids = [res.metadata.get("job_id") for res in results if res.metadata.get("job_id")]
-    
-    # Fetch full internship details from database
+    if not job_ids:
+        return {}
     db = SessionLocal()
     try:
-        internships = db.query(Internship).filter(Internship.job_id.in_(job_ids)).all()
-        
-        # Create a mapping of job_id to internship data
-        internship_map = {internship.job_id: internship for internship in internships}
-        
-        recs = []
-        for res in results:
-            job_id = res.metadata.get("job_id")
-            if job_id and job_id in internship_map:
-                internship = internship_map[job_id]
-                recs.append({
-                    "job_id": internship.job_id,
-                    "id": str(internship.job_id),
-                    "_id": str(internship.job_id),
-                    "title": internship.title,
-                    "description": internship.description,
-                    "skills": internship.skills_required,
-                    "location": internship.location,
-                    "stipend": internship.stipend,
-                    "duration": internship.duration,
-                    "internship": res.page_content  # Keep original for scoring
-                })
+        internships = db.query(Internship).filter(Internship.job_id.in_(list(job_ids))).all()
+        return {internship.job_id: internship for internship in internships}
     finally:
         db.close()
-    
+
+
+def _recommendations_from_rows(hits, internship_map: Dict) -> List[Dict]:
+    """Recommendation dicts for (job_id, score, chunk_text) hits, keeping hit order.
+
+    The index only stores chunk texts when VECTORSTORE_STORE_TEXTS is on; otherwise
+    the text used for skill scoring is rebuilt from the Internship row.
+    """
+    recs = []
+    for job_id, score, chunk_text in hits:
+        if job_id in internship_map:
+            internship = internship_map[job_id]
+            recs.append({
+                "job_id": internship.job_id,
+                "id": str(internship.job_id),
+                "_id": str(internship.job_id),
+                "title": internship.title,
+                "description": internship.description,
+                "skills": internship.skills_required,
+                "location": internship.location,
+                "stipend": internship.stipend,
+                "duration": internship.duration,
+                "score": round(score, 4),
+                "internship": chunk_text or internship_text(internship)  # Keep original for scoring
+            })
     return recs
 
 
-def get_internship_recommendations_by_vector(query_embedding: list, top_k: int = 5):
+def _hydrate_recommendations(hits) -> List[Dict]:
+    """Fetch internship rows for (job_id, score, chunk_text) hits in one query, keeping hit order."""
+    return _recommendations_from_rows(hits, _fetch_internships([job_id for job_id, _, _ in hits]))
+
+
+def get_internship_recommendations(student_summary: str, top_k: int = 5, combine: str = RECOMMENDATION_SCORE_COMBINE,
+                                   filters: SearchFilters = None):
+    """Get internship recommendations without saving to conversation history."""
+    generation = resident_index.current()
+    query_embedding, _ = embed_text(student_summary, generation.provider)
+    hits = search_internship_jobs(generation, query_embedding, top_k, combine, filters)
+    return _hydrate_recommendations(hits)
+
+
+def get_internship_recommendations_by_vector(query_embedding: list, top_k: int = 5, combine: str = RECOMMENDATION_SCORE_COMBINE,
+                                             filters: SearchFilters = None):
     """Get internship recommendations using a precomputed embedding vector."""
-    from db.database import SessionLocal
-    from db.models import Internship
-    
-    vectorstore = load_vectorstore()
+    generation = resident_index.current()
     
     try:
-        results = vectorstore.similarity_search_by_vector(query_embedding, k=top_k)
+        hits = search_internship_jobs(generation, query_embedding, top_k, combine, filters)
     except AssertionError as e:
         print(f"⚠️ Embedding dimension mismatch error: {e}")
         print("⚠️ Falling back to text-based search instead of vector search")
         # Fall back to text search if dimensions don't match
-        return get_internship_recommendations("resume text placeholder", top_k)
+        return get_internship_recommendations("resume text placeholder", top_k, combine, filters)
     except Exception as e:
         print(f"⚠️ Vector search error: {e}")
         print("⚠️ Falling back to text-based search")
-        return get_internship_recommendations("resume text placeholder", top_k)
+        return get_internship_recommendations("resume text placeholder", top_k, combine, filters)
+
+    return _hydrate_recommendations(hits)
+
+
+def iter_batch_recommendations(student_vectors, top_k: int = 5, combine: str = RECOMMENDATION_SCORE_COMBINE,
+                               filters: SearchFilters = None, batch_size: int = RECOMMENDATION_BATCH_SIZE):
+    """Yield {"student_id", "recommendations"} for an iterable of (student_id, embedding).
+
+    Students are processed in batches: one FAISS search over the batch's query
+    matrix and one bulk Internship fetch for every job it hit. Embeddings whose
+    dimension does not match the index get an "error" entry instead.
+    """
+    generation = resident_index.current()
+    dim = generation.vectorstore.index.d
+
+    def flush(batch):
+        vectors = np.asarray([vector for _, vector in batch], dtype=np.float32)
+        all_hits = search_internship_jobs_batch(generation, vectors, top_k, combine, filters)
+        internship_map = _fetch_internships({job_id for hits in all_hits for job_id, _, _ in hits})
+        for (student_id, _), hits in zip(batch, all_hits):
+            yield {"student_id": student_id, "recommendations": _recommendations_from_rows(hits, internship_map)}
+
+    batch = []
+    for student_id, vector in student_vectors:
+        if vector is None or len(vector) != dim:
+            yield {"student_id": student_id, "recommendations": [],
+                   "error": f"embedding dimension {len(vector) if vector is not None else 0} does not match index dimension {dim}"}
+            continue
+        batch.append((student_id, vector))
+        if len(batch) >= batch_size:
+            yield from flush(batch)
+            batch = []
+    if batch:
+        yield from flush(batch)
+
+
+def get_top_candidates_for_internship(job_id: int, top_n: int = 10):
+    """Top students for an internship by searching the resume index with the job's chunk vectors.
+
+    Returns None when the internship has no vectors in the live index.
+    """
+    from db.database import SessionLocal
+    from db.models import ResumeSummary
+
+    vectorstore = resident_index.current().vectorstore
+    job_vectors = vectorstore.job_vectors(job_id)
+    if not len(job_vectors):
+        return None
+    resume_index.ensure(vectorstore.index.d)
+    hits = resume_index.search(job_vectors, top_n)
+    if not hits:
+        return []
 
-    # Get job IDs from vectorstore results
-    job_ids = [res.metadata.get("job_id") for res in results if res.metadata.get("job_id")]
-    
-    # Fetch full internship details from database
     db = SessionLocal()
     try:
-        internships = db.query(Internship).filter(Internship.job_id.in_(job_ids)).all()
-        
-        # Create a mapping of job_id to internship data
-        internship_map = {internship.job_id: internship for internship in internships}
-        
-        recs = []
-        for res in results:
-            job_id = res.metadata.get("job_id")
-            if job_id and job_id in internship_map:
-                internship = internship_map[job_id]
-                recs.append({
-                    "job_id": internship.job_id,
-                    "id": str(internship.job_id),
-                    "_id": str(internship.job_id),
-                    "title": internship.title,
-                    "description": internship.description,
-                    "skills": internship.skills_required,
-                    "location": internship.location,
-                    "stipend": internship.stipend,
-                    "duration": internship.duration,
-                    "internship": res.page_content  # Keep original for scoring
-                })
+        rows = db.query(ResumeSummary.student_id, ResumeSummary.summary_text).filter(
+            ResumeSummary.student_id.in_([student_id for student_id, _ in hits])
+        ).all()
+        summaries = dict(rows)
     finally:
         db.close()
-    
-    return recs
+    return [
+        {"student_id": student_id, "score": round(score, 4), "summary": summaries.get(student_id, "")}
+        for student_id, score in hits
+    ]
 
 
-def embed_text(text: str) -> Tuple[List[float], str]:
-    """Embed text using current embeddings with fallback. Returns (vector, provider)."""
-    embeddings_model, provider = get_embeddings_with_fallback()
-    vector = embeddings_model.embed_query(text)
+def embed_text(text: str, provider: str = None) -> Tuple[List[float], str]:
+    """Embed text using current embeddings with fallback. Returns (vector, provider).
+
+    Pass provider to embed with that provider's model regardless of the routing,
+    e.g. the provider of the index the vector will be searched against.
+    Repeated phrasings are served from the query embedding cache; misses are
+    coalesced with concurrent requests by the embedding dispatcher.
+    """
+    # Resolve once: the cache key, the dispatcher and the returned provider all use this pair
+    if provider is None:
+        embeddings_model, provider = get_embeddings_with_fallback()
+    else:
+        embeddings_model = get_provider_embeddings(provider)
+    vector = query_embedding_cache.get_or_embed(
+        provider, text, lambda t: dispatch_embed_query(t, embeddings_model, provider)[0]
+    )
     return vector, provider
 
 
-def average_embeddings(vectors: List[List[float]]) -> List[float]:
-    """Compute element-wise average of multiple embedding vectors."""
-    if not vectors:
-        return []
-    length = len(vectors[0])
-    # Guard: ensure uniform length
-    filtered = [v for v in vectors if len(v) == length]
-    if not filtered:
-        return []
-    sums = [0.0] * length
-    for v in filtered:
-        for i, val in enumerate(v):
-            sums[i] += val
-    count = float(len(filtered))
-    return [s / count for s in sums]
+def embed_for_search(text: str) -> Tuple[List[float], str]:
+    """embed_text with the live internship index's provider, so the vector can be searched against it."""
+    return embed_text(text, resident_index.current().provider)
+
+
+def matches_index(vector) -> bool:
+    """Whether vector has the live internship index's dimension (e.g. a stored resume embedding)."""
+    return vector is not None and len(vector) == resident_index.current().vectorstore.index.d
 
 
 def detect_intent(user_query: str) -> str:
@@ -365,23 +637,65 @@ def augment_recommendations_with_scoring(resume_summary: str, recs: List[Dict],
     return enhanced
 
 
-def suggest_skills_to_pursue(user_query: str, resume_summary: str) -> str:
-    """LLM suggests concise, prioritized skills to learn based on resume and query."""
-    prompt = (
+def get_scored_recommendations(student_id: str, resume_summary: str, resume_embedding: list, top_k: int = 5,
+                               top_n_scored: int = 3, combine: str = RECOMMENDATION_SCORE_COMBINE,
+                               filters: SearchFilters = None) -> List[Dict]:
+    """Skill-scored recommendations for a student, served from the materialized cache when still valid."""
+    generation = resident_index.current()
+    version = generation.signature if isinstance(generation.signature, str) else None
+    cacheable = version is not None and len(resume_embedding) == generation.vectorstore.index.d
+    filter_key = json.dumps(list(filters.key()) if filters is not None else [])
+    fingerprint = recommendation_fingerprint(resume_embedding, resume_summary, top_k, combine)
+    if cacheable:
+        cached = recommendation_cache.get(student_id, filter_key, fingerprint, version)
+        if cached is not None:
+            return cached
+
+    base_recs = get_internship_recommendations_by_vector(resume_embedding, top_k, combine, filters)
+    recs = augment_recommendations_with_scoring(resume_summary, base_recs, top_n=top_n_scored)
+    if cacheable:
+        recommendation_cache.put(student_id, filter_key, fingerprint, version, resume_embedding, recs, top_k, combine)
+    return recs
+
+
+def _invalidate_cached_recommendations(previous, generation, job_ids):
+    """Index change listener: targeted invalidation of materialized recommendations."""
+    if not isinstance(previous.signature, str) or not isinstance(generation.signature, str):
+        return
+    vectorstore = generation.vectorstore
+    recommendation_cache.on_catalog_change(
+        previous.signature, generation.signature, {job_id: vectorstore.job_vectors(job_id) for job_id in job_ids}
+    )
+
+
+resident_index.add_change_listener(_invalidate_cached_recommendations)
+
+
+def _skills_prompt(user_query: str, resume_summary: str) -> str:
+    return (
         "Given the student's resume summary and question, suggest the most impactful 5-8 skills to pursue."
         " Group by theme if helpful. Keep it concise, actionable, and tailored to the profile.\n\n"
         f"Resume Summary:\n{resume_summary[:2000]}\n\n"
         f"Question:\n{user_query}\n\n"
         "Respond in bullets, each with a 1-line rationale."
     )
-    resp = _invoke_with_fallback([HumanMessage(content=prompt)])
+
+
+def suggest_skills_to_pursue(user_query: str, resume_summary: str) -> str:
+    """LLM suggests concise, prioritized skills to learn based on resume and query."""
+    prompt = _skills_prompt(user_query, resume_summary)
+    # Repeat (or, with the semantic cache, near-identical) questions on the same resume skip the LLM
+    resp = _invoke_cached("suggest_skills", prompt, user_query, resume_summary[:2000])
     return resp["content"]
 
-def answer_with_context(student_id: str, user_query: str, resume_summary: str = "", recommendations: list = None, conversation_context: dict = None) -> str:
-    """Answer a user question with resume context and recommendations, with improved context handling."""
-    # Save user's question
-    save_conversation_context(student_id, "user", user_query)
 
+def stream_skills_to_pursue(user_query: str, resume_summary: str):
+    """suggest_skills_to_pursue as (event, model, text) stream events (see _stream_with_fallback)."""
+    return _stream_cached("suggest_skills", _skills_prompt(user_query, resume_summary), user_query, resume_summary[:2000])
+
+
+def _answer_prompt(user_query: str, resume_summary: str = "", recommendations: list = None, conversation_context: dict = None):
+    """(prompt, profile) for answer_with_context; the profile is everything in the prompt except the question."""
     # Build comprehensive context
     context_parts = []
     if resume_summary:
@@ -430,25 +744,57 @@ INSTRUCTIONS:
 - Build on the conversation flow naturally
 
 RESPONSE:"""
+    return prompt, context + conversation_info
 
-    messages = [HumanMessage(content=prompt)]
 
-    response = _invoke_with_fallback(messages)
+def _fallback_answer(user_query: str) -> str:
+    """Context-aware reply when the model's answer is empty or unknown."""
+    if any(word in user_query.lower() for word in ["internship", "job", "position", "role"]):
+        return f"Based on your profile, I can see you have strong skills in your field. I've found some great internship opportunities that match your background. Would you like me to explain why these specific roles are a good fit for you, or would you prefer guidance on how to apply?"
+    elif any(word in user_query.lower() for word in ["skill", "learn", "improve", "develop"]):
+        return f"Looking at your resume and the recommended positions, I can suggest specific skills that would strengthen your profile. Would you like me to recommend skills to learn based on the job requirements, or are you interested in a particular area of development?"
+    elif any(word in user_query.lower() for word in ["apply", "application", "resume", "interview"]):
+        return f"I'd be happy to help you with the application process! I can provide guidance on tailoring your resume for specific roles, preparing for interviews, or writing compelling cover letters. What aspect of the application process would you like to focus on?"
+    else:
+        return f"I understand you're asking about '{user_query}'. Based on your profile, I can help you with:\n\n• Finding the right internship opportunities\n• Developing skills to strengthen your applications\n• Guidance on the application and interview process\n• Career path recommendations\n\nWhat would be most helpful for you right now?"
+
+
+def answer_with_context(student_id: str, user_query: str, resume_summary: str = "", recommendations: list = None, conversation_context: dict = None) -> str:
+    """Answer a user question with resume context and recommendations, with improved context handling."""
+    # Save user's question
+    save_conversation_context(student_id, "user", user_query)
+
+    prompt, profile = _answer_prompt(user_query, resume_summary, recommendations, conversation_context)
+    response = _invoke_cached("answer_with_context", prompt, user_query, profile)
     content = response["content"]
 
     # Enhanced fallback that's more helpful
-    if not content or content.lower().strip() in ["unknown", "i don't know", "i'm not sure", ""]:
-        # Provide context-aware fallback based on the question type
-        if any(word in user_query.lower() for word in ["internship", "job", "position", "role"]):
-            content = f"Based on your profile, I can see you have strong skills in your field. I've found some great internship opportunities that match your background. Would you like me to explain why these specific roles are a good fit for you, or would you prefer guidance on how to apply?"
-        elif any(word in user_query.lower() for word in ["skill", "learn", "improve", "develop"]):
-            content = f"Looking at your resume and the recommended positions, I can suggest specific skills that would strengthen your profile. Would you like me to recommend skills to learn based on the job requirements, or are you interested in a particular area of development?"
-        elif any(word in user_query.lower() for word in ["apply", "application", "resume", "interview"]):
-            content = f"I'd be happy to help you with the application process! I can provide guidance on tailoring your resume for specific roles, preparing for interviews, or writing compelling cover letters. What aspect of the application process would you like to focus on?"
-        else:
-            content = f"I understand you're asking about '{user_query}'. Based on your profile, I can help you with:\n\n• Finding the right internship opportunities\n• Developing skills to strengthen your applications\n• Guidance on the application and interview process\n• Career path recommendations\n\nWhat would be most helpful for you right now?"
+    if not content or content.lower().strip() in UNKNOWN_RESPONSES + [""]:
+        content = _fallback_answer(user_query)
 
     # Save AI's answer
     save_conversation_context(student_id, "ai", content)
 
     return content
+
+
+def stream_answer_with_context(student_id: str, user_query: str, resume_summary: str = "", recommendations: list = None,
+                               conversation_context: dict = None):
+    """answer_with_context as (event, model, text) stream events.
+
+    The question and answer are written to the chat history only once the
+    stream completes, so an interrupted stream leaves no half answer behind.
+    """
+    prompt, profile = _answer_prompt(user_query, resume_summary, recommendations, conversation_context)
+    for event, model, text in _stream_cached("answer_with_context", prompt, user_query, profile):
+        if event != "done":
+            yield event, model, text
+            continue
+        content = text
+        if not content or content.lower().strip() in UNKNOWN_RESPONSES + [""]:
+            content = _fallback_answer(user_query)
+            yield "reset", model, ""
+            yield "token", model, content
+        save_conversation_context(student_id, "user", user_query)
+        save_conversation_context(student_id, "ai", content)
+        yield "done", model, content
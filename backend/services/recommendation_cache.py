@@ -0,0 +1,175 @@
+"""Persistent per-student cache of scored recommendations.
+
+Entries are keyed by (student_id, filter key) and only served when the
+student's fingerprint (resume embedding + summary + top_k + combine mode) is
+unchanged and the entry belongs to the live catalog epoch.
+
+An epoch starts with every full rebuild. Incremental catalog changes publish
+a new index version in the same epoch after targeted invalidation: entries
+that recommended a changed job are dropped, as are entries for which a new or
+edited job scores at least their lowest recommendation (their threshold).
+Everything else stays a cache hit across the new version and across restarts.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+from typing import Dict, List, Optional
+import numpy as np
+from utils.config import RECOMMENDATION_CACHE_PATH, RECOMMENDATION_CACHE_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+
+def recommendation_fingerprint(embedding, summary: str, top_k: int, combine: str) -> str:
+    digest = hashlib.sha256(np.asarray(embedding, dtype=np.float32).tobytes())
+    digest.update(f"\0{summary}\0{top_k}\0{combine}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class RecommendationCache:
+    """SQLite-backed materialized top-K recommendations with LRU eviction."""
+
+    def __init__(self, path: str = RECOMMENDATION_CACHE_PATH, max_entries: int = RECOMMENDATION_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS recommendations ("
+                " student_id TEXT NOT NULL,"
+                " filter_key TEXT NOT NULL,"
+                " fingerprint TEXT NOT NULL,"
+                " epoch TEXT NOT NULL,"
+                " threshold REAL NOT NULL,"
+                " combine TEXT NOT NULL,"
+                " embedding BLOB NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (student_id, filter_key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_recommendations_epoch ON recommendations (epoch)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_recommendations_lru ON recommendations (last_used)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS recommendation_jobs ("
+                " student_id TEXT NOT NULL,"
+                " filter_key TEXT NOT NULL,"
+                " job_id INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_recommendation_jobs_job ON recommendation_jobs (job_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_recommendation_jobs_key ON recommendation_jobs (student_id, filter_key)")
+            conn.execute("CREATE TABLE IF NOT EXISTS catalog_versions (version TEXT PRIMARY KEY, epoch TEXT NOT NULL)")
+            self._conn = conn
+        return self._conn
+
+    def _epoch(self, conn, version: str) -> str:
+        """Epoch of an index version; a version no incremental change produced starts its own."""
+        row = conn.execute("SELECT epoch FROM catalog_versions WHERE version = ?", (version,)).fetchone()
+        return row[0] if row else version
+
+    def _delete(self, conn, keys):
+        conn.executemany("DELETE FROM recommendations WHERE student_id = ? AND filter_key = ?", keys)
+        conn.executemany("DELETE FROM recommendation_jobs WHERE student_id = ? AND filter_key = ?", keys)
+
+    def get(self, student_id: str, filter_key: str, fingerprint: str, version: str) -> Optional[List[Dict]]:
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT fingerprint, epoch, payload FROM recommendations WHERE student_id = ? AND filter_key = ?",
+                (student_id, filter_key),
+            ).fetchone()
+            if not row or row[0] != fingerprint or row[1] != self._epoch(conn, version):
+                return None
+            conn.execute(
+                "UPDATE recommendations SET last_used = ? WHERE student_id = ? AND filter_key = ?",
+                (time.time(), student_id, filter_key),
+            )
+            conn.commit()
+        return json.loads(row[2])
+
+    def put(self, student_id: str, filter_key: str, fingerprint: str, version: str, embedding,
+            recs: List[Dict], top_k: int, combine: str):
+        # With fewer than top_k results any new job could enter the list
+        threshold = min(r["score"] for r in recs) if len(recs) >= top_k else 0.0
+        with self._lock:
+            conn = self._connection()
+            key = (student_id, filter_key)
+            self._delete(conn, [key])
+            conn.execute(
+                "INSERT INTO recommendations (student_id, filter_key, fingerprint, epoch, threshold, combine,"
+                " embedding, payload, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (student_id, filter_key, fingerprint, self._epoch(conn, version), threshold, combine,
+                 np.asarray(embedding, dtype=np.float32).tobytes(), json.dumps(recs), time.time()),
+            )
+            conn.executemany(
+                "INSERT INTO recommendation_jobs (student_id, filter_key, job_id) VALUES (?, ?, ?)",
+                [(student_id, filter_key, int(r["job_id"])) for r in recs],
+            )
+            (count,) = conn.execute("SELECT COUNT(*) FROM recommendations").fetchone()
+            excess = count - self.max_entries
+            if excess > 0:
+                stale = conn.execute(
+                    "SELECT student_id, filter_key FROM recommendations ORDER BY last_used LIMIT ?", (excess,)
+                ).fetchall()
+                self._delete(conn, stale)
+            conn.commit()
+
+    def on_catalog_change(self, previous_version: str, version: str, job_vectors: Dict[int, np.ndarray],
+                          batch_size: int = 2000) -> int:
+        """Invalidate the entries an incremental change can affect and carry the rest to version.
+
+        job_vectors maps every added, edited or removed job_id to its chunk vectors
+        in the new index (empty for removed jobs). Returns how many entries were dropped.
+        """
+        with self._lock:
+            conn = self._connection()
+            epoch = self._epoch(conn, previous_version)
+            job_ids = list(job_vectors)
+            placeholders = ",".join("?" * len(job_ids))
+            affected = set(conn.execute(
+                f"SELECT student_id, filter_key FROM recommendation_jobs WHERE job_id IN ({placeholders})", job_ids
+            ).fetchall()) if job_ids else set()
+
+            candidates = [np.asarray(v, dtype=np.float32) for v in job_vectors.values() if len(v)]
+            if candidates:
+                offset = 0
+                while True:
+                    rows = conn.execute(
+                        "SELECT student_id, filter_key, threshold, combine, embedding FROM recommendations"
+                        " WHERE epoch = ? ORDER BY rowid LIMIT ? OFFSET ?",
+                        (epoch, batch_size, offset),
+                    ).fetchall()
+                    if not rows:
+                        break
+                    offset += len(rows)
+                    rows = [r for r in rows if len(r[4]) == candidates[0].shape[1] * 4]
+                    if not rows:
+                        continue
+                    embeddings = np.vstack([np.frombuffer(r[4], dtype=np.float32) for r in rows])
+                    thresholds = np.asarray([r[2] for r in rows])
+                    use_sum = np.asarray([r[3] == "sum" for r in rows])
+                    for chunks in candidates:
+                        # (students, chunks) squared L2 -> chunk similarity 1/(1+L2)
+                        distances = ((embeddings[:, None, :] - chunks[None, :, :]) ** 2).sum(axis=2)
+                        similarity = 1.0 / (1.0 + distances)
+                        score = np.where(use_sum, similarity.sum(axis=1), similarity.max(axis=1))
+                        affected.update((rows[i][0], rows[i][1]) for i in np.flatnonzero(score >= thresholds))
+
+            # Drop affected entries before the new version joins the epoch so no reader can see them as valid
+            self._delete(conn, list(affected))
+            conn.execute("INSERT OR REPLACE INTO catalog_versions (version, epoch) VALUES (?, ?)", (version, epoch))
+            conn.commit()
+        logger.info(f"Recommendation cache: {len(affected)} entries invalidated for catalog version {version}")
+        return len(affected)
+
+
+recommendation_cache = RecommendationCache()
@@ -0,0 +1,156 @@
+"""Bounded LRU + TTL cache of LLM answers (skill suggestions, contextual chat answers).
+
+Exact tier: keyed on sha256(kind, prompt), so a repeated question with the same
+resume summary, recommendations and conversation stage is answered from memory.
+
+Semantic tier (LLM_RESPONSE_CACHE_SEMANTIC): answers are also indexed by the
+unit-normalized question embedding within their profile fingerprint (a hash of
+everything in the prompt except the question). A new question reuses an answer
+when it comes from the same profile and its cosine similarity to a cached
+question is at least LLM_RESPONSE_CACHE_SIMILARITY.
+
+Only real model answers are cached; the apology returned when every model
+failed is not.
+"""
+import time
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from utils.config import (
+    LLM_RESPONSE_CACHE_SIZE,
+    LLM_RESPONSE_CACHE_TTL_SECONDS,
+    LLM_RESPONSE_CACHE_SEMANTIC,
+    LLM_RESPONSE_CACHE_SIMILARITY,
+)
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CACHEABLE_MODELS = {"gemini", "llama"}
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = LLM_RESPONSE_CACHE_SIZE, ttl_seconds: float = LLM_RESPONSE_CACHE_TTL_SECONDS,
+                 semantic: bool = LLM_RESPONSE_CACHE_SEMANTIC, similarity: float = LLM_RESPONSE_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.semantic = semantic
+        self.similarity = similarity
+        self._entries = OrderedDict()  # prompt key -> (response, stored_at, profile group)
+        self._groups = {}  # (kind, profile fingerprint) -> {prompt key: unit question vector}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop(self, key: str):
+        _, _, group = self._entries.pop(key)
+        vectors = self._groups.get(group)
+        if vectors is not None:
+            vectors.pop(key, None)
+            if not vectors:
+                del self._groups[group]
+
+    def _live(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self.ttl_seconds and time.time() - entry[1] > self.ttl_seconds:
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _nearest(self, group, vector: np.ndarray) -> Optional[Dict]:
+        vectors = self._groups.get(group)
+        if not vectors:
+            return None
+        keys = [k for k, v in vectors.items() if v.shape == vector.shape]
+        if not keys:
+            return None
+        scores = np.vstack([vectors[k] for k in keys]) @ vector
+        for i in np.argsort(-scores):
+            if scores[i] < self.similarity:
+                break
+            response = self._live(keys[i])
+            if response is not None:
+                return response
+        return None
+
+    def _put(self, key: str, response: Dict, group, vector: Optional[np.ndarray]):
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (response, time.time(), group)
+        if vector is not None:
+            self._groups.setdefault(group, {})[key] = vector
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def lookup(self, kind: str, prompt: str, question: str = "", profile: str = "",
+               embed: Optional[Callable[[str], List[float]]] = None) -> Tuple[Optional[Dict], Optional[np.ndarray]]:
+        """(cached {"model", "content"} or None, question vector to pass to store on a miss)."""
+        with self._lock:
+            response = self._live(_digest(kind, prompt))
+        if response is not None:
+            self.exact_hits += 1
+            return response, None
+
+        vector = None
+        if self.semantic and embed is not None and question:
+            try:
+                vector = np.asarray(embed(question), dtype=np.float32)
+                vector /= max(float(np.linalg.norm(vector)), 1e-12)
+            except Exception as e:
+                logger.warning(f"⚠️ Response cache could not embed the question: {e}")
+                vector = None
+            if vector is not None:
+                with self._lock:
+                    response = self._nearest((kind, _digest(profile)), vector)
+                if response is not None:
+                    self.semantic_hits += 1
+                    return response, None
+
+        self.misses += 1
+        return None, vector
+
+    def store(self, kind: str, prompt: str, response: Dict, profile: str = "", vector: Optional[np.ndarray] = None):
+        if response.get("model") in CACHEABLE_MODELS and response.get("content"):
+            with self._lock:
+                self._put(_digest(kind, prompt), response, (kind, _digest(profile)), vector)
+
+    def get_or_invoke(self, kind: str, prompt: str, invoke: Callable[[], Dict], question: str = "",
+                      profile: str = "", embed: Optional[Callable[[str], List[float]]] = None) -> Dict:
+        """Cached {"model", "content"} for prompt, calling invoke() only on a miss in both tiers."""
+        response, vector = self.lookup(kind, prompt, question, profile, embed)
+        if response is None:
+            response = invoke()
+            self.store(kind, prompt, response, profile, vector)
+        return response
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "semantic": self.semantic,
+            "similarity": self.similarity,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.exact_hits + self.semantic_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+llm_response_cache = ResponseCache()
+metrics.register("llm_response_cache", llm_response_cache.stats)
@@ -58,4 +58,11 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
             raise credentials_exception
         return user_id
     except JWTError:
-        raise credentials_exception
\ No newline at end of file
+        raise credentials_exception
+
+def get_current_company(token: str = Depends(oauth2_scheme)):
+    """Company id from a company JWT; student tokens get 403."""
+    company_id = get_current_user(token)
+    if (verify_token(token) or {}).get("user_type") != "company":
+        raise HTTPException(status_code=403, detail="Company account required")
+    return company_id
@@ -0,0 +1,125 @@
+"""Per-provider circuit breakers for the LLM and embedding fallbacks.
+
+A breaker tracks the outcome of the last `window` calls to one provider.
+Once at least `min_calls` were made and the failure rate reaches
+`failure_rate`, it opens: callers skip the provider and go straight to
+their fallback instead of paying its error latency. After
+`cooldown_seconds` the breaker is half-open and lets a single probe call
+through; success closes it, failure opens it for another cooldown.
+Errors that are known to last (quota exhausted) can open it immediately.
+
+Imported by utils.config, so this module must not import it.
+"""
+import time
+import threading
+from collections import deque
+from typing import Dict
+from utils.metrics import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose breaker rejects the call."""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_rate: float = 0.5, min_calls: int = 5, window: int = 20,
+                 cooldown_seconds: float = 60.0):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown_seconds = cooldown_seconds
+        self._outcomes = deque(maxlen=window)  # True = failure
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go to the provider now (at most one probe while half-open)."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+                self._state = HALF_OPEN
+                self._probing = False
+            # A probe whose outcome never came back (e.g. an abandoned stream) is replaced after a cooldown
+            if self._state == HALF_OPEN and (not self._probing or time.monotonic() - self._probe_started >= self.cooldown_seconds):
+                self._probing = True
+                self._probe_started = time.monotonic()
+                return True
+            self.rejected += 1
+            return False
+
+    def release(self):
+        """Give back a half-open probe whose call never reached the provider."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = False
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probing = False
+        self.opened += 1
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                self._state = CLOSED
+                self._outcomes.clear()
+                self._probing = False
+            self._outcomes.append(False)
+
+    def record_failure(self, open_now: bool = False):
+        with self._lock:
+            self._outcomes.append(True)
+            if self._state == HALF_OPEN or open_now:
+                self._open()
+                return
+            if self._state == CLOSED and len(self._outcomes) >= self.min_calls:
+                if sum(self._outcomes) / len(self._outcomes) >= self.failure_rate:
+                    self._open()
+
+    def stats(self) -> dict:
+        state = self.state
+        with self._lock:
+            calls = len(self._outcomes)
+            failures = sum(self._outcomes)
+            remaining = self.cooldown_seconds - (time.monotonic() - self._opened_at) if state == OPEN else 0.0
+        return {
+            "state": state,
+            "window_calls": calls,
+            "window_failure_rate": round(failures / calls, 4) if calls else 0.0,
+            "times_opened": self.opened,
+            "rejected_calls": self.rejected,
+            "cooldown_remaining_seconds": round(max(remaining, 0.0), 1),
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str, **settings) -> CircuitBreaker:
+    """The process-wide breaker for name, created with settings on first use."""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, **settings)
+        return _breakers[name]
+
+
+metrics.register("circuit_breakers", lambda: {name: breaker.stats() for name, breaker in list(_breakers.items())})
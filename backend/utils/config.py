@@ -1,9 +1,11 @@
 import os
+import time
+import threading
 from dotenv import load_dotenv
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_huggingface import HuggingFaceEmbeddings
-from google.api_core.exceptions import ResourceExhausted
+from langchain_core.embeddings import Embeddings
 import logging
+from utils.circuit_breaker import OPEN, HALF_OPEN, CircuitOpenError, get_breaker
+from utils.metrics import metrics
 
 # Load environment variables from .env if present
 load_dotenv()
@@ -22,6 +24,113 @@ CORS_ORIGINS = [o.strip() for o in os.getenv("CORS_ORIGINS", "http://localhost:3
 # Vector store base directories (use volumes in production)
 VECTORSTORE_BASE_DIR = os.getenv("VECTORSTORE_DIR", ".")
 STUDENT_VECTORSTORE_BASE_DIR = os.getenv("STUDENT_VECTORSTORE_DIR", ".")
+# Number of SQLite shard files holding all students' resume chunks
+STUDENT_STORE_SHARDS = int(os.getenv("STUDENT_STORE_SHARDS", "16"))
+# How many published internship index versions to keep on disk
+VECTORSTORE_KEEP_VERSIONS = int(os.getenv("VECTORSTORE_KEEP_VERSIONS", "3"))
+# Superseded versions stay on disk at least this long, so workers still serving them can reload first
+VECTORSTORE_PRUNE_GRACE_SECONDS = int(os.getenv("VECTORSTORE_PRUNE_GRACE_SECONDS", "3600"))
+# "memory" reads the index into each process; "mmap" maps it so workers share pages
+# (on faiss-cpu 1.7.4 only IVF indexes are mapped, see db/index_store.read_faiss_index)
+VECTORSTORE_LOAD_MODE = os.getenv("VECTORSTORE_LOAD_MODE", "memory").strip().lower()
+# Internship index type: "auto" picks flat / ivf / hnsw by chunk count
+VECTORSTORE_INDEX_TYPE = os.getenv("VECTORSTORE_INDEX_TYPE", "auto").strip().lower()
+VECTORSTORE_IVF_THRESHOLD = int(os.getenv("VECTORSTORE_IVF_THRESHOLD", "20000"))
+VECTORSTORE_HNSW_THRESHOLD = int(os.getenv("VECTORSTORE_HNSW_THRESHOLD", "500000"))
+VECTORSTORE_IVF_NLIST = int(os.getenv("VECTORSTORE_IVF_NLIST", "0"))  # 0 = ~4*sqrt(n)
+VECTORSTORE_NPROBE = int(os.getenv("VECTORSTORE_NPROBE", "16"))
+VECTORSTORE_HNSW_M = int(os.getenv("VECTORSTORE_HNSW_M", "32"))
+VECTORSTORE_EF_SEARCH = int(os.getenv("VECTORSTORE_EF_SEARCH", "64"))
+# Compressed vector storage: "none" (float32), "sq8" (int8, 4x smaller) or "pq" (~16x smaller)
+VECTORSTORE_QUANTIZATION = os.getenv("VECTORSTORE_QUANTIZATION", "none").strip().lower()
+VECTORSTORE_PQ_M = int(os.getenv("VECTORSTORE_PQ_M", "0"))  # 0 = dim/4 sub-quantizers
+# Re-rank rerank_factor * k quantized candidates with exact distances (0 disables; keeps a float32 sidecar on disk)
+VECTORSTORE_RERANK_FACTOR = int(os.getenv("VECTORSTORE_RERANK_FACTOR", "4"))
+# Keep packed chunk texts next to the index (details are otherwise hydrated from the DB)
+VECTORSTORE_STORE_TEXTS = os.getenv("VECTORSTORE_STORE_TEXTS", "false").lower() in {"1", "true", "yes"}
+
+# Embedding models per provider (part of the embedding cache key)
+GEMINI_EMBEDDING_MODEL = "models/embedding-001"
+HF_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_MODELS = {"gemini": GEMINI_EMBEDDING_MODEL, "huggingface": HF_EMBEDDING_MODEL}
+# Vector length per model: cached vectors of any other length are neither stored nor returned
+EMBEDDING_DIMENSIONS = {GEMINI_EMBEDDING_MODEL: 768, HF_EMBEDDING_MODEL: 384}
+# Local MiniLM backend: "torch" (sentence-transformers) or "onnx" (ONNX Runtime, optionally int8-quantized)
+LOCAL_EMBEDDING_BACKEND = os.getenv("LOCAL_EMBEDDING_BACKEND", "torch").strip().lower()
+LOCAL_EMBEDDING_ONNX_OPTIONS = {
+    "model_file": os.getenv("ONNX_MODEL_FILE", "onnx/model.onnx"),  # e.g. onnx/model_qint8_avx512_vnni.onnx
+    "model_dir": os.getenv("ONNX_MODEL_DIR") or None,  # local export instead of the Hugging Face hub
+    "threads": int(os.getenv("ONNX_THREADS", "0")),  # 0 = ONNX Runtime default
+    "batch_size": int(os.getenv("ONNX_BATCH_SIZE", "32")),
+}
+
+# Persistent content-hash cache for document embeddings
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(VECTORSTORE_BASE_DIR, "embedding_cache.sqlite3"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+# In-process LRU for chat/search query embeddings; the disk tier reuses the embedding cache file
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+QUERY_EMBEDDING_CACHE_TTL_SECONDS = int(os.getenv("QUERY_EMBEDDING_CACHE_TTL_SECONDS", "86400"))
+QUERY_EMBEDDING_CACHE_DISK = os.getenv("QUERY_EMBEDDING_CACHE_DISK", "false").lower() in {"1", "true", "yes"}
+
+# Query embeddings from concurrent requests are coalesced into one embed_documents
+# call: the dispatcher waits up to EMBEDDING_BATCH_WAIT_MS after the first text
+EMBEDDING_DISPATCHER = os.getenv("EMBEDDING_DISPATCHER", "true").lower() in {"1", "true", "yes"}
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "64"))
+
+# Catalog indexing pipeline: chunks per embedding call, concurrent remote calls,
+# local model worker processes (0 = auto) and retries per failed batch
+INDEX_EMBED_BATCH_SIZE = int(os.getenv("INDEX_EMBED_BATCH_SIZE", "64"))
+INDEX_EMBED_CONCURRENCY = int(os.getenv("INDEX_EMBED_CONCURRENCY", "4"))
+INDEX_EMBED_PROCESSES = int(os.getenv("INDEX_EMBED_PROCESSES", "0"))
+INDEX_EMBED_MAX_RETRIES = int(os.getenv("INDEX_EMBED_MAX_RETRIES", "3"))
+
+# Recommendation retrieval: chunk scores per job are combined by "max" or "sum";
+# the first search fetches top_k * RECOMMENDATION_OVERFETCH chunks
+RECOMMENDATION_SCORE_COMBINE = os.getenv("RECOMMENDATION_SCORE_COMBINE", "max").strip().lower()
+RECOMMENDATION_OVERFETCH = int(os.getenv("RECOMMENDATION_OVERFETCH", "3"))
+# Students per FAISS search / Internship fetch in batch recommendation runs
+RECOMMENDATION_BATCH_SIZE = int(os.getenv("RECOMMENDATION_BATCH_SIZE", "512"))
+# Request limits of /company/batch_recommendations (student_ids per request, results per student)
+BATCH_RECOMMENDATIONS_MAX_STUDENTS = int(os.getenv("BATCH_RECOMMENDATIONS_MAX_STUDENTS", "1000"))
+BATCH_RECOMMENDATIONS_MAX_TOP_K = int(os.getenv("BATCH_RECOMMENDATIONS_MAX_TOP_K", "50"))
+# Materialized per-student recommendations (survive restarts, invalidated per student)
+RECOMMENDATION_CACHE_PATH = os.getenv("RECOMMENDATION_CACHE_PATH", os.path.join(VECTORSTORE_BASE_DIR, "recommendation_cache.sqlite3"))
+RECOMMENDATION_CACHE_MAX_ENTRIES = int(os.getenv("RECOMMENDATION_CACHE_MAX_ENTRIES", "200000"))
+# Chat profile vector: resume share of the blend, per-query recency decay, queries kept in the session
+PROFILE_RESUME_WEIGHT = float(os.getenv("PROFILE_RESUME_WEIGHT", "0.5"))
+PROFILE_QUERY_DECAY = float(os.getenv("PROFILE_QUERY_DECAY", "0.5"))
+PROFILE_MAX_QUERIES = int(os.getenv("PROFILE_MAX_QUERIES", "3"))
+
+# LLM answer cache (skill suggestions, contextual chat answers): exact prompt match, plus
+# optionally questions with the same profile and embedding cosine >= LLM_RESPONSE_CACHE_SIMILARITY
+LLM_RESPONSE_CACHE_SIZE = int(os.getenv("LLM_RESPONSE_CACHE_SIZE", "1000"))
+LLM_RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("LLM_RESPONSE_CACHE_TTL_SECONDS", "21600"))
+LLM_RESPONSE_CACHE_SEMANTIC = os.getenv("LLM_RESPONSE_CACHE_SEMANTIC", "false").lower() in {"1", "true", "yes"}
+LLM_RESPONSE_CACHE_SIMILARITY = float(os.getenv("LLM_RESPONSE_CACHE_SIMILARITY", "0.95"))
+
+# uvicorn workers per container (read by the Docker CMD); per-process state must not assume one
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+# Server-side sessions (only an opaque id goes in the cookie): "memory" (single worker)
+# or "database" (DATABASE_URL, shared by all workers); "cookie" keeps the signed-cookie sessions.
+# Defaults to "database" when WEB_CONCURRENCY > 1, where in-process sessions would be lost
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "database" if WEB_CONCURRENCY > 1 else "memory").strip().lower()
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(14 * 24 * 3600)))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+
+# Circuit breakers on the Gemini -> fallback routing (LLM and embeddings): a provider is skipped
+# once CIRCUIT_BREAKER_FAILURE_RATE of its last CIRCUIT_BREAKER_WINDOW calls failed (at least
+# CIRCUIT_BREAKER_MIN_CALLS), and probed again after CIRCUIT_BREAKER_COOLDOWN_SECONDS
+CIRCUIT_BREAKER_SETTINGS = {
+    "failure_rate": float(os.getenv("CIRCUIT_BREAKER_FAILURE_RATE", "0.5")),
+    "min_calls": int(os.getenv("CIRCUIT_BREAKER_MIN_CALLS", "5")),
+    "window": int(os.getenv("CIRCUIT_BREAKER_WINDOW", "20")),
+    "cooldown_seconds": float(os.getenv("CIRCUIT_BREAKER_COOLDOWN_SECONDS", "60")),
+}
+
+# Resolve the embeddings provider in a background thread at startup instead of on the first request
+EMBEDDINGS_WARMUP = os.getenv("EMBEDDINGS_WARMUP", "true").lower() in {"1", "true", "yes"}
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -29,38 +138,208 @@ logger = logging.getLogger(__name__)
 
 _cached_embeddings = None
 _cached_provider = None
+_local_embeddings = None
+_local_lock = threading.Lock()
+# Concrete model per provider, for jobs that must not follow a reroute (see get_provider_embeddings)
+_provider_models = {}
+_provider_models_lock = threading.Lock()
+_embeddings_lock = threading.Lock()
+# Warm-up / readiness state reported by /ready
+embeddings_status = {"state": "not_loaded", "provider": None, "seconds": None, "error": None}
+gemini_embeddings_breaker = get_breaker("embeddings.gemini", **CIRCUIT_BREAKER_SETTINGS)
+
+
+def _is_quota_error(error: Exception) -> bool:
+    from google.api_core.exceptions import ResourceExhausted
+    return isinstance(error, ResourceExhausted)
+
+
+class BreakerEmbeddings(Embeddings):
+    """Calls the wrapped provider through its circuit breaker.
+
+    While the breaker is open calls fail fast with CircuitOpenError, also for
+    work pinned to this provider (see get_provider_embeddings); every call that
+    reaches the provider records its outcome.
+    """
+
+    def __init__(self, embeddings, breaker):
+        self.embeddings = embeddings
+        self.breaker = breaker
+
+    def _call(self, fn, *args, **kwargs):
+        if not self.breaker.allow():
+            metrics.incr(f"{self.breaker.name.replace('.', '_')}_skipped_open_circuit")
+            raise CircuitOpenError(f"{self.breaker.name} circuit is open")
+        try:
+            result = fn(*args, **kwargs)
+        except TypeError:
+            self.breaker.release()
+            raise  # Unsupported keyword (e.g. task_type), not a provider failure
+        except Exception as e:
+            self.breaker.record_failure(open_now=_is_quota_error(e))
+            raise
+        self.breaker.record_success()
+        return result
+
+    def embed_documents(self, texts, **kwargs):
+        return self._call(self.embeddings.embed_documents, texts, **kwargs)
+
+    def embed_query(self, text):
+        return self._call(self.embeddings.embed_query, text)
+
+
+def _needs_rerouting() -> bool:
+    """Gemini is resolved but its breaker opened, or we fell back from Gemini and it is due a probe."""
+    if _cached_provider == "gemini":
+        return gemini_embeddings_breaker.state == OPEN
+    return bool(os.getenv("GOOGLE_API_KEY", "").strip()) and gemini_embeddings_breaker.state == HALF_OPEN
+
 
 def get_embeddings_with_fallback():
-    """Get embeddings with automatic fallback to Hugging Face API if Gemini fails."""
+    """Get embeddings with automatic fallback to Hugging Face API if Gemini fails.
+
+    Resolved on first use (not at import), so the app can bind before any model
+    is loaded or any network call is made. The choice is not permanent: when
+    Gemini's circuit breaker opens, calls are rerouted to the local model, and
+    after the cooldown one caller probes Gemini and switches back if it works.
+    """
     global _cached_embeddings, _cached_provider
+    if _cached_embeddings is not None and not _needs_rerouting():
+        return _cached_embeddings, _cached_provider
+
     if _cached_embeddings is not None:
+        # Reroute without making other callers wait on the probe
+        if not _embeddings_lock.acquire(blocking=False):
+            return _cached_embeddings, _cached_provider
+        try:
+            if _needs_rerouting():
+                previous = _cached_provider
+                _cached_embeddings, _cached_provider = _resolve_embeddings()
+                if _cached_provider != previous:
+                    logger.warning(f"⚠️ Embeddings rerouted from {previous} to {_cached_provider}")
+                    metrics.incr(f"embeddings_rerouted_to_{_cached_provider}")
+                    embeddings_status["provider"] = _cached_provider
+        finally:
+            _embeddings_lock.release()
         return _cached_embeddings, _cached_provider
 
-    # Try Gemini first only if API key is present
+    with _embeddings_lock:
+        if _cached_embeddings is not None:
+            return _cached_embeddings, _cached_provider
+        embeddings_status["state"] = "loading"
+        started = time.perf_counter()
+        try:
+            _cached_embeddings, _cached_provider = _resolve_embeddings()
+        except Exception as e:
+            embeddings_status.update(state="failed", error=str(e))
+            raise
+        embeddings_status.update(state="ready", provider=_cached_provider,
+                                 seconds=round(time.perf_counter() - started, 2), error=None)
+        return _cached_embeddings, _cached_provider
+
+
+def _gemini_embeddings(google_api_key: str) -> BreakerEmbeddings:
+    # Provider libraries are imported here so importing the app stays cheap
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    primary_embeddings = GoogleGenerativeAIEmbeddings(
+        model=GEMINI_EMBEDDING_MODEL,
+        google_api_key=google_api_key,
+    )
+    return BreakerEmbeddings(primary_embeddings, gemini_embeddings_breaker)
+
+
+def _local_model():
+    """Local MiniLM (same "huggingface" store for both backends), loaded once."""
+    global _local_embeddings
+    with _local_lock:
+        if _local_embeddings is None:
+            from utils.local_embedding_worker import create_local_embeddings
+            os.environ["HUGGINGFACEHUB_API_TOKEN"] = os.environ.get("HUGGINGFACE_API_TOKEN", "")
+            _local_embeddings = create_local_embeddings(HF_EMBEDDING_MODEL, LOCAL_EMBEDDING_BACKEND, LOCAL_EMBEDDING_ONNX_OPTIONS)
+        return _local_embeddings
+
+
+def _resolve_embeddings():
+    # Try Gemini first only if API key is present and its breaker lets calls through
     google_api_key = os.getenv("GOOGLE_API_KEY", "").strip()
-    if google_api_key:
+    if google_api_key and gemini_embeddings_breaker.allow():
         try:
-            primary_embeddings = GoogleGenerativeAIEmbeddings(
-                model="models/embedding-001",
-                google_api_key=google_api_key,
-            )
+            primary_embeddings = _gemini_embeddings(google_api_key)
             # Smoke test
-            _ = primary_embeddings.embed_query("test")
+            _ = primary_embeddings.embeddings.embed_query("test")
+            gemini_embeddings_breaker.record_success()
             logger.info("✅ Using Gemini embeddings")
-            _cached_embeddings, _cached_provider = primary_embeddings, "gemini"
-            return _cached_embeddings, _cached_provider
-        except ResourceExhausted:
-            logger.warning("⚠️ Gemini quota exceeded, switching to Hugging Face API embeddings")
+            _provider_models["gemini"] = primary_embeddings
+            return primary_embeddings, "gemini"
         except Exception as e:
-            logger.warning(f"⚠️ Gemini error, using Hugging Face API fallback: {e}")
+            # A failed smoke test opens the breaker so Gemini is only retried after the cooldown
+            gemini_embeddings_breaker.record_failure(open_now=True)
+            if _is_quota_error(e):
+                logger.warning("⚠️ Gemini quota exceeded, switching to Hugging Face API embeddings")
+            else:
+                logger.warning(f"⚠️ Gemini error, using Hugging Face API fallback: {e}")
+    elif google_api_key:
+        logger.info("Gemini embeddings circuit is open, using the local fallback")
+
+    _provider_models["huggingface"] = _local_model()
+    return _provider_models["huggingface"], "huggingface"
+
+
+def get_provider_embeddings(provider: str):
+    """Concrete embeddings model of one provider, bypassing the fallback routing.
+
+    Work whose vectors must all live in one space (index builds, cache writes,
+    a search against a loaded index) resolves (model, provider) once and keeps
+    calling this model: if the breaker reroutes midway, the remaining calls
+    fail instead of silently switching to the other provider's vectors.
+    """
+    model = _provider_models.get(provider)
+    if model is not None:
+        return model
+    with _provider_models_lock:
+        if provider not in _provider_models:
+            if provider == "huggingface":
+                _provider_models[provider] = _local_model()
+            elif provider == "gemini":
+                google_api_key = os.getenv("GOOGLE_API_KEY", "").strip()
+                if not google_api_key:
+                    raise ValueError("Gemini embeddings need GOOGLE_API_KEY")
+                _provider_models[provider] = _gemini_embeddings(google_api_key)
+            else:
+                raise ValueError(f"Unknown embeddings provider {provider!r}")
+        return _provider_models[provider]
+
+
+def get_embedding_type() -> str:
+    """Provider name of the resolved embeddings ("gemini" or "huggingface")."""
+    return get_embeddings_with_fallback()[1]
+
+
+def embeddings_ready() -> bool:
+    return _cached_embeddings is not None
+
+
+class LazyEmbeddings(Embeddings):
+    """Embeddings proxy that resolves the provider on the first embed call.
+
+    Every call follows the current routing, so consecutive calls may come from
+    different providers. Anything that stores or compares vectors should use
+    get_embeddings_with_fallback() / get_provider_embeddings() instead.
+    """
+
+    def embed_documents(self, texts):
+        return get_embeddings_with_fallback()[0].embed_documents(texts)
+
+    def embed_query(self, text):
+        return get_embeddings_with_fallback()[0].embed_query(text)
+
+
+# Default embeddings (resolved on first use)
+embeddings = LazyEmbeddings()
 
-    # Fallback: Hugging Face API
-    os.environ["HUGGINGFACEHUB_API_TOKEN"] = os.environ.get("HUGGINGFACE_API_TOKEN", "")
-    fallback_embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
-    )
-    _cached_embeddings, _cached_provider = fallback_embeddings, "huggingface"
-    return _cached_embeddings, _cached_provider
 
-# Default embeddings (will be set dynamically)
-embeddings, embedding_type = get_embeddings_with_fallback()
+def __getattr__(name):
+    # Backwards compatibility for `from utils.config import embedding_type` (resolves the provider)
+    if name == "embedding_type":
+        return get_embedding_type()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
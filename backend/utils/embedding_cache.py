@@ -0,0 +1,160 @@
+"""Persistent content-hash cache for document embeddings.
+
+Vectors are stored in a SQLite file keyed by (namespace, sha256(text)), where
+the namespace is "<provider>:<model>" so Gemini and MiniLM vectors (which have
+different dimensions) never mix. Each namespace is bounded; the least recently
+used entries are evicted once it grows past the limit.
+
+Vectors whose length is not the namespace model's dimension (EMBEDDING_DIMENSIONS)
+are refused on write and treated as misses on read, so an entry embedded by the
+wrong model cannot poison later builds.
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+from typing import List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from utils.config import EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES, EMBEDDING_MODELS, EMBEDDING_DIMENSIONS
+
+logger = logging.getLogger(__name__)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def namespace_dimension(namespace: str) -> Optional[int]:
+    """Vector length expected in a "[query:]<provider>:<model>" namespace (None if unknown)."""
+    return EMBEDDING_DIMENSIONS.get(namespace.rsplit(":", 1)[-1])
+
+
+class EmbeddingCache:
+    """SQLite-backed vector cache with per-namespace LRU eviction."""
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " namespace TEXT NOT NULL,"
+                " text_hash TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (namespace, text_hash))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_lru ON embeddings (namespace, last_used)")
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, namespace: str, hashes: List[str]) -> dict:
+        """Return {hash: vector} for the hashes that are cached."""
+        found = {}
+        if not hashes:
+            return found
+        dim = namespace_dimension(namespace)
+        with self._lock:
+            conn = self._connection()
+            unique = list(dict.fromkeys(hashes))
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE namespace = ? AND text_hash IN ({placeholders})",
+                    [namespace, *batch],
+                ).fetchall()
+                for h, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    if dim is None or len(vector) == dim:
+                        found[h] = vector.tolist()
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE namespace = ? AND text_hash = ?",
+                    [(now, namespace, h) for h in found],
+                )
+                conn.commit()
+        return found
+
+    def put_many(self, namespace: str, items: dict):
+        """Store {hash: vector} and evict the oldest entries beyond max_entries."""
+        dim = namespace_dimension(namespace)
+        if dim is not None:
+            wrong = [h for h, v in items.items() if len(v) != dim]
+            if wrong:
+                logger.warning(f"⚠️ Refusing {len(wrong)} vectors for {namespace}: expected dimension {dim}")
+                items = {h: v for h, v in items.items() if len(v) == dim}
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (namespace, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(namespace, h, np.asarray(v, dtype=np.float32).tobytes(), now) for h, v in items.items()],
+            )
+            (count,) = conn.execute("SELECT COUNT(*) FROM embeddings WHERE namespace = ?", (namespace,)).fetchone()
+            excess = count - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN ("
+                    " SELECT rowid FROM embeddings WHERE namespace = ? ORDER BY last_used LIMIT ?)",
+                    (namespace, excess),
+                )
+            conn.commit()
+
+
+embedding_cache = EmbeddingCache()
+
+
+def cache_namespace(provider: str, model: Optional[str] = None) -> str:
+    return f"{provider}:{model or EMBEDDING_MODELS.get(provider, provider)}"
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends uncached document texts to the model."""
+
+    def __init__(self, embeddings: Embeddings, provider: str, model: Optional[str] = None,
+                 cache: EmbeddingCache = embedding_cache):
+        self.embeddings = embeddings
+        self.provider = provider
+        self.namespace = cache_namespace(provider, model)
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [text_hash(t) for t in texts]
+        try:
+            cached = self.cache.get_many(self.namespace, hashes)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Embedding cache unavailable, embedding everything: {e}")
+            return self.embeddings.embed_documents(texts)
+
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in cached and h not in missing:
+                missing[h] = t
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            cached.update(fresh)
+            try:
+                self.cache.put_many(self.namespace, fresh)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Could not write embedding cache: {e}")
+        logger.info(f"Embedding cache ({self.namespace}): {len(texts) - len(missing)} hits, {len(missing)} embedded")
+        return [cached[h] for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
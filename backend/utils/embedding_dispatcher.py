@@ -0,0 +1,162 @@
+"""Micro-batching dispatcher for query embeddings.
+
+Concurrent callers (chat messages, resume summaries) hand their text to one
+dispatcher thread instead of each calling embed_query. The thread waits up to
+EMBEDDING_BATCH_WAIT_MS after the first queued text (or until
+EMBEDDING_BATCH_MAX_SIZE texts are queued), embeds the unique texts with a
+single embed_documents call and fans the vectors back out. Identical texts in
+flight share one slot in the batch.
+
+Callers pass the (model, provider) they resolved, usually the pair they also use
+as a cache key, and batches are grouped by provider. The dispatcher never
+resolves the fallback itself, so a reroute between enqueueing and embedding
+cannot hand back a vector from another provider's space.
+"""
+import time
+import queue
+import threading
+import logging
+from concurrent.futures import Future
+from typing import Dict, List, Tuple
+from utils.config import (
+    get_embeddings_with_fallback,
+    EMBEDDING_DISPATCHER,
+    EMBEDDING_BATCH_WAIT_MS,
+    EMBEDDING_BATCH_MAX_SIZE,
+)
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def embed_queries(embeddings_model, provider: str, texts: List[str]) -> List[List[float]]:
+    """Embed several query texts in one call, with the same vectors embed_query would return."""
+    if provider == "gemini":
+        # Gemini embeds documents and queries with different task types
+        try:
+            return embeddings_model.embed_documents(texts, task_type="retrieval_query")
+        except TypeError:
+            return [embeddings_model.embed_query(text) for text in texts]
+    return embeddings_model.embed_documents(texts)
+
+
+class EmbeddingDispatcher:
+    def __init__(self, max_wait_ms: float = EMBEDDING_BATCH_WAIT_MS, max_batch_size: int = EMBEDDING_BATCH_MAX_SIZE):
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.requests = 0
+        self.deduplicated = 0
+        self.batches = 0
+        self.texts_embedded = 0
+        self.max_batch = 0
+        self.last_batch = 0
+        self.max_queue_depth = 0
+        self.errors = 0
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="embedding-dispatcher", daemon=True)
+                self._thread.start()
+
+    def embed_query(self, text: str, embeddings_model, provider: str) -> Tuple[List[float], str]:
+        """(vector, provider) for text, embedded by embeddings_model together with whatever
+        else arrives for the same provider in the same window."""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((text, embeddings_model, provider, future))
+        self.requests += 1
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return future.result()
+
+    def _collect(self) -> Dict[str, dict]:
+        """Block for the first text, then gather until the window closes or the batch is full.
+
+        Returns {provider: {"model": model, "texts": {text: [futures]}}}.
+        """
+        groups = {}
+        count = 0
+        item = self._queue.get()
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            text, embeddings_model, provider, future = item
+            group = groups.setdefault(provider, {"model": embeddings_model, "texts": {}})
+            if text in group["texts"]:
+                self.deduplicated += 1
+            else:
+                count += 1
+            group["texts"].setdefault(text, []).append(future)
+            if count >= self.max_batch_size:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+        return groups
+
+    def _embed_group(self, embeddings_model, provider: str, pending: Dict[str, List[Future]]):
+        texts = list(pending)
+        try:
+            vectors = embed_queries(embeddings_model, provider, texts)
+            if len(vectors) != len(texts):
+                raise ValueError(f"expected {len(texts)} vectors, got {len(vectors)}")
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"⚠️ Embedding batch of {len(texts)} {provider} texts failed: {e}")
+            for futures in pending.values():
+                for future in futures:
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.texts_embedded += len(texts)
+        self.last_batch = len(texts)
+        self.max_batch = max(self.max_batch, len(texts))
+        for text, vector in zip(texts, vectors):
+            for future in pending[text]:
+                future.set_result((vector, provider))
+
+    def _run(self):
+        while True:
+            for provider, group in self._collect().items():
+                self._embed_group(group["model"], provider, group["texts"])
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "requests": self.requests,
+            "deduplicated": self.deduplicated,
+            "batches": self.batches,
+            "texts_embedded": self.texts_embedded,
+            "avg_batch_size": round(self.texts_embedded / self.batches, 2) if self.batches else 0.0,
+            "last_batch_size": self.last_batch,
+            "max_batch_size": self.max_batch,
+            "errors": self.errors,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
+
+
+embedding_dispatcher = EmbeddingDispatcher()
+metrics.register("embedding_dispatcher", embedding_dispatcher.stats)
+
+
+def dispatch_embed_query(text: str, embeddings_model=None, provider: str = None) -> Tuple[List[float], str]:
+    """(vector, provider) through the dispatcher (or directly when EMBEDDING_DISPATCHER is off).
+
+    Pass the model and provider already resolved by the caller; they are only
+    resolved here when omitted.
+    """
+    if embeddings_model is None:
+        embeddings_model, provider = get_embeddings_with_fallback()
+    if EMBEDDING_DISPATCHER:
+        return embedding_dispatcher.embed_query(text, embeddings_model, provider)
+    return embeddings_model.embed_query(text), provider
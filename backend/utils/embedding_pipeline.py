@@ -0,0 +1,138 @@
+"""Batched, parallel embedding stage for catalog indexing.
+
+Chunks are looked up in the embedding cache first; the rest are split into
+batches of INDEX_EMBED_BATCH_SIZE. Remote providers (Gemini) get a bounded
+thread pool of INDEX_EMBED_CONCURRENCY concurrent calls, the local MiniLM model
+runs in a process pool. Every finished batch is written to the embedding cache
+straight away, which doubles as the checkpoint: a failed import resumes from the
+last completed batch. Failed batches are retried individually with backoff; a
+batch that exhausts its retries does not discard the others, the error is
+raised once every batch has finished.
+"""
+import os
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from typing import List, Tuple
+from utils.config import (
+    HF_EMBEDDING_MODEL,
+    LOCAL_EMBEDDING_BACKEND,
+    LOCAL_EMBEDDING_ONNX_OPTIONS,
+    INDEX_EMBED_BATCH_SIZE,
+    INDEX_EMBED_CONCURRENCY,
+    INDEX_EMBED_PROCESSES,
+    INDEX_EMBED_MAX_RETRIES,
+)
+from utils.embedding_cache import embedding_cache, cache_namespace, namespace_dimension, text_hash
+from utils import local_embedding_worker
+
+logger = logging.getLogger(__name__)
+
+
+def _with_retries(fn, batch, max_retries: int):
+    """Call fn(batch), retrying with exponential backoff. Returns (vectors, retries)."""
+    attempt = 0
+    while True:
+        try:
+            return fn(batch), attempt
+        except Exception as e:
+            if attempt >= max_retries:
+                raise
+            delay = min(30.0, 2 ** attempt)
+            logger.warning(f"⚠️ Embedding batch of {len(batch)} failed ({e}), retrying in {delay:.0f}s")
+            time.sleep(delay)
+            attempt += 1
+
+
+def _local_process_count() -> int:
+    if INDEX_EMBED_PROCESSES > 0:
+        return INDEX_EMBED_PROCESSES
+    return max(1, min(4, (os.cpu_count() or 1) - 1))
+
+
+def embed_chunks(texts: List[str], embeddings, provider: str,
+                 batch_size: int = INDEX_EMBED_BATCH_SIZE,
+                 concurrency: int = INDEX_EMBED_CONCURRENCY,
+                 max_retries: int = INDEX_EMBED_MAX_RETRIES) -> Tuple[List[List[float]], dict]:
+    """Embed texts in checkpointed batches. Returns (vectors aligned with texts, stats).
+
+    embeddings must be provider's concrete model (not the rerouting LazyEmbeddings
+    proxy): vectors are cached under provider's namespace, and a batch that comes
+    back with another dimension fails instead of being stored.
+    """
+    started = time.perf_counter()
+    namespace = cache_namespace(provider)
+    dim = namespace_dimension(namespace)
+    hashes = [text_hash(t) for t in texts]
+    vectors_by_hash = embedding_cache.get_many(namespace, hashes)
+
+    pending = {}
+    for h, t in zip(hashes, texts):
+        if h not in vectors_by_hash and h not in pending:
+            pending[h] = t
+    pending_items = list(pending.items())
+    batches = [pending_items[i:i + batch_size] for i in range(0, len(pending_items), batch_size)]
+
+    stats = {
+        "chunks": len(texts),
+        "cached": len(texts) - sum(1 for h in hashes if h not in vectors_by_hash),
+        "embedded": len(pending_items),
+        "batches": len(batches),
+        "retries": 0,
+    }
+
+    if batches:
+        use_processes = provider == "huggingface" and len(batches) > 1
+        if use_processes:
+            executor = ProcessPoolExecutor(
+                max_workers=min(_local_process_count(), len(batches)),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=local_embedding_worker.init_worker,
+                initargs=(HF_EMBEDDING_MODEL, LOCAL_EMBEDDING_BACKEND, LOCAL_EMBEDDING_ONNX_OPTIONS),
+            )
+        else:
+            executor = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(batches))))
+
+        def run_batch(batch):
+            texts_only = [t for _, t in batch]
+            if use_processes:
+                vectors, retries = _with_retries(lambda b: executor.submit(local_embedding_worker.embed_batch, b).result(), texts_only, max_retries)
+            else:
+                vectors, retries = _with_retries(embeddings.embed_documents, texts_only, max_retries)
+            if dim is not None and any(len(v) != dim for v in vectors):
+                raise ValueError(f"{provider} batch returned vectors that are not {dim}-dimensional")
+            fresh = {h: v for (h, _), v in zip(batch, vectors)}
+            embedding_cache.put_many(namespace, fresh)  # checkpoint as soon as the batch is done
+            return fresh, retries
+
+        # Threads drive the batches (and wait on process results for the local model)
+        errors = []
+        with executor, ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(batches)))) as driver:
+            futures = {driver.submit(run_batch, batch): batch for batch in batches}
+            done = 0
+            for future in as_completed(futures):
+                try:
+                    fresh, retries = future.result()
+                except Exception as e:
+                    # Keep draining: the other batches' vectors are still checkpointed
+                    errors.append(e)
+                    continue
+                stats["retries"] += retries
+                vectors_by_hash.update(fresh)
+                done += len(fresh)
+                elapsed = time.perf_counter() - started
+                logger.info(f"Embedded {done}/{len(pending_items)} chunks ({done / max(elapsed, 1e-9):.1f} chunks/sec)")
+        if errors:
+            logger.error(f"❌ {len(errors)} of {len(batches)} embedding batches failed; completed batches are cached")
+            raise errors[0]
+
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = round(elapsed, 3)
+    # Throughput of the chunks actually embedded (cache hits would inflate it)
+    stats["chunks_per_sec"] = round(stats["embedded"] / elapsed, 1) if elapsed > 0 else None
+    logger.info(
+        f"✅ Embedding pipeline: {stats['chunks']} chunks ({stats['cached']} cached, {stats['embedded']} embedded) "
+        f"in {stats['seconds']}s, {stats['chunks_per_sec']} embedded chunks/sec"
+    )
+    return [vectors_by_hash[h] for h in hashes], stats
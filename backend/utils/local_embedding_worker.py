@@ -0,0 +1,24 @@
+"""Process-pool worker for the local MiniLM model (PyTorch or ONNX backend).
+
+Kept free of utils.config imports so spawned workers only load the model,
+not the whole app configuration (and its provider smoke test).
+"""
+_model = None
+
+
+def create_local_embeddings(model_name: str, backend: str = "torch", onnx_options: dict = None):
+    """Local MiniLM embeddings; both backends produce vectors for the faiss_index_huggingface store."""
+    if backend == "onnx":
+        from utils.onnx_embeddings import OnnxMiniLMEmbeddings
+        return OnnxMiniLMEmbeddings(model_name=model_name, **(onnx_options or {}))
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=model_name)
+
+
+def init_worker(model_name: str, backend: str = "torch", onnx_options: dict = None):
+    global _model
+    _model = create_local_embeddings(model_name, backend, onnx_options)
+
+
+def embed_batch(texts):
+    return _model.embed_documents(texts)
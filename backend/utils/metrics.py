@@ -0,0 +1,45 @@
+"""Process-local metrics registry exposed on /metrics.
+
+Components either bump named counters/gauges here or register a callable that
+returns their own stats dict; snapshot() collects everything as plain JSON.
+"""
+import threading
+import logging
+from collections import defaultdict
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._gauges = {}
+        self._sources = {}
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self._gauges[name] = value
+
+    def register(self, name: str, source: Callable[[], Dict]):
+        """Include source() under name in every snapshot."""
+        self._sources[name] = source
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            data = {"counters": dict(self._counters), "gauges": dict(self._gauges)}
+        for name, source in list(self._sources.items()):
+            try:
+                data[name] = source()
+            except Exception as e:
+                logger.warning(f"⚠️ Metrics source {name} failed: {e}")
+                data[name] = {"error": str(e)}
+        return data
+
+
+metrics = Metrics()
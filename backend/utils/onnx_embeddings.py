@@ -0,0 +1,83 @@
+"""MiniLM sentence embeddings on ONNX Runtime (no torch).
+
+Reproduces the sentence-transformers all-MiniLM-L6-v2 pipeline (WordPiece
+tokenization truncated to 256 tokens, mean pooling over the attention mask,
+L2 normalization), so vectors live in the same space as the
+faiss_index_huggingface store built with the PyTorch model. The exported
+model.onnx or one of its int8-quantized variants (model_qint8_*.onnx) is read
+from a local directory or downloaded from the model's Hugging Face repo.
+
+Kept free of utils.config imports so it can be loaded inside embedding worker
+processes.
+"""
+import os
+import logging
+from typing import List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+class OnnxMiniLMEmbeddings(Embeddings):
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2", model_file: str = "onnx/model.onnx",
+                 model_dir: Optional[str] = None, threads: int = 0, batch_size: int = 32, max_length: int = 256):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = self._resolve(model_name, model_dir, model_file)
+        tokenizer_path = self._resolve(model_name, model_dir, "tokenizer.json")
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+        self.batch_size = batch_size
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        logger.info(f"✅ Using ONNX MiniLM embeddings ({os.path.basename(model_path)}, threads={threads or 'auto'})")
+
+    @staticmethod
+    def _resolve(model_name: str, model_dir: Optional[str], filename: str) -> str:
+        if model_dir:
+            local = os.path.join(model_dir, filename)
+            # Accept both the hub layout (onnx/model.onnx) and a flat directory
+            return local if os.path.exists(local) else os.path.join(model_dir, os.path.basename(filename))
+        from huggingface_hub import hf_hub_download
+        return hf_hub_download(repo_id=model_name, filename=filename)
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.asarray([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.asarray([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens, then L2 normalization (as in the sentence-transformers model)
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        # Batch texts of similar length together to keep padding small
+        order = np.argsort([len(t) for t in texts])
+        vectors = np.zeros((len(texts), 0), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            idx = order[start:start + self.batch_size]
+            batch = self._embed_batch([texts[i].replace("\n", " ") for i in idx])
+            if vectors.shape[1] == 0:
+                vectors = np.zeros((len(texts), batch.shape[1]), dtype=np.float32)
+            vectors[idx] = batch
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
@@ -0,0 +1,112 @@
+"""Bounded LRU + TTL cache for query embeddings (chat messages, search phrases).
+
+Keys are (provider, normalized text), so "Show me  internships" and "show me
+internships" share one entry and Gemini / MiniLM vectors never mix. An
+optional second tier stores vectors in the shared SQLite embedding cache so
+hits survive restarts and are shared by every worker on the node.
+"""
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional
+from utils.config import (
+    QUERY_EMBEDDING_CACHE_SIZE,
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+    QUERY_EMBEDDING_CACHE_DISK,
+)
+from utils.embedding_cache import EmbeddingCache, embedding_cache, cache_namespace, namespace_dimension, text_hash
+from utils.metrics import metrics
+
+
+def normalize_query(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "").strip().lower())
+
+
+class QueryEmbeddingCache:
+    def __init__(self, max_entries: int = QUERY_EMBEDDING_CACHE_SIZE, ttl_seconds: float = QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+                 disk: Optional[EmbeddingCache] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk = disk
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejected = 0
+
+    def _get_memory(self, key) -> Optional[List[float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            vector, stored_at = entry
+            if self.ttl_seconds and time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return vector
+
+    def _put_memory(self, key, vector: List[float]):
+        with self._lock:
+            self._entries[key] = (vector, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_embed(self, provider: str, text: str, embed: Callable[[str], List[float]]) -> List[float]:
+        """Cached vector for text, calling embed(text) only on a miss in every tier."""
+        normalized = normalize_query(text)
+        key = (provider, normalized)
+        vector = self._get_memory(key)
+        if vector is not None:
+            self.hits += 1
+            return vector
+
+        namespace = f"query:{cache_namespace(provider)}"
+        if self.disk is not None:
+            h = text_hash(normalized)
+            try:
+                vector = self.disk.get_many(namespace, [h]).get(h)
+            except Exception:
+                vector = None
+            if vector is not None:
+                self.disk_hits += 1
+                self._put_memory(key, vector)
+                return vector
+
+        self.misses += 1
+        vector = embed(text)
+        dim = namespace_dimension(namespace)
+        if dim is not None and len(vector) != dim:
+            # Never cache a vector under a provider whose space it is not in
+            self.rejected += 1
+            return vector
+        self._put_memory(key, vector)
+        if self.disk is not None:
+            try:
+                self.disk.put_many(namespace, {text_hash(normalized): vector})
+            except Exception:
+                pass
+        return vector
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "rejected": self.rejected,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+query_embedding_cache = QueryEmbeddingCache(disk=embedding_cache if QUERY_EMBEDDING_CACHE_DISK else None)
+metrics.register("query_embedding_cache", query_embedding_cache.stats)
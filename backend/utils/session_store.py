@@ -0,0 +1,200 @@
+"""Server-side sessions: the cookie carries only an opaque session id.
+
+Session data (resume embedding, chat query vectors, recommendations) lives in
+a pluggable store instead of being signed into the cookie on every response:
+
+- "memory": in-process LRU with TTL (single worker; refused when WEB_CONCURRENCY > 1,
+  since each worker would see only its own sessions)
+- "database": the app database from DATABASE_URL (SQLite or Postgres), shared
+  by every worker and instance
+
+ServerSessionMiddleware is a drop-in for Starlette's SessionMiddleware, so
+routes keep using request.session. Sessions expire SESSION_TTL_SECONDS after
+their last write; reads refresh the expiry once half of it has passed.
+"""
+import json
+import time
+import secrets
+import threading
+import logging
+from collections import OrderedDict
+from typing import Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from utils.config import SESSION_BACKEND, SESSION_TTL_SECONDS, SESSION_MAX_ENTRIES, WEB_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+
+class MemorySessionStore:
+    """Bounded LRU of session dicts with per-session expiry."""
+
+    blocking = False
+
+    def __init__(self, ttl_seconds: int = SESSION_TTL_SECONDS, max_entries: int = SESSION_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def load(self, session_id: str) -> Optional[Tuple[dict, float]]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            data, expires_at = entry
+            if expires_at < time.time():
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return json.loads(data), expires_at
+
+    def save(self, session_id: str, data: str):
+        with self._lock:
+            self._sessions[session_id] = (data, time.time() + self.ttl_seconds)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_entries:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "sessions": len(self._sessions), "max_entries": self.max_entries,
+                "evictions": self.evictions, "ttl_seconds": self.ttl_seconds}
+
+
+class DatabaseSessionStore:
+    """Sessions in the server_sessions table of the app database; expired rows are purged periodically."""
+
+    blocking = True
+
+    def __init__(self, ttl_seconds: int = SESSION_TTL_SECONDS, purge_every: int = 500):
+        self.ttl_seconds = ttl_seconds
+        self.purge_every = purge_every
+        self._writes = 0
+        self._table_ready = False
+
+    def _session(self):
+        from db.database import SessionLocal, engine
+        from db.models import ServerSession
+        if not self._table_ready:
+            ServerSession.__table__.create(bind=engine, checkfirst=True)
+            self._table_ready = True
+        return SessionLocal(), ServerSession
+
+    def load(self, session_id: str) -> Optional[Tuple[dict, float]]:
+        db, ServerSession = self._session()
+        try:
+            row = db.query(ServerSession.data, ServerSession.expires_at).filter(ServerSession.id == session_id).first()
+        finally:
+            db.close()
+        if row is None or row.expires_at < time.time():
+            return None
+        return json.loads(row.data), row.expires_at
+
+    def save(self, session_id: str, data: str):
+        db, ServerSession = self._session()
+        try:
+            now = time.time()
+            row = db.get(ServerSession, session_id)
+            if row is None:
+                db.add(ServerSession(id=session_id, data=data, expires_at=now + self.ttl_seconds))
+            else:
+                row.data = data
+                row.expires_at = now + self.ttl_seconds
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                db.query(ServerSession).filter(ServerSession.expires_at < now).delete(synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def delete(self, session_id: str):
+        db, ServerSession = self._session()
+        try:
+            db.query(ServerSession).filter(ServerSession.id == session_id).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        return {"backend": "database", "ttl_seconds": self.ttl_seconds, "writes": self._writes}
+
+
+def create_session_store(backend: str = SESSION_BACKEND, workers: int = WEB_CONCURRENCY):
+    if backend not in ("memory", "database"):
+        fallback = "database" if workers > 1 else "memory"
+        logger.warning(f"⚠️ Unknown SESSION_BACKEND={backend!r}, using the {fallback} store")
+        backend = fallback
+    if backend == "database":
+        return DatabaseSessionStore()
+    if workers > 1:
+        raise RuntimeError(
+            f"SESSION_BACKEND=memory keeps sessions in one process but WEB_CONCURRENCY={workers}; "
+            "use SESSION_BACKEND=database"
+        )
+    return MemorySessionStore()
+
+
+class ServerSessionMiddleware:
+    """Exposes request.session backed by a session store, keyed by an opaque id cookie."""
+
+    def __init__(self, app, store, session_cookie: str = "session", max_age: int = SESSION_TTL_SECONDS,
+                 path: str = "/", same_site: str = "lax", https_only: bool = False):
+        self.app = app
+        self.store = store
+        self.session_cookie = session_cookie
+        self.max_age = max_age
+        self.path = path
+        self.security_flags = "httponly; samesite=" + same_site + ("; secure" if https_only else "")
+
+    async def _call(self, fn, *args):
+        if self.store.blocking:
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        session_id = HTTPConnection(scope).cookies.get(self.session_cookie)
+        loaded = await self._call(self.store.load, session_id) if session_id else None
+        if loaded is None:
+            scope["session"], expires_at = {}, 0.0
+        else:
+            scope["session"], expires_at = loaded
+        initial = json.dumps(scope["session"], sort_keys=True) if loaded else None
+
+        async def send_wrapper(message):
+            nonlocal session_id
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if scope["session"]:
+                    data = json.dumps(scope["session"], sort_keys=True)
+                    # Only write when the data changed or half the TTL has passed
+                    if data != initial or expires_at - time.time() < self.max_age / 2:
+                        if loaded is None:
+                            session_id = secrets.token_urlsafe(32)
+                        try:
+                            await self._call(self.store.save, session_id, data)
+                            headers.append("Set-Cookie", f"{self.session_cookie}={session_id}; path={self.path}; "
+                                                         f"Max-Age={self.max_age}; {self.security_flags}")
+                        except Exception as e:
+                            logger.warning(f"⚠️ Could not save session: {e}")
+                elif session_id:
+                    if loaded is not None:
+                        await self._call(self.store.delete, session_id)
+                    headers.append("Set-Cookie", f"{self.session_cookie}=null; path={self.path}; "
+                                                 f"expires=Thu, 01 Jan 1970 00:00:00 GMT; {self.security_flags}")
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,63 @@
+import sys
+import time
+import argparse
+import numpy as np
+sys.path.append('backend')
+
+from db.index_factory import build_faiss_index, default_nlist
+
+
+def synthetic_catalog(n, dim, n_clusters=256, seed=0):
+    """Clustered Gaussian vectors, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim)).astype(np.float32)
+    assignment = rng.integers(0, n_clusters, size=n)
+    return (centers[assignment] + 0.35 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def recall_at_k(found, truth, k):
+    hits = sum(len(set(f[:k]) & set(t[:k])) for f, t in zip(found, truth))
+    return hits / float(len(truth) * k)
+
+
+def benchmark(index, queries, k):
+    latencies = []
+    results = []
+    for q in queries:
+        start = time.perf_counter()
+        _, labels = index.search(q.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(labels[0].tolist())
+    return results, np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare flat / IVF / HNSW internship index recall and latency")
+    parser.add_argument("--n", type=int, default=100000, help="number of synthetic chunks")
+    parser.add_argument("--dim", type=int, default=768, help="vector dimension (768 Gemini, 384 MiniLM)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--ef-search", type=int, default=64)
+    args = parser.parse_args()
+
+    print(f"Building synthetic catalog: {args.n} x {args.dim}")
+    vectors = synthetic_catalog(args.n, args.dim)
+    queries = synthetic_catalog(args.queries, args.dim, seed=1)
+
+    exact, _ = build_faiss_index(vectors, "flat")
+    truth, flat_p50, flat_p95 = benchmark(exact, queries, args.k)
+    print(f"{'type':<6} {'build s':>8} {'recall@' + str(args.k):>10} {'p50 ms':>8} {'p95 ms':>8}")
+    print(f"{'flat':<6} {'-':>8} {1.0:>10.3f} {flat_p50:>8.2f} {flat_p95:>8.2f}")
+
+    for index_type in ("ivf", "hnsw"):
+        start = time.perf_counter()
+        index, params = build_faiss_index(vectors, index_type, nlist=default_nlist(args.n),
+                                          nprobe=args.nprobe, ef_search=args.ef_search)
+        build_seconds = time.perf_counter() - start
+        found, p50, p95 = benchmark(index, queries, args.k)
+        print(f"{index_type:<6} {build_seconds:>8.1f} {recall_at_k(found, truth, args.k):>10.3f} {p50:>8.2f} {p95:>8.2f}  {params}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import sys
+import time
+import argparse
+import numpy as np
+sys.path.append('backend')
+
+from utils.local_embedding_worker import create_local_embeddings
+
+MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+SAMPLE = (
+    "Software engineering intern working on Python microservices, REST APIs and PostgreSQL. "
+    "Built data pipelines with pandas and deployed models with Docker on AWS. "
+)
+
+
+def synthetic_texts(n, seed=0):
+    rng = np.random.default_rng(seed)
+    words = SAMPLE.split()
+    return [" ".join(rng.choice(words, size=int(rng.integers(20, 180)))) for _ in range(n)]
+
+
+def throughput(embeddings, texts, batch_size):
+    embeddings.embed_documents(texts[:batch_size])  # warm up
+    start = time.perf_counter()
+    vectors = []
+    for i in range(0, len(texts), batch_size):
+        vectors.extend(embeddings.embed_documents(texts[i:i + batch_size]))
+    elapsed = time.perf_counter() - start
+    return np.asarray(vectors, dtype=np.float32), len(texts) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embeddings/sec of the local MiniLM backends and agreement with torch")
+    parser.add_argument("--n", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--onnx-files", nargs="+", default=["onnx/model.onnx", "onnx/model_qint8_avx512_vnni.onnx"])
+    parser.add_argument("--skip-torch", action="store_true")
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.n)
+    reference = None
+    print(f"{'backend':<40} {'emb/sec':>9} {'cos vs torch':>13}")
+    if not args.skip_torch:
+        reference, rate = throughput(create_local_embeddings(MODEL, "torch"), texts, args.batch_size)
+        print(f"{'torch':<40} {rate:>9.1f} {1.0:>13.4f}")
+
+    for model_file in args.onnx_files:
+        options = {"model_file": model_file, "threads": args.threads, "batch_size": args.batch_size}
+        vectors, rate = throughput(create_local_embeddings(MODEL, "onnx", options), texts, args.batch_size)
+        agreement = "-"
+        if reference is not None:
+            agreement = f"{float(np.mean(np.sum(vectors * reference, axis=1) / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(reference, axis=1)))):.4f}"
+        print(f"{'onnx ' + model_file:<40} {rate:>9.1f} {agreement:>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import sys
+import time
+import argparse
+import numpy as np
+sys.path.append('backend')
+
+from db.index_factory import QUANTIZATIONS, build_faiss_index, default_nlist, index_size_bytes
+from benchmark_index_types import synthetic_catalog, recall_at_k
+
+
+def search_all(index, queries, k, vectors=None, rerank_factor=0):
+    """Search every query; with rerank_factor > 1 re-score the candidates exactly against vectors."""
+    fetch_k = k * rerank_factor if rerank_factor > 1 else k
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        _, labels = index.search(q.reshape(1, -1), fetch_k)
+        labels = labels[0][labels[0] >= 0]
+        if rerank_factor > 1:
+            exact = ((vectors[labels] - q) ** 2).sum(axis=1)
+            labels = labels[np.argsort(exact)[:k]]
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(labels.tolist())
+    return results, np.percentile(latencies, 50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory vs recall of quantized internship indexes")
+    parser.add_argument("--n", type=int, default=100000, help="number of synthetic chunks")
+    parser.add_argument("--dim", type=int, default=768, help="vector dimension (768 Gemini, 384 MiniLM)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--index-type", default="flat", choices=("flat", "ivf", "hnsw"))
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"Building synthetic catalog: {args.n} x {args.dim}")
+    vectors = synthetic_catalog(args.n, args.dim)
+    queries = synthetic_catalog(args.queries, args.dim, seed=1)
+
+    exact, _ = build_faiss_index(vectors, "flat")
+    truth, _ = search_all(exact, queries, args.k)
+    baseline = index_size_bytes(exact)
+
+    print(f"{'storage':<8} {'MB':>8} {'ratio':>6} {'recall@' + str(args.k):>10} {'p50 ms':>8} "
+          f"{'rerank recall':>14} {'rerank p50':>11}")
+    for quantization in QUANTIZATIONS:
+        index, params = build_faiss_index(vectors, args.index_type, nlist=default_nlist(args.n),
+                                          quantization=quantization)
+        size = index_size_bytes(index)
+        found, p50 = search_all(index, queries, args.k)
+        line = (f"{params['quantization']:<8} {size / 2**20:>8.1f} {baseline / size:>5.1f}x "
+                f"{recall_at_k(found, truth, args.k):>10.3f} {p50:>8.2f}")
+        if params["quantization"] != "none":
+            reranked, rerank_p50 = search_all(index, queries, args.k, vectors, args.rerank_factor)
+            line += f" {recall_at_k(reranked, truth, args.k):>14.3f} {rerank_p50:>11.2f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+
+
+def time_import(module):
+    """Wall time of a fresh interpreter importing module from backend/ (includes interpreter start)."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], cwd=BACKEND_DIR, check=True,
+                   env={**os.environ, "EMBEDDINGS_WARMUP": "false"})
+    return time.perf_counter() - start
+
+
+def slowest_imports(module, top):
+    """Top cumulative entries of python -X importtime for the module."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, env={**os.environ, "EMBEDDINGS_WARMUP": "false"})
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        rows.append((int(parts[1]), parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Track how long `import main` takes (cold start before uvicorn binds)")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    args = parser.parse_args()
+
+    baseline = statistics.median(time_import("sys") for _ in range(args.runs))
+    times = [time_import(args.module) for _ in range(args.runs)]
+    print(f"import {args.module}: median {statistics.median(times):.2f}s, min {min(times):.2f}s, "
+          f"max {max(times):.2f}s over {args.runs} runs (interpreter start {baseline:.2f}s)")
+
+    print("\nSlowest imports (cumulative ms):")
+    for micros, name in slowest_imports(args.module, args.top):
+        print(f"{micros / 1000:>10.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
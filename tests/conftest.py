@@ -0,0 +1,5 @@
+# Unit tests for the backend modules; run from the repository root with `python -m pytest tests`
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
@@ -0,0 +1,175 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils import circuit_breaker
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, get_breaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Manually advanced replacement for time.monotonic inside utils.circuit_breaker."""
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker, "time", SimpleNamespace(monotonic=lambda: now[0]))
+
+    def advance(seconds):
+        now[0] += seconds
+    return advance
+
+
+def _breaker():
+    return CircuitBreaker("test", failure_rate=0.5, min_calls=4, window=10, cooldown_seconds=30)
+
+
+def test_stays_closed_below_min_calls(clock):
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_opens_at_failure_rate_and_rejects_calls(clock):
+    breaker = _breaker()
+    breaker.record_success()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["rejected_calls"] == 1
+    assert breaker.stats()["times_opened"] == 1
+
+
+def test_quota_errors_open_immediately(clock):
+    breaker = _breaker()
+    breaker.record_failure(open_now=True)
+    assert breaker.state == OPEN
+
+
+def test_half_open_lets_a_single_probe_through(clock):
+    breaker = _breaker()
+    breaker.record_failure(open_now=True)
+    clock(29)
+    assert not breaker.allow()
+    clock(1)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_successful_probe_closes_with_a_fresh_window(clock):
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record_failure()
+    clock(30)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 1
+    assert breaker.allow()
+    # The failures from before the outage no longer count towards the rate
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens_for_another_cooldown(clock):
+    breaker = _breaker()
+    breaker.record_failure(open_now=True)
+    clock(30)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.stats()["times_opened"] == 2
+    clock(15)
+    assert not breaker.allow()
+    clock(15)
+    assert breaker.allow()
+
+
+def test_abandoned_probe_is_replaced_after_a_cooldown(clock):
+    breaker = _breaker()
+    breaker.record_failure(open_now=True)
+    clock(30)
+    assert breaker.allow()
+    clock(29)
+    assert not breaker.allow()
+    clock(1)
+    assert breaker.allow()
+
+
+def test_stats_report_remaining_cooldown(clock):
+    breaker = _breaker()
+    breaker.record_failure(open_now=True)
+    clock(10)
+    stats = breaker.stats()
+    assert stats["state"] == OPEN
+    assert stats["cooldown_remaining_seconds"] == 20.0
+    assert stats["window_failure_rate"] == 1.0
+
+
+def test_get_breaker_returns_one_breaker_per_name():
+    first = get_breaker("tests.shared", cooldown_seconds=5)
+    assert get_breaker("tests.shared", cooldown_seconds=99) is first
+    assert first.cooldown_seconds == 5
+
+
+def test_released_probe_can_be_taken_again(clock):
+    breaker = _breaker()
+    breaker.record_failure(open_now=True)
+    clock(30)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+class _Provider:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+
+    def embed_documents(self, texts, **kwargs):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        if kwargs:
+            raise TypeError("unexpected keyword")
+        return [[0.0] for _ in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_breaker_embeddings_fail_fast_while_open(clock):
+    pytest.importorskip("google.api_core")
+    config = pytest.importorskip("utils.config")
+    breaker = _breaker()
+    provider = _Provider(error=RuntimeError("503"))
+    embeddings = config.BreakerEmbeddings(provider, breaker)
+    for _ in range(4):
+        with pytest.raises(RuntimeError):
+            embeddings.embed_query("text")
+    assert breaker.state == OPEN
+    with pytest.raises(circuit_breaker.CircuitOpenError):
+        embeddings.embed_documents(["text"])
+    assert provider.calls == 4
+
+    clock(30)
+    provider.error = None
+    assert embeddings.embed_query("text") == [0.0]
+    assert breaker.state == CLOSED
+
+
+def test_breaker_embeddings_keep_the_probe_on_unsupported_keywords(clock):
+    config = pytest.importorskip("utils.config")
+    breaker = _breaker()
+    breaker.record_failure(open_now=True)
+    clock(30)
+    embeddings = config.BreakerEmbeddings(_Provider(), breaker)
+    with pytest.raises(TypeError):
+        embeddings.embed_documents(["text"], task_type="retrieval_query")
+    # The keyword-free retry is the probe
+    assert embeddings.embed_documents(["text"]) == [[0.0]]
+    assert breaker.state == CLOSED
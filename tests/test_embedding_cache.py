@@ -0,0 +1,84 @@
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("langchain_core")
+
+from utils.embedding_cache import CachedEmbeddings, EmbeddingCache, cache_namespace, namespace_dimension, text_hash
+
+HF = cache_namespace("huggingface")
+GEMINI = cache_namespace("gemini")
+
+
+class FakeEmbeddings:
+    def __init__(self, dim):
+        self.dim = dim
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text))] * self.dim for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(path=str(tmp_path / "embeddings.db"), max_entries=3)
+
+
+def test_namespace_dimensions():
+    assert namespace_dimension(HF) == 384
+    assert namespace_dimension(GEMINI) == 768
+    assert namespace_dimension("query:" + GEMINI) == 768
+    assert namespace_dimension("custom:model") is None
+
+
+def test_put_many_refuses_vectors_of_another_dimension(cache):
+    cache.put_many(HF, {"good": [0.5] * 384, "gemini": [0.5] * 768})
+    found = cache.get_many(HF, ["good", "gemini"])
+    assert list(found) == ["good"]
+    assert len(found["good"]) == 384
+
+
+def test_get_many_skips_vectors_stored_before_the_check(cache):
+    # An entry written under the wrong namespace by an older build is never served
+    cache.put_many("custom:model", {"h": [1.0] * 768})
+    cache._connection().execute("UPDATE embeddings SET namespace = ?", (HF,))
+    assert cache.get_many(HF, ["h"]) == {}
+
+
+def test_namespaces_are_separate(cache):
+    cache.put_many(HF, {"h": [1.0] * 384})
+    assert cache.get_many(GEMINI, ["h"]) == {}
+
+
+def test_oldest_entries_are_evicted(cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("utils.embedding_cache.time.time", lambda: now[0])
+    for name in ("a", "b", "c"):
+        cache.put_many(HF, {name: [1.0] * 384})
+        now[0] += 1
+    cache.get_many(HF, ["a"])
+    now[0] += 1
+    cache.put_many(HF, {"d": [1.0] * 384})
+    assert sorted(cache.get_many(HF, ["a", "b", "c", "d"])) == ["a", "c", "d"]
+
+
+def test_cached_embeddings_only_embed_missing_texts(cache):
+    model = FakeEmbeddings(384)
+    cached = CachedEmbeddings(model, "huggingface", cache=cache)
+    first = cached.embed_documents(["one", "two", "one"])
+    second = cached.embed_documents(["two", "three"])
+    assert model.calls == [["one", "two"], ["three"]]
+    assert first[0] == first[2]
+    assert second[0] == first[1]
+    assert cache.get_many(HF, [text_hash("three")])
+
+
+def test_cached_embeddings_do_not_cache_another_providers_vectors(cache):
+    # A model of the wrong provider still answers the call but poisons nothing
+    model = FakeEmbeddings(768)
+    cached = CachedEmbeddings(model, "huggingface", cache=cache)
+    cached.embed_documents(["text"])
+    assert cache.get_many(HF, [text_hash("text")]) == {}
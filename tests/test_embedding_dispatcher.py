@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("langchain_core")
+
+from utils.embedding_dispatcher import EmbeddingDispatcher
+
+
+class FakeEmbeddings:
+    def __init__(self, value, dim):
+        self.value = value
+        self.dim = dim
+        self.calls = []
+
+    def embed_documents(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        return [[self.value] * self.dim for _ in texts]
+
+    def embed_query(self, text):
+        return [self.value] * self.dim
+
+
+def _embed_concurrently(dispatcher, requests):
+    results = [None] * len(requests)
+    barrier = threading.Barrier(len(requests))
+
+    def call(i, text, model, provider):
+        barrier.wait()
+        results[i] = dispatcher.embed_query(text, model, provider)
+
+    threads = [threading.Thread(target=call, args=(i, *request)) for i, request in enumerate(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return results
+
+
+def test_batches_are_grouped_by_provider():
+    dispatcher = EmbeddingDispatcher(max_wait_ms=200, max_batch_size=16)
+    gemini, local = FakeEmbeddings(1.0, 768), FakeEmbeddings(2.0, 384)
+    requests = [("a", gemini, "gemini"), ("b", local, "huggingface"), ("c", gemini, "gemini"), ("d", local, "huggingface")]
+    results = _embed_concurrently(dispatcher, requests)
+
+    for (text, model, provider), (vector, produced_by) in zip(requests, results):
+        assert produced_by == provider
+        assert len(vector) == model.dim
+    assert sorted(t for call in gemini.calls for t in call) == ["a", "c"]
+    assert sorted(t for call in local.calls for t in call) == ["b", "d"]
+
+
+def test_identical_texts_share_one_slot():
+    dispatcher = EmbeddingDispatcher(max_wait_ms=200, max_batch_size=16)
+    local = FakeEmbeddings(2.0, 384)
+    results = _embed_concurrently(dispatcher, [("same", local, "huggingface")] * 3)
+    assert all(result == results[0] for result in results)
+    assert sum(len(call) for call in local.calls) + dispatcher.deduplicated == 3
+    assert dispatcher.stats()["texts_embedded"] == sum(len(call) for call in local.calls)
+
+
+def test_errors_reach_only_the_failing_providers_callers():
+    class Failing(FakeEmbeddings):
+        def embed_documents(self, texts, **kwargs):
+            raise RuntimeError("quota exhausted")
+
+    dispatcher = EmbeddingDispatcher(max_wait_ms=10, max_batch_size=16)
+    with pytest.raises(RuntimeError):
+        dispatcher.embed_query("a", Failing(1.0, 768), "gemini")
+    vector, provider = dispatcher.embed_query("b", FakeEmbeddings(2.0, 384), "huggingface")
+    assert provider == "huggingface"
+    assert dispatcher.stats()["errors"] == 1
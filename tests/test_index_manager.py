@@ -0,0 +1,185 @@
+import contextlib
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+for module in ("sqlalchemy", "passlib", "jose", "fastapi", "langchain_community"):
+    pytest.importorskip(module)
+
+from db import index_manager
+from db.index_store import InternshipIndex
+from db.index_manager import ResidentIndexManager
+from services import index_rebuild
+from services.index_rebuild import IndexRebuildWorker
+
+
+class Environment:
+    """Which provider the embeddings fallback routes to and which indexes exist on disk."""
+
+    def __init__(self, monkeypatch):
+        self.provider = "gemini"
+        self.built = {"gemini"}
+        self.loads = []
+        monkeypatch.setattr(index_manager, "get_embedding_type", lambda: self.provider)
+        monkeypatch.setattr(index_manager, "has_index", lambda provider=None: provider in self.built)
+        monkeypatch.setattr(index_manager, "current_index_version", lambda provider=None: f"v-{provider}")
+        monkeypatch.setattr(index_manager, "versions_dir", lambda provider=None: "/versions")
+
+    def loader(self, index_dir, provider):
+        self.loads.append(provider)
+        self.built.add(provider)
+        return SimpleNamespace(provider=provider, job_ids=[])
+
+
+@pytest.fixture
+def env(monkeypatch):
+    return Environment(monkeypatch)
+
+
+@pytest.fixture
+def manager(env):
+    return ResidentIndexManager(loader=env.loader)
+
+
+def test_first_use_loads_the_routed_provider(env, manager):
+    assert manager.current().provider == "gemini"
+    assert env.loads == ["gemini"]
+
+
+def test_reroute_without_an_index_keeps_serving_and_queues_one_build(env, manager):
+    requested = []
+    manager.set_rebuild_handler(lambda provider: requested.append(provider) or SimpleNamespace(status="queued"))
+    manager.current()
+    env.provider = "huggingface"
+
+    assert manager.current().provider == "gemini"
+    assert manager.current().provider == "gemini"
+    assert requested == ["huggingface"]
+    assert env.loads == ["gemini"]
+    assert manager.stats()["pending_builds"] == ["huggingface"]
+
+
+def test_reroute_without_a_handler_never_builds_inline(env, manager):
+    manager.current()
+    env.provider = "huggingface"
+    assert manager.current().provider == "gemini"
+    assert env.loads == ["gemini"]
+
+
+def test_failed_build_is_requested_again(env, manager):
+    jobs = []
+
+    def handler(provider):
+        jobs.append(SimpleNamespace(status="queued"))
+        return jobs[-1]
+
+    manager.set_rebuild_handler(handler)
+    manager.current()
+    env.provider = "huggingface"
+    manager.current()
+    jobs[0].status = "failed"
+    manager.current()
+    assert len(jobs) == 2
+
+
+def test_reroute_to_an_existing_index_switches_and_back(env, manager):
+    env.built.add("huggingface")
+    manager.current()
+    env.provider = "huggingface"
+    assert manager.current().provider == "huggingface"
+    env.provider = "gemini"
+    assert manager.current().provider == "gemini"
+    assert env.loads == ["gemini", "huggingface", "gemini"]
+
+
+def test_reroute_build_runs_on_the_rebuild_worker(env, manager, monkeypatch):
+    monkeypatch.setattr(index_rebuild, "resident_index", manager)
+    monkeypatch.setattr(index_rebuild.vectorstore, "last_build_stats", {}, raising=False)
+    builds = []
+
+    def build(provider):
+        builds.append(provider)
+        return env.loader(None, provider)
+
+    worker = IndexRebuildWorker(build=build)
+    manager.set_rebuild_handler(worker.request_rebuild)
+    manager.current()
+    env.provider = "huggingface"
+    assert manager.current().provider == "gemini"
+
+    job = manager._pending_builds["huggingface"]
+    deadline = time.monotonic() + 5
+    while job.status in ("queued", "running") and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert job.status == "succeeded"
+    assert builds == ["huggingface"]
+    assert manager.current().provider == "huggingface"
+    assert manager.stats()["pending_builds"] == []
+
+
+def _store(index):
+    index.add(np.random.default_rng(0).random((3, 4), dtype=np.float32))
+    store = InternshipIndex.from_vectors(index, [1, 1, 2])
+    store.provider = "gemini"
+    return store
+
+
+@pytest.fixture
+def saved(monkeypatch):
+    versions = []
+    monkeypatch.setattr(index_manager, "index_write_lock", contextlib.nullcontext)
+    monkeypatch.setattr(index_manager, "save_index_version", lambda vectorstore, provider=None: versions.append(vectorstore))
+    return versions
+
+
+def test_flat_removal_is_applied_in_place(manager, saved):
+    manager.loader = lambda index_dir, provider: _store(faiss.IndexFlatL2(4))
+    generation = manager.remove_internship(1)
+    assert generation.vectorstore.job_ids.tolist() == [2]
+    assert saved == [generation.vectorstore]
+
+
+def test_change_to_no_indexed_job_publishes_nothing(manager, saved):
+    manager.loader = lambda index_dir, provider: _store(faiss.IndexFlatL2(4))
+    previous = manager.current()
+    assert manager.remove_internship(99) is previous
+    assert saved == []
+
+
+def test_hnsw_removal_is_queued_as_a_rebuild(manager, saved):
+    manager.loader = lambda index_dir, provider: _store(faiss.IndexHNSWFlat(4, 8))
+    requested = []
+    manager.set_rebuild_handler(lambda provider: requested.append(provider) or SimpleNamespace(status="queued"))
+    previous = manager.current()
+    assert manager.remove_internship(1) is previous
+    assert requested == ["gemini"]
+    assert saved == []
+    # A job the graph does not hold needs no rebuild
+    assert manager.remove_internship(99) is previous
+    assert requested == ["gemini"]
+
+
+def test_rebuild_requests_coalesce_per_provider(monkeypatch):
+    worker = IndexRebuildWorker(build=lambda provider: None)
+    # Keep the jobs queued: no worker thread is started
+    monkeypatch.setattr(index_rebuild.threading, "Thread", lambda *a, **k: SimpleNamespace(start=lambda: None, is_alive=lambda: True))
+    first = worker.request_rebuild("huggingface")
+    assert worker.request_rebuild("huggingface") is first
+    assert worker.request_rebuild("gemini") is not first
+    assert first.coalesced_requests == 2
+    assert first.provider == "huggingface"
+
+
+def test_stats_before_warm_up_do_not_resolve_the_index_path(env, monkeypatch, manager):
+    def resolve(provider=None):
+        raise AssertionError("the /metrics scrape resolved the embeddings provider")
+    monkeypatch.setattr(index_manager, "vectorstore_path", resolve)
+
+    stats = manager.stats()
+
+    assert stats["loaded"] is False
+    assert stats["path"] is None
@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+pytest.importorskip("langchain")
+
+from db.index_factory import set_search_params
+from db.index_store import InternshipIndex
+
+DIM = 8
+
+
+def _index(job_ids, full_vectors=False, texts=True, seed=0, index=None):
+    vectors = np.random.default_rng(seed).random((len(job_ids), DIM), dtype=np.float32)
+    index = index if index is not None else faiss.IndexFlatL2(DIM)
+    if not index.is_trained:
+        index.train(np.random.default_rng(seed + 1).random((256, DIM), dtype=np.float32))
+    index.add(vectors)
+    chunk_texts = [f"job {job_id} chunk {i}" for i, job_id in enumerate(job_ids)] if texts else None
+    built = InternshipIndex.from_vectors(index, job_ids, chunk_texts, full_vectors=vectors if full_vectors else None)
+    built.provider = "huggingface"
+    return built, vectors
+
+
+@pytest.mark.parametrize("full_vectors", [False, True])
+def test_without_jobs_drops_every_chunk_of_the_jobs(full_vectors):
+    store, vectors = _index([1, 2, 1, 3], full_vectors)
+    pruned = store.without_jobs([1])
+    assert pruned.ntotal == 2
+    assert pruned.job_ids.tolist() == [2, 3]
+    assert [pruned.text(i) for i in range(2)] == ["job 2 chunk 1", "job 3 chunk 3"]
+    if full_vectors:
+        np.testing.assert_allclose(pruned.full_vectors, vectors[[1, 3]])
+    # Labels stay dense: the nearest neighbour of a kept vector is its new label
+    _, labels = pruned.search_labels(vectors[3], 1)
+    assert labels.tolist() == [1]
+
+
+def test_without_jobs_leaves_the_original_untouched():
+    store, _ = _index([1, 2])
+    store.without_jobs([1, 2])
+    assert store.ntotal == 2
+    assert store.job_ids.tolist() == [1, 2]
+
+
+def test_without_unknown_jobs_is_a_no_op():
+    store, _ = _index([1, 2])
+    assert store.without_jobs([99]) is store
+
+
+@pytest.mark.parametrize("make_index", [
+    lambda: faiss.IndexIVFFlat(faiss.IndexFlatL2(DIM), DIM, 4),
+    lambda: faiss.IndexHNSWFlat(DIM, 8),
+    lambda: faiss.IndexScalarQuantizer(DIM, faiss.ScalarQuantizer.QT_8bit),
+], ids=["ivf", "hnsw", "sq8"])
+def test_without_jobs_keeps_labels_dense_for_every_index_type(make_index):
+    job_ids = [1, 2, 1, 3, 2, 4]
+    store, vectors = _index(job_ids, index=make_index())
+    set_search_params(store.index, nprobe=4)
+    pruned = store.without_jobs([1, 3])
+    assert pruned.job_ids.tolist() == [2, 2, 4]
+    assert [pruned.text(i) for i in range(3)] == ["job 2 chunk 1", "job 2 chunk 4", "job 4 chunk 5"]
+    _, labels = pruned.search_labels_batch(vectors[[1, 4, 5]], 1)
+    assert labels[:, 0].tolist() == [0, 1, 2]
+
+
+def test_with_chunks_appends_vectors_texts_and_job_ids():
+    store, _ = _index([1, 2], full_vectors=True)
+    new = np.random.default_rng(1).random((2, DIM), dtype=np.float32)
+    grown = store.with_chunks(new, [5, 5], ["job 5 a", "job 5 b"])
+    assert grown.ntotal == 4
+    assert grown.job_ids.tolist() == [1, 2, 5, 5]
+    assert grown.text(3) == "job 5 b"
+    np.testing.assert_allclose(grown.full_vectors[2:], new)
+    assert grown.provider == "huggingface"
+    assert store.ntotal == 2
+
+
+def test_with_no_chunks_is_a_copy():
+    store, _ = _index([1, 2])
+    assert store.with_chunks(None, []).ntotal == 2
+
+
+def test_upsert_round_trip_replaces_a_jobs_vectors():
+    store, _ = _index([1, 2, 1])
+    new = np.random.default_rng(2).random((1, DIM), dtype=np.float32)
+    updated = store.without_jobs([1]).with_chunks(new, [1], ["job 1 new"])
+    assert updated.job_ids.tolist() == [2, 1]
+    assert updated.text(1) == "job 1 new"
+
+
+def test_rerank_returns_exact_neighbours():
+    store, vectors = _index([1, 2, 3, 4], full_vectors=True)
+    store.rerank_factor = 2
+    distances, labels = store.search_labels(vectors[2], 2)
+    assert labels[0] == 2
+    assert distances[0] == pytest.approx(0.0, abs=1e-6)
+
+
+def test_with_chunks_rejects_vectors_of_another_dimension():
+    store, _ = _index([1])
+    with pytest.raises(ValueError):
+        store.with_chunks(np.ones((2, DIM // 2), dtype=np.float32), [7, 7])
+
+
+def test_with_chunks_rejects_a_vector_count_mismatch():
+    store, _ = _index([1])
+    with pytest.raises(ValueError):
+        store.with_chunks(np.ones((1, DIM), dtype=np.float32), [7, 7])
+
+
+def test_as_query_matrix_never_reshapes():
+    store, _ = _index([1])
+    assert store.as_query_matrix([np.ones(DIM)]).shape == (1, DIM)
+    assert store.as_query_matrix([]).shape == (0, DIM)
+    # One 8-dim vector must not become two 4-dim queries, nor the reverse
+    with pytest.raises(ValueError):
+        store.as_query_matrix(np.ones(DIM * 2))
+    with pytest.raises(ValueError):
+        store.as_query_matrix([np.ones(DIM // 2), np.ones(DIM // 2)])
+
+
+def test_search_rejects_a_query_from_another_provider():
+    store, _ = _index([1, 2])
+    with pytest.raises(ValueError):
+        store.search_labels(np.ones(DIM * 2, dtype=np.float32), 1)
+    with pytest.raises(ValueError):
+        store.search_labels_batch([np.ones(DIM // 2, dtype=np.float32)], 1)
@@ -0,0 +1,127 @@
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+for module in ("fastapi", "httpx", "sqlalchemy", "passlib", "jose", "langchain_community", "langchain_google_genai"):
+    pytest.importorskip(module)
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import faiss
+from db.index_manager import IndexGeneration
+from db.index_store import InternshipIndex
+from routes import internship_routes
+from services import recommendation
+from services import index_rebuild
+from services.index_rebuild import IndexRebuildWorker
+from utils.auth import create_access_token
+
+
+def _headers(user_type):
+    return {"Authorization": f"Bearer {create_access_token({'sub': 'acme', 'user_type': user_type})}"}
+
+
+COMPANY = _headers("company")
+STUDENT = _headers("student")
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(internship_routes.router, prefix="/company")
+    return TestClient(app)
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    worker = IndexRebuildWorker(build=lambda provider: None)
+    # Keep jobs queued: no worker thread is started
+    monkeypatch.setattr(index_rebuild.threading, "Thread", lambda *a, **k: SimpleNamespace(start=lambda: None, is_alive=lambda: True))
+    monkeypatch.setattr(internship_routes, "rebuild_worker", worker)
+    return worker
+
+
+@pytest.mark.parametrize("method, path", [("post", "/company/reindex"), ("get", "/company/reindex/abc")])
+def test_reindex_requires_a_company_token(client, worker, method, path):
+    assert getattr(client, method)(path).status_code == 401
+    assert getattr(client, method)(path, headers=STUDENT).status_code == 403
+
+
+def test_reindex_requests_join_the_queued_rebuild(client, worker):
+    first = client.post("/company/reindex", headers=COMPANY)
+    second = client.post("/company/reindex", headers=COMPANY)
+    assert first.status_code == second.status_code == 202
+    assert second.json()["job_id"] == first.json()["job_id"]
+    assert second.json()["coalesced_requests"] == 2
+
+    status = client.get(f"/company/reindex/{first.json()['job_id']}", headers=COMPANY)
+    assert status.json()["status"] == "queued"
+    assert client.get("/company/reindex/unknown", headers=COMPANY).status_code == 404
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    """A four-job index (one chunk each, job j at [j, 0, 0, 0]) and stored resume vectors."""
+    vectors = np.zeros((4, 4), dtype=np.float32)
+    vectors[:, 0] = np.arange(1, 5)
+    index = faiss.IndexFlatL2(4)
+    index.add(vectors)
+    store = InternshipIndex.from_vectors(index, [1, 2, 3, 4])
+    store.provider = "huggingface"
+    generation = IndexGeneration(store, "v1", 1)
+    monkeypatch.setattr(recommendation.resident_index, "current", lambda: generation)
+    internships = {
+        job_id: SimpleNamespace(job_id=job_id, title=f"Job {job_id}", description="", skills_required="python",
+                                location="Remote", stipend="10000", duration="3 months")
+        for job_id in (1, 2, 3, 4)
+    }
+    monkeypatch.setattr(recommendation, "_fetch_internships", lambda job_ids: {j: internships[j] for j in job_ids})
+    embeddings = {"s1": [1.1, 0, 0, 0], "s2": [3.9, 0, 0, 0], "s3": [1.0, 0, 0]}
+    monkeypatch.setattr(
+        internship_routes.crud, "iter_resume_embeddings",
+        lambda student_ids: ((sid, embeddings[sid]) for sid in student_ids if sid in embeddings),
+    )
+
+
+def _batch(client, headers=COMPANY, **body):
+    body.setdefault("student_ids", ["s1", "s2", "s3"])
+    return client.post("/company/batch_recommendations", json=body, headers=headers)
+
+
+def test_batch_recommendations_require_a_company_token(client, catalog):
+    assert _batch(client, headers={}).status_code == 401
+    assert _batch(client, headers=STUDENT).status_code == 403
+
+
+def test_batch_recommendations_stream_one_line_per_student(client, catalog):
+    response = _batch(client, top_k=2)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = {line["student_id"]: line for line in map(json.loads, response.text.splitlines())}
+    assert sorted(lines) == ["s1", "s2", "s3"]
+    assert [r["job_id"] for r in lines["s1"]["recommendations"]] == [1, 2]
+    assert [r["job_id"] for r in lines["s2"]["recommendations"]] == [4, 3]
+    # A resume embedded by another provider is reported, not searched
+    assert lines["s3"]["recommendations"] == []
+    assert "dimension" in lines["s3"]["error"]
+
+
+def test_batch_recommendations_limit_the_request_size(client, catalog, monkeypatch):
+    monkeypatch.setattr(internship_routes, "BATCH_RECOMMENDATIONS_MAX_STUDENTS", 2)
+    assert _batch(client).status_code == 413
+    assert _batch(client, student_ids=[]).status_code == 400
+    assert client.post("/company/batch_recommendations", json={}, headers=COMPANY).status_code == 422
+    assert _batch(client, student_ids=["s1"], top_k=1000).status_code == 400
+
+
+def test_candidates_require_a_company_token(client, monkeypatch):
+    monkeypatch.setattr(internship_routes, "get_top_candidates_for_internship",
+                        lambda job_id, top_n: [{"student_id": "s1", "score": 0.9, "summary": "Python"}])
+    assert client.get("/company/internships/1/candidates").status_code == 401
+    assert client.get("/company/internships/1/candidates", headers=STUDENT).status_code == 403
+    response = client.get("/company/internships/1/candidates", headers=COMPANY)
+    assert response.status_code == 200
+    assert response.json()["candidates"][0]["student_id"] == "s1"
@@ -0,0 +1,119 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+from db.job_filters import (
+    JobAttributeIndex,
+    SearchFilters,
+    parse_duration_months,
+    parse_stipend,
+    search_parameters,
+)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("₹ 10,000 /month", 10000),
+    ("15k per month", 15000),
+    ("Unpaid", 0),
+    ("120000 per annum", 10000),
+    ("1000 /week", 4345),
+    ("Performance based", -1),
+    ("", -1),
+    (None, -1),
+])
+def test_parse_stipend(text, expected):
+    assert parse_stipend(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("3 Months", 3),
+    ("6 weeks", 2),
+    ("1 year", 12),
+    ("Flexible", -1),
+    (None, -1),
+])
+def test_parse_duration_months(text, expected):
+    assert parse_duration_months(text) == expected
+
+
+def _internship(job_id, stipend, duration, location):
+    return SimpleNamespace(job_id=job_id, stipend=stipend, duration=duration, location=location)
+
+
+INTERNSHIPS = [
+    _internship(1, "10000 /month", "3 months", "Bangalore"),
+    _internship(2, "Unpaid", "6 weeks", "Work From Home"),
+    _internship(3, None, None, "Remote"),
+    _internship(4, "25k /month", "6 months", "Mumbai, Pune"),
+]
+# Two chunks for job 1, one for job 2, two for job 4, one for job 3
+VECTOR_JOB_IDS = [1, 1, 2, 4, 4, 3]
+
+
+@pytest.fixture
+def attributes():
+    return JobAttributeIndex(VECTOR_JOB_IDS, INTERNSHIPS)
+
+
+def test_empty_filters(attributes):
+    filters = SearchFilters(locations=["  ", ""])
+    assert filters.is_empty()
+    assert sorted(attributes.allowed_jobs(filters)) == [1, 2, 3, 4]
+
+
+def test_remote_only(attributes):
+    assert sorted(attributes.allowed_jobs(SearchFilters(remote_only=True))) == [2, 3]
+
+
+def test_locations_match_substrings_case_insensitively(attributes):
+    assert sorted(attributes.allowed_jobs(SearchFilters(locations=["pune", " BANGALORE "]))) == [1, 4]
+
+
+def test_unknown_values_never_satisfy_numeric_bounds(attributes):
+    assert sorted(attributes.allowed_jobs(SearchFilters(max_stipend=12000))) == [1, 2]
+    assert sorted(attributes.allowed_jobs(SearchFilters(min_stipend=0))) == [1, 2, 4]
+    assert sorted(attributes.allowed_jobs(SearchFilters(max_duration_months=3))) == [1, 2]
+    assert sorted(attributes.allowed_jobs(SearchFilters(min_duration_months=4))) == [4]
+
+
+def test_filters_combine(attributes):
+    filters = SearchFilters(min_stipend=5000, max_duration_months=6, locations=["mumbai", "bangalore"])
+    assert sorted(attributes.allowed_jobs(filters)) == [1, 4]
+
+
+def test_label_mask_follows_vector_labels(attributes):
+    mask = attributes.label_mask(SearchFilters(remote_only=True))
+    assert mask.tolist() == [False, False, True, False, False, True]
+
+
+def test_key_ignores_location_order():
+    assert SearchFilters(locations=["Pune", "Delhi"]).key() == SearchFilters(locations=["delhi", "pune"]).key()
+
+
+def _assert_search_stays_inside_mask(index, mask):
+    queries = np.random.default_rng(1).random((5, index.d), dtype=np.float32)
+    _, labels = index.search(queries, 4, params=search_parameters(index, mask))
+    found = labels[labels >= 0]
+    assert len(found)
+    assert mask[found].all()
+
+
+def test_search_parameters_restrict_flat_search(attributes):
+    vectors = np.random.default_rng(0).random((len(VECTOR_JOB_IDS), 8), dtype=np.float32)
+    index = faiss.IndexFlatL2(8)
+    index.add(vectors)
+    _assert_search_stays_inside_mask(index, attributes.label_mask(SearchFilters(remote_only=True)))
+
+
+def test_search_parameters_restrict_ivf_search():
+    vectors = np.random.default_rng(0).random((200, 8), dtype=np.float32)
+    index = faiss.IndexIVFFlat(faiss.IndexFlatL2(8), 8, 4)
+    index.train(vectors)
+    index.add(vectors)
+    index.nprobe = 4
+    mask = np.zeros(200, dtype=bool)
+    mask[::7] = True
+    _assert_search_stays_inside_mask(index, mask)
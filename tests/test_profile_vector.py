@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("langchain_core")
+
+from services.profile_vector import (
+    blend_profile,
+    decode_vector,
+    describe_profile,
+    encode_vector,
+    profile_weights,
+    push_query,
+)
+
+
+def test_weights_sum_to_one_with_recency_decay():
+    weights = profile_weights(True, 3, resume_weight=0.5, decay=0.5)
+    np.testing.assert_allclose(weights, [0.5, 0.5 / 7, 1.0 / 7, 2.0 / 7])
+    np.testing.assert_allclose(weights.sum(), 1.0)
+
+
+def test_weights_without_resume_or_queries():
+    np.testing.assert_allclose(profile_weights(False, 2, decay=0.5), [1 / 3, 2 / 3])
+    np.testing.assert_allclose(profile_weights(True, 0), [1.0])
+    assert len(profile_weights(False, 0)) == 0
+
+
+def test_blend_is_unit_length_and_leans_towards_newer_queries():
+    resume = np.array([1.0, 0.0, 0.0])
+    older, newer = np.array([0.0, 1.0, 0.0]), np.array([0.0, 0.0, 1.0])
+    profile = blend_profile(resume, [older, newer], resume_weight=0.5, decay=0.5)
+    assert profile.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(profile), 1.0, rtol=1e-6)
+    assert profile[0] > profile[2] > profile[1] > 0
+
+
+def test_blend_of_resume_only_is_the_normalized_resume():
+    np.testing.assert_allclose(blend_profile([3.0, 4.0]), [0.6, 0.8], rtol=1e-6)
+
+
+def test_blend_ignores_vectors_from_another_provider():
+    resume = np.ones(4)
+    profile = blend_profile(resume, [np.ones(3), np.array([1.0, 0.0, 0.0, 0.0])], resume_weight=0.5)
+    assert profile.shape == (4,)
+    np.testing.assert_allclose(profile, blend_profile(resume, [np.array([1.0, 0.0, 0.0, 0.0])], resume_weight=0.5))
+
+
+def test_blend_falls_back_to_queries_when_the_resume_dimension_differs():
+    profile = blend_profile(np.ones(3), [np.ones(4)])
+    assert profile is not None
+    assert profile.shape == (3,)
+
+
+def test_blend_of_nothing_is_none():
+    assert blend_profile(None, []) is None
+
+
+def test_session_encoding_round_trips():
+    vector = np.array([0.25, -1.5, 3.0], dtype=np.float32)
+    np.testing.assert_array_equal(decode_vector(encode_vector(vector)), vector)
+    np.testing.assert_array_equal(decode_vector([0.25, -1.5, 3.0]), vector)
+    assert decode_vector(None) is None
+    assert decode_vector("") is None
+
+
+def test_push_query_keeps_the_newest():
+    history = []
+    for value in range(5):
+        history = push_query(history, [float(value)], max_queries=3)
+    assert [decode_vector(v)[0] for v in history] == [2.0, 3.0, 4.0]
+
+
+def test_describe_profile_lists_components():
+    data = describe_profile(encode_vector([1.0, 0.0]), [encode_vector([0.0, 1.0])])
+    assert data["dim"] == 2
+    assert [c["source"] for c in data["components"]] == ["resume", "query[-1]"]
+    np.testing.assert_allclose(sum(c["weight"] for c in data["components"]), 1.0, rtol=1e-3)
@@ -0,0 +1,90 @@
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("langchain_core")
+
+from utils.embedding_cache import EmbeddingCache
+from utils.query_embedding_cache import QueryEmbeddingCache, normalize_query
+
+
+class Embedder:
+    def __init__(self, dim=384):
+        self.dim = dim
+        self.calls = []
+
+    def __call__(self, text):
+        self.calls.append(text)
+        return [float(len(self.calls))] * self.dim
+
+
+def test_normalized_queries_share_one_entry():
+    cache = QueryEmbeddingCache(max_entries=8, ttl_seconds=0)
+    embed = Embedder()
+
+    first = cache.get_or_embed("huggingface", "Show me  internships", embed)
+    second = cache.get_or_embed("huggingface", " show me internships ", embed)
+
+    assert normalize_query("Show me  internships") == "show me internships"
+    assert second == first
+    assert len(embed.calls) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_providers_never_share_vectors():
+    cache = QueryEmbeddingCache(max_entries=8, ttl_seconds=0)
+    cache.get_or_embed("huggingface", "python", Embedder(384))
+    gemini = cache.get_or_embed("gemini", "python", Embedder(768))
+    assert len(gemini) == 768
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QueryEmbeddingCache(max_entries=2, ttl_seconds=0)
+    embed = Embedder()
+    cache.get_or_embed("huggingface", "a", embed)
+    cache.get_or_embed("huggingface", "b", embed)
+    cache.get_or_embed("huggingface", "a", embed)
+    cache.get_or_embed("huggingface", "c", embed)
+
+    cache.get_or_embed("huggingface", "a", embed)
+    cache.get_or_embed("huggingface", "b", embed)
+
+    assert embed.calls == ["a", "b", "c", "b"]
+    assert cache.stats()["evictions"] == 2
+
+
+def test_expired_entries_are_embedded_again(monkeypatch):
+    from utils import query_embedding_cache as module
+    now = [1000.0]
+    monkeypatch.setattr(module.time, "time", lambda: now[0])
+    cache = QueryEmbeddingCache(max_entries=8, ttl_seconds=60)
+    embed = Embedder()
+
+    cache.get_or_embed("huggingface", "python", embed)
+    now[0] += 61
+    cache.get_or_embed("huggingface", "python", embed)
+
+    assert len(embed.calls) == 2
+
+
+def test_vectors_of_another_dimension_are_not_cached():
+    cache = QueryEmbeddingCache(max_entries=8, ttl_seconds=0)
+    embed = Embedder(dim=768)
+
+    cache.get_or_embed("huggingface", "python", embed)
+    cache.get_or_embed("huggingface", "python", embed)
+
+    assert len(embed.calls) == 2
+    assert cache.stats()["rejected"] == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_disk_tier_is_shared_between_caches(tmp_path):
+    disk = EmbeddingCache(path=str(tmp_path / "embeddings.db"), max_entries=8)
+    embed = Embedder()
+    vector = QueryEmbeddingCache(max_entries=8, ttl_seconds=0, disk=disk).get_or_embed("huggingface", "python", embed)
+
+    other_worker = QueryEmbeddingCache(max_entries=8, ttl_seconds=0, disk=disk)
+
+    assert other_worker.get_or_embed("huggingface", "Python", embed) == vector
+    assert len(embed.calls) == 1
+    assert other_worker.stats()["disk_hits"] == 1
@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("dotenv")
+
+from services.recommendation_cache import RecommendationCache, recommendation_fingerprint
+
+
+def _recs(*scored_jobs):
+    return [{"job_id": job_id, "score": score} for job_id, score in scored_jobs]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return RecommendationCache(path=str(tmp_path / "recommendations.db"), max_entries=10)
+
+
+@pytest.fixture
+def filled(cache):
+    """Three students far apart in a 2-d space, each with a full top-2 list cached at version v1."""
+    entries = {
+        "near": ([0.0, 0.0], _recs((1, 0.5), (2, 0.4))),
+        "far": ([10.0, 10.0], _recs((3, 0.3), (4, 0.2))),
+        "other": ([-10.0, -10.0], _recs((6, 0.4), (7, 0.3))),
+    }
+    for student_id, (embedding, recs) in entries.items():
+        cache.put(student_id, "[]", _fingerprint(embedding), "v1", embedding, recs, 2, "max")
+    return cache
+
+
+def _fingerprint(embedding):
+    return recommendation_fingerprint(embedding, "summary", 2, "max")
+
+
+def _cached(cache, student_id, embedding, version):
+    return cache.get(student_id, "[]", _fingerprint(embedding), version)
+
+
+def test_entries_are_served_only_for_the_same_fingerprint_and_epoch(filled):
+    assert _cached(filled, "near", [0.0, 0.0], "v1") == _recs((1, 0.5), (2, 0.4))
+    assert _cached(filled, "near", [0.5, 0.0], "v1") is None
+    # A version no incremental change produced (a full rebuild) starts a new epoch
+    assert _cached(filled, "near", [0.0, 0.0], "rebuilt") is None
+
+
+def test_edited_job_drops_only_the_entries_that_recommended_it(filled):
+    dropped = filled.on_catalog_change("v1", "v2", {1: np.asarray([[50.0, 50.0]])})
+
+    assert dropped == 1
+    assert _cached(filled, "near", [0.0, 0.0], "v2") is None
+    assert _cached(filled, "far", [10.0, 10.0], "v2") == _recs((3, 0.3), (4, 0.2))
+    assert _cached(filled, "other", [-10.0, -10.0], "v2") is not None
+
+
+def test_new_job_drops_entries_it_would_enter(filled):
+    # Similarity 1/(1+0.25) = 0.8 to "far", above its lowest recommendation
+    dropped = filled.on_catalog_change("v1", "v2", {5: np.asarray([[10.0, 10.5]])})
+
+    assert dropped == 1
+    assert _cached(filled, "far", [10.0, 10.0], "v2") is None
+    assert _cached(filled, "near", [0.0, 0.0], "v2") is not None
+
+
+def test_short_lists_are_invalidated_by_any_new_job(cache):
+    cache.put("few", "[]", _fingerprint([0.0, 0.0]), "v1", [0.0, 0.0], _recs((1, 0.9)), 2, "max")
+
+    assert cache.on_catalog_change("v1", "v2", {5: np.asarray([[100.0, 100.0]])}) == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = RecommendationCache(path=str(tmp_path / "recommendations.db"), max_entries=2)
+    for student_id in ("a", "b"):
+        cache.put(student_id, "[]", _fingerprint([0.0, 0.0]), "v1", [0.0, 0.0], _recs((1, 0.5)), 1, "max")
+    _cached(cache, "a", [0.0, 0.0], "v1")
+    cache.put("c", "[]", _fingerprint([0.0, 0.0]), "v1", [0.0, 0.0], _recs((1, 0.5)), 1, "max")
+
+    assert _cached(cache, "b", [0.0, 0.0], "v1") is None
+    assert _cached(cache, "a", [0.0, 0.0], "v1") is not None
+
+
+def test_index_changes_reach_the_cache_through_the_listener(monkeypatch):
+    for module in ("sqlalchemy", "faiss", "langchain_community", "langchain_google_genai"):
+        pytest.importorskip(module)
+    from db.index_manager import resident_index
+    from services import recommendation
+
+    calls = []
+    monkeypatch.setattr(recommendation, "recommendation_cache", SimpleNamespace(
+        on_catalog_change=lambda previous, version, job_vectors: calls.append((previous, version, job_vectors))
+    ))
+    vectors = {7: np.ones((2, 3), dtype=np.float32), 8: np.zeros((0, 3), dtype=np.float32)}
+    generation = SimpleNamespace(signature="v2", vectorstore=SimpleNamespace(job_vectors=vectors.__getitem__))
+
+    assert recommendation._invalidate_cached_recommendations in resident_index._change_listeners
+    recommendation._invalidate_cached_recommendations(SimpleNamespace(signature="v1"), generation, [7, 8])
+    # Legacy unversioned indexes have no version to carry entries to
+    recommendation._invalidate_cached_recommendations(SimpleNamespace(signature=(1, 2)), generation, [7])
+
+    assert [(previous, version, sorted(job_vectors)) for previous, version, job_vectors in calls] == [("v1", "v2", [7, 8])]
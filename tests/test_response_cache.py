@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("langchain_core")
+
+from services.response_cache import ResponseCache
+
+ANSWER = {"model": "gemini", "content": "Learn SQL next."}
+
+VECTORS = {
+    "What should I learn next?": [1.0, 0.0, 0.0],
+    "What should I learn next ?": [0.99, 0.05, 0.0],
+    "Which companies hire interns?": [0.0, 1.0, 0.0],
+}
+
+
+def _embed(text):
+    return VECTORS[text]
+
+
+def test_exact_hit_skips_the_model():
+    cache = ResponseCache(max_entries=10, ttl_seconds=60, semantic=False)
+    calls = []
+
+    def invoke():
+        calls.append(1)
+        return ANSWER
+
+    assert cache.get_or_invoke("chat", "prompt", invoke) == ANSWER
+    assert cache.get_or_invoke("chat", "prompt", invoke) == ANSWER
+    assert len(calls) == 1
+    assert cache.stats()["exact_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_kinds_do_not_share_entries():
+    cache = ResponseCache(max_entries=10, ttl_seconds=60, semantic=False)
+    cache.store("chat", "prompt", ANSWER)
+    assert cache.lookup("skills", "prompt")[0] is None
+
+
+def test_apology_is_not_cached():
+    cache = ResponseCache(max_entries=10, ttl_seconds=60, semantic=False)
+    cache.store("chat", "prompt", {"model": "none", "content": "Sorry, try again later."})
+    cache.store("chat", "empty", {"model": "gemini", "content": ""})
+    assert cache.stats()["entries"] == 0
+
+
+def test_expired_entries_are_dropped(monkeypatch):
+    cache = ResponseCache(max_entries=10, ttl_seconds=60, semantic=False)
+    now = [1000.0]
+    monkeypatch.setattr("services.response_cache.time.time", lambda: now[0])
+    cache.store("chat", "prompt", ANSWER)
+    now[0] += 61
+    assert cache.lookup("chat", "prompt")[0] is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2, ttl_seconds=60, semantic=False)
+    cache.store("chat", "a", ANSWER)
+    cache.store("chat", "b", ANSWER)
+    cache.lookup("chat", "a")
+    cache.store("chat", "c", ANSWER)
+    assert cache.lookup("chat", "b")[0] is None
+    assert cache.lookup("chat", "a")[0] == ANSWER
+    assert cache.stats()["evictions"] == 1
+
+
+def _semantic_cache():
+    cache = ResponseCache(max_entries=10, ttl_seconds=60, semantic=True, similarity=0.95)
+    response, vector = cache.lookup("chat", "prompt 1", "What should I learn next?", "profile", _embed)
+    assert response is None
+    np.testing.assert_allclose(np.linalg.norm(vector), 1.0, rtol=1e-6)
+    cache.store("chat", "prompt 1", ANSWER, "profile", vector)
+    return cache
+
+
+def test_semantic_hit_for_a_similar_question_with_the_same_profile():
+    cache = _semantic_cache()
+    response, _ = cache.lookup("chat", "prompt 2", "What should I learn next ?", "profile", _embed)
+    assert response == ANSWER
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_no_semantic_hit_below_similarity_or_across_profiles():
+    cache = _semantic_cache()
+    assert cache.lookup("chat", "prompt 3", "Which companies hire interns?", "profile", _embed)[0] is None
+    assert cache.lookup("chat", "prompt 4", "What should I learn next ?", "other profile", _embed)[0] is None
+
+
+def test_semantic_lookup_ignores_vectors_of_another_dimension():
+    cache = _semantic_cache()
+    response, _ = cache.lookup("chat", "prompt 5", "question", "profile", lambda text: [1.0, 0.0])
+    assert response is None
+
+
+def test_semantic_lookup_survives_embedding_errors():
+    cache = _semantic_cache()
+
+    def failing(text):
+        raise RuntimeError("quota")
+
+    assert cache.lookup("chat", "prompt 6", "What should I learn next?", "profile", failing) == (None, None)
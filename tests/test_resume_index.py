@@ -0,0 +1,131 @@
+import pickle
+from datetime import datetime, timedelta
+
+import pytest
+
+faiss = pytest.importorskip("faiss")
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db import resume_index as resume_index_module
+from db.database import Base
+from db.models import ResumeSummary
+from db.resume_index import ResumeIndex
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'resumes.db'}")
+    Base.metadata.create_all(engine, tables=[ResumeSummary.__table__])
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(resume_index_module, "SessionLocal", factory)
+    return factory
+
+
+def _save(factory, student_id, vector, created_at=None):
+    """Insert or update a student's row the way crud.save_resume_summary_with_embedding does."""
+    db = factory()
+    try:
+        row = db.query(ResumeSummary).filter(ResumeSummary.student_id == student_id).first()
+        if row is None:
+            row = ResumeSummary(student_id=student_id, summary_text=student_id)
+            db.add(row)
+        row.embedding_vector = pickle.dumps(vector)
+        row.created_at = (created_at or datetime.now()).isoformat()
+        db.commit()
+        return row.id
+    finally:
+        db.close()
+
+
+def _students(index, vector, top_n=10):
+    return [student_id for student_id, _ in index.search([vector], top_n)]
+
+
+def test_build_indexes_rows_of_the_requested_dimension(session_factory):
+    _save(session_factory, "a", [1.0, 0.0])
+    _save(session_factory, "b", [0.0, 1.0])
+    _save(session_factory, "c", [1.0, 0.0, 0.0])
+    index = ResumeIndex()
+    index.ensure(2)
+    assert index.size == 2
+    assert _students(index, [0.9, 0.1]) == ["a", "b"]
+
+
+def test_upsert_replaces_a_students_vector(session_factory):
+    row_id = _save(session_factory, "a", [1.0, 0.0])
+    _save(session_factory, "b", [0.0, 1.0])
+    index = ResumeIndex()
+    index.ensure(2)
+    index.upsert(row_id, "a", [0.0, 0.9])
+    assert index.size == 2
+    assert _students(index, [0.0, 0.9], top_n=1) == ["a"]
+
+
+def test_upsert_of_another_dimension_drops_the_stale_vector(session_factory):
+    row_id = _save(session_factory, "a", [1.0, 0.0])
+    _save(session_factory, "b", [0.0, 1.0])
+    index = ResumeIndex()
+    index.ensure(2)
+    index.upsert(row_id, "a", [1.0, 0.0, 0.0])
+    assert index.size == 1
+    assert _students(index, [1.0, 0.0]) == ["b"]
+
+
+def test_upsert_before_the_first_build_is_a_no_op(session_factory):
+    index = ResumeIndex()
+    index.upsert(1, "a", [1.0, 0.0])
+    assert index.index is None
+
+
+def test_sync_picks_up_rows_written_by_other_workers(session_factory):
+    _save(session_factory, "a", [1.0, 0.0])
+    index = ResumeIndex()
+    index.ensure(2)
+    # Written by another process: only the table changes
+    _save(session_factory, "b", [0.0, 1.0])
+    index.ensure(2)
+    assert index.size == 2
+    assert index.last_id == 2
+
+
+def test_sync_does_not_depend_on_the_writers_clock(session_factory):
+    _save(session_factory, "a", [1.0, 0.0])
+    index = ResumeIndex()
+    index.ensure(2)
+    _save(session_factory, "b", [0.0, 1.0], created_at=datetime.now() - timedelta(days=1))
+    index.ensure(2)
+    assert _students(index, [0.0, 1.0], top_n=1) == ["b"]
+
+
+def test_sync_rereads_in_place_updates_within_the_overlap(session_factory):
+    _save(session_factory, "a", [1.0, 0.0])
+    _save(session_factory, "b", [0.0, 1.0])
+    index = ResumeIndex()
+    index.ensure(2)
+    # Re-upload by another worker: same row id, new vector and timestamp
+    _save(session_factory, "a", [0.0, 0.9])
+    index.ensure(2)
+    assert index.size == 2
+    assert _students(index, [0.0, 0.9], top_n=1) == ["a"]
+
+
+def test_search_rejects_query_vectors_of_another_dimension(session_factory):
+    _save(session_factory, "a", [1.0, 0.0])
+    index = ResumeIndex()
+    index.ensure(2)
+    with pytest.raises(ValueError):
+        index.search([[1.0, 0.0, 0.0]])
+    assert index.search([]) == []
+
+
+def test_new_dimension_rebuilds_the_index(session_factory):
+    _save(session_factory, "a", [1.0, 0.0])
+    _save(session_factory, "b", [1.0, 0.0, 0.0])
+    index = ResumeIndex()
+    index.ensure(2)
+    index.ensure(3)
+    assert index.size == 1
+    assert _students(index, [1.0, 0.0, 0.0]) == ["b"]
@@ -0,0 +1,123 @@
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("langchain_core")
+pytest.importorskip("starlette")
+pytest.importorskip("httpx")
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from db import database
+from db.models import ServerSession
+from utils import session_store as module
+from utils.session_store import (
+    DatabaseSessionStore,
+    MemorySessionStore,
+    ServerSessionMiddleware,
+    create_session_store,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(module.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def database_store(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sessions.db'}")
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=engine))
+    return DatabaseSessionStore(ttl_seconds=60, purge_every=3)
+
+
+def test_memory_store_expires_sessions(clock):
+    store = MemorySessionStore(ttl_seconds=60, max_entries=8)
+    store.save("a", '{"student_id": "s1"}')
+
+    assert store.load("a") == ({"student_id": "s1"}, 1060.0)
+    clock[0] += 61
+    assert store.load("a") is None
+
+
+def test_memory_store_evicts_the_least_recently_used_session(clock):
+    store = MemorySessionStore(ttl_seconds=60, max_entries=2)
+    store.save("a", "{}")
+    store.save("b", "{}")
+    store.load("a")
+    store.save("c", "{}")
+
+    assert store.load("b") is None
+    assert store.load("a") is not None
+    assert store.stats()["evictions"] == 1
+
+
+def test_database_store_round_trip_and_purge(database_store, clock):
+    database_store.save("a", '{"student_id": "s1"}')
+    assert database_store.load("a") == ({"student_id": "s1"}, 1060.0)
+
+    database_store.save("a", '{"student_id": "s2"}')
+    assert database_store.load("a")[0] == {"student_id": "s2"}
+
+    clock[0] += 61
+    assert database_store.load("a") is None
+    database_store.save("b", "{}")  # every third write purges expired rows
+    db = database.SessionLocal()
+    try:
+        assert [row.id for row in db.query(ServerSession)] == ["b"]
+    finally:
+        db.close()
+
+    database_store.delete("b")
+    assert database_store.load("b") is None
+
+
+def test_several_workers_default_to_the_database_store():
+    assert isinstance(create_session_store("memory", workers=1), MemorySessionStore)
+    assert isinstance(create_session_store("database", workers=1), DatabaseSessionStore)
+    assert isinstance(create_session_store("unknown", workers=4), DatabaseSessionStore)
+
+
+def test_memory_store_with_several_workers_refuses_to_start():
+    with pytest.raises(RuntimeError, match="WEB_CONCURRENCY=4"):
+        create_session_store("memory", workers=4)
+
+
+def _client(store):
+    async def login(request):
+        request.session["student_id"] = request.query_params["student_id"]
+        return JSONResponse({})
+
+    async def whoami(request):
+        return JSONResponse({"student_id": request.session.get("student_id")})
+
+    async def logout(request):
+        request.session.clear()
+        return JSONResponse({})
+
+    app = Starlette(routes=[Route("/login", login), Route("/whoami", whoami), Route("/logout", logout)])
+    return TestClient(ServerSessionMiddleware(app, store=store, max_age=60))
+
+
+@pytest.mark.parametrize("backend", ["memory", "database"])
+def test_middleware_keeps_only_an_opaque_id_in_the_cookie(backend, request):
+    store = MemorySessionStore(ttl_seconds=60) if backend == "memory" else request.getfixturevalue("database_store")
+    client = _client(store)
+
+    client.get("/login", params={"student_id": "s1"})
+    session_id = client.cookies["session"]
+
+    assert "s1" not in session_id
+    assert client.get("/whoami").json() == {"student_id": "s1"}
+
+    client.get("/logout")
+    assert store.load(session_id) is None
+    assert client.get("/whoami").json() == {"student_id": None}